@@ -38,6 +38,15 @@ def create_app():
         CORS(app, supports_credentials=True) # Geliştirme için
 
     from app import models 
+    from app.jobs import job_queue
+    job_queue.init_app(app)
+    from app import commands
+    commands.init_app(app)
+    from app import account_resolver
+    account_resolver.init_app(app)
+    from app import response_cache
+    response_cache.init_app(app)
+
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
     
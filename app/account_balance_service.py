@@ -0,0 +1,420 @@
+# app/account_balance_service.py
+# gunluk_hesap_bakiyesi tablosunun bakımı. Her yevmiye satırı (firma, hesap_kodu, gün)
+# anahtarlı bir borç/alacak toplamına katkıda bulunur; içe aktarmada eklenen satırların,
+# silmede silinen satırların farkı tek bir toplu UPSERT ile uygulanır. Bakiye sorguları
+# böylece yevmiye hacminden bağımsız olarak (hesap sayısı × gün sayısı) satır okur.
+#
+# aylik_hesap_bakiyesi tablosu bunun üzerine ay sonu itibarıyla kümülatif toplamları
+# (prefix sum) tutar: bir tarihteki bakiye = o tarihten önceki son ay sonu anlık görüntüsü
+# + o ayın başından tarihe kadarki günlük satırlar. Bir güne fark uygulandığında o aydan
+# sonraki anlık görüntüler geçersiz sayılıp silinir; sorgular her zaman en son geçerli
+# görüntüden devam ettiği için sonuç doğru kalır, refresh_monthly_snapshots eksik ayları
+# yeniden doldurur.
+
+from app import db
+from app.models import GunlukHesapBakiyesi, AylikHesapBakiyesi, YevmiyeMaddesiBasligi, YevmiyeFisiSatiri
+from app.response_cache import veri_surumunu_artir
+from sqlalchemy import insert, delete, select, update, func, case, tuple_, bindparam, literal_column
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import timedelta
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SIFIR = Decimal('0.00')
+
+
+def _gunluk_farklar(satirlar, isaret=1):
+    """ Satır sözlüklerini (hesap_kodu, gün) bazında toplar: {anahtar: [borc, alacak, adet]} """
+    farklar = {}
+    for satir in satirlar:
+        anahtar = (satir['hesap_kodu'], satir['muhasebe_kayit_tarihi'])
+        fark = farklar.get(anahtar)
+        if fark is None:
+            fark = farklar[anahtar] = [_SIFIR, _SIFIR, 0]
+        fark[0] += satir['borc_tutari']
+        fark[1] += satir['alacak_tutari']
+        fark[2] += 1
+    if isaret < 0:
+        for fark in farklar.values():
+            fark[0], fark[1], fark[2] = -fark[0], -fark[1], -fark[2]
+    return farklar
+
+
+def apply_balance_deltas(firma_id, farklar):
+    """
+    {(hesap_kodu, gun): [borc, alacak, satir_sayisi]} farklarını günlük bakiye tablosuna ekler.
+    PostgreSQL/SQLite'ta INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x (eşzamanlı
+    içe aktarmalarda da atomik); diğer veritabanlarında oku-güncelle-ekle. Commit çağırana aittir.
+    """
+    if not farklar:
+        return 0
+    tablo = GunlukHesapBakiyesi.__table__
+    kayitlar = [
+        {'firma_id': firma_id, 'hesap_kodu': hesap_kodu, 'gun': gun,
+         'borc_toplami': borc, 'alacak_toplami': alacak, 'satir_sayisi': adet}
+        for (hesap_kodu, gun), (borc, alacak, adet) in farklar.items()
+    ]
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql.insert(tablo) if dialect == 'postgresql' else sqlite.insert(tablo))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['firma_id', 'hesap_kodu', 'gun'],
+            set_={
+                'borc_toplami': tablo.c.borc_toplami + stmt.excluded.borc_toplami,
+                'alacak_toplami': tablo.c.alacak_toplami + stmt.excluded.alacak_toplami,
+                'satir_sayisi': tablo.c.satir_sayisi + stmt.excluded.satir_sayisi,
+            },
+        )
+        db.session.execute(stmt, kayitlar)
+    else:
+        mevcut = {
+            (r.hesap_kodu, r.gun)
+            for r in db.session.execute(
+                select(tablo.c.hesap_kodu, tablo.c.gun).where(
+                    tablo.c.firma_id == firma_id,
+                    tuple_(tablo.c.hesap_kodu, tablo.c.gun).in_(list(farklar)),
+                )
+            )
+        }
+        guncellenecek = [k for k in kayitlar if (k['hesap_kodu'], k['gun']) in mevcut]
+        eklenecek = [k for k in kayitlar if (k['hesap_kodu'], k['gun']) not in mevcut]
+        if guncellenecek:
+            db.session.execute(
+                update(tablo)
+                .where(tablo.c.firma_id == bindparam('b_firma_id'), tablo.c.hesap_kodu == bindparam('b_hesap_kodu'),
+                       tablo.c.gun == bindparam('b_gun'))
+                .values(borc_toplami=tablo.c.borc_toplami + bindparam('b_borc'),
+                        alacak_toplami=tablo.c.alacak_toplami + bindparam('b_alacak'),
+                        satir_sayisi=tablo.c.satir_sayisi + bindparam('b_adet')),
+                [{'b_firma_id': k['firma_id'], 'b_hesap_kodu': k['hesap_kodu'], 'b_gun': k['gun'],
+                  'b_borc': k['borc_toplami'], 'b_alacak': k['alacak_toplami'], 'b_adet': k['satir_sayisi']}
+                 for k in guncellenecek],
+            )
+        if eklenecek:
+            db.session.execute(insert(tablo), eklenecek)
+    invalidate_monthly_snapshots(firma_id, min(gun for _, gun in farklar))
+    return len(kayitlar)
+
+
+def add_lines_to_balances(firma_id, satirlar):
+    """ Yeni eklenen yevmiye satırlarını (sözlükler) günlük bakiyelere ekler. """
+    return apply_balance_deltas(firma_id, _gunluk_farklar(satirlar))
+
+
+def subtract_headers_from_balances(baslik_ids):
+    """
+    Silinmek üzere olan başlıkların satırlarını günlük bakiyelerden düşer (satırlar silinmeden
+    önce çağrılmalıdır). Toplama veritabanında GROUP BY ile yapılır; satırlar belleğe alınmaz.
+    """
+    satir = YevmiyeFisiSatiri.__table__
+    baslik = YevmiyeMaddesiBasligi.__table__
+    sonuc = db.session.execute(
+        select(
+            baslik.c.firma_id, satir.c.hesap_kodu, satir.c.muhasebe_kayit_tarihi,
+            func.sum(satir.c.borc_tutari), func.sum(satir.c.alacak_tutari), func.count(),
+        )
+        .select_from(satir.join(baslik, satir.c.yevmiye_maddesi_id == baslik.c.id))
+        .where(satir.c.yevmiye_maddesi_id.in_(baslik_ids))
+        .group_by(baslik.c.firma_id, satir.c.hesap_kodu, satir.c.muhasebe_kayit_tarihi)
+    )
+    firma_farklari = {}
+    for firma_id, hesap_kodu, gun, borc, alacak, adet in sonuc:
+        firma_farklari.setdefault(firma_id, {})[(hesap_kodu, gun)] = [
+            -Decimal(borc or 0), -Decimal(alacak or 0), -adet
+        ]
+    tablo = GunlukHesapBakiyesi.__table__
+    for firma_id, farklar in firma_farklari.items():
+        apply_balance_deltas(firma_id, farklar)
+        db.session.execute(delete(tablo).where(tablo.c.firma_id == firma_id, tablo.c.satir_sayisi <= 0))
+
+
+def _surumu_artir(firma_id):
+    # Yeniden oluşturma önbellekteki yanıtları ve ETag'leri geçersiz kılmalıdır.
+    if firma_id is None:
+        veri_surumunu_artir(tumu=True)
+    else:
+        veri_surumunu_artir(firma_id)
+
+
+def rebuild_daily_balances(firma_id=None):
+    """
+    Günlük bakiyeleri yevmiye satırlarından baştan oluşturur (ilk kurulum veya tutarsızlık
+    durumunda). Tek bir INSERT ... SELECT ... GROUP BY ile yapılır ve commit edilir; satırların
+    firma_id'si kullanıldığından başlık tablosuna join yapılmaz (boş firma_id'ler önce
+    edefter_service.backfill_line_firma_ids ile doldurulmalıdır). Oluşturulan satır sayısını döndürür.
+    """
+    tablo = GunlukHesapBakiyesi.__table__
+    satir = YevmiyeFisiSatiri.__table__
+
+    silme = delete(tablo)
+    goruntu_silme = delete(AylikHesapBakiyesi.__table__)
+    kaynak = (
+        select(
+            satir.c.firma_id, satir.c.hesap_kodu, satir.c.muhasebe_kayit_tarihi,
+            func.sum(satir.c.borc_tutari), func.sum(satir.c.alacak_tutari), func.count(),
+        )
+        .where(satir.c.firma_id.is_not(None))
+        .group_by(satir.c.firma_id, satir.c.hesap_kodu, satir.c.muhasebe_kayit_tarihi)
+    )
+    if firma_id is not None:
+        silme = silme.where(tablo.c.firma_id == firma_id)
+        goruntu_silme = goruntu_silme.where(AylikHesapBakiyesi.__table__.c.firma_id == firma_id)
+        kaynak = kaynak.where(satir.c.firma_id == firma_id)
+    try:
+        # Anlık görüntüler günlük bakiyelerden türetilir; ardından rebuild_monthly_snapshots çağrılmalıdır.
+        db.session.execute(goruntu_silme)
+        db.session.execute(silme)
+        sonuc = db.session.execute(
+            insert(tablo).from_select(
+                ['firma_id', 'hesap_kodu', 'gun', 'borc_toplami', 'alacak_toplami', 'satir_sayisi'], kaynak
+            )
+        )
+        _surumu_artir(firma_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Günlük bakiyeler yeniden oluşturuldu (firma: {firma_id or 'tümü'}, {sonuc.rowcount} satır).")
+    return sonuc.rowcount
+
+
+# === AYLIK KÜMÜLATİF ANLIK GÖRÜNTÜLER ===
+
+def _ay_basi(gun):
+    return gun.replace(day=1)
+
+
+def _sonraki_ay(ay):
+    return (ay.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _ay_sonu(ay):
+    return _sonraki_ay(ay) - timedelta(days=1)
+
+
+def invalidate_monthly_snapshots(firma_id, gun):
+    """ `gun`ün ayı ve sonrasına ait anlık görüntüleri siler (o aylara ait toplamlar değişmiştir). """
+    tablo = AylikHesapBakiyesi.__table__
+    db.session.execute(delete(tablo).where(tablo.c.firma_id == firma_id, tablo.c.ay >= _ay_basi(gun)))
+
+
+def refresh_monthly_snapshots(firma_id):
+    """
+    Firmanın eksik ay sonu anlık görüntülerini, mevcut son görüntüden (yoksa ilk hareket
+    ayından) başlayarak son hareket ayına kadar günlük bakiyelerden üretir. Her hesap için
+    her ay bir satır yazılır; böylece bir tarihin bakiyesi tek bir ayın satırlarından okunur.
+    Commit çağırana aittir. Eklenen satır sayısını döndürür.
+    """
+    tablo = AylikHesapBakiyesi.__table__
+    gunluk = GunlukHesapBakiyesi.__table__
+
+    son_ay = db.session.execute(select(func.max(tablo.c.ay)).where(tablo.c.firma_id == firma_id)).scalar()
+    son_gun = db.session.execute(select(func.max(gunluk.c.gun)).where(gunluk.c.firma_id == firma_id)).scalar()
+    if son_gun is None:
+        return 0
+
+    toplamlar = {}
+    if son_ay is not None:
+        for hesap_kodu, borc, alacak in db.session.execute(
+            select(tablo.c.hesap_kodu, tablo.c.kumulatif_borc, tablo.c.kumulatif_alacak)
+            .where(tablo.c.firma_id == firma_id, tablo.c.ay == son_ay)
+        ):
+            toplamlar[hesap_kodu] = [Decimal(borc), Decimal(alacak)]
+        baslangic = _sonraki_ay(son_ay)
+    else:
+        baslangic = _ay_basi(db.session.execute(
+            select(func.min(gunluk.c.gun)).where(gunluk.c.firma_id == firma_id)
+        ).scalar())
+    if baslangic > son_gun:
+        return 0
+
+    aylik_hareketler = {}
+    for hesap_kodu, gun, borc, alacak in db.session.execute(
+        select(gunluk.c.hesap_kodu, gunluk.c.gun, gunluk.c.borc_toplami, gunluk.c.alacak_toplami)
+        .where(gunluk.c.firma_id == firma_id, gunluk.c.gun >= baslangic)
+    ):
+        hareket = aylik_hareketler.setdefault(_ay_basi(gun), {}).setdefault(hesap_kodu, [_SIFIR, _SIFIR])
+        hareket[0] += Decimal(borc)
+        hareket[1] += Decimal(alacak)
+
+    kayitlar = []
+    ay = baslangic
+    while ay <= son_gun:
+        for hesap_kodu, (borc, alacak) in aylik_hareketler.get(ay, {}).items():
+            toplam = toplamlar.setdefault(hesap_kodu, [_SIFIR, _SIFIR])
+            toplam[0] += borc
+            toplam[1] += alacak
+        kayitlar.extend(
+            {'firma_id': firma_id, 'hesap_kodu': hesap_kodu, 'ay': ay,
+             'kumulatif_borc': borc, 'kumulatif_alacak': alacak}
+            for hesap_kodu, (borc, alacak) in toplamlar.items()
+        )
+        ay = _sonraki_ay(ay)
+    if kayitlar:
+        db.session.execute(insert(tablo), kayitlar)
+    return len(kayitlar)
+
+
+def refresh_monthly_snapshots_safe(firma_id):
+    """
+    İçe aktarma/silme sonunda çağrılır. Eşzamanlı bir yenileme ile çakışma gibi hatalar
+    işlemi bozmaz: anlık görüntüler yalnızca hızlandırıcıdır, eksik kalırlarsa bakiye
+    sorguları daha uzun bir günlük kuyrukla yine doğru sonuç verir.
+    """
+    try:
+        with db.session.begin_nested():
+            return refresh_monthly_snapshots(firma_id)
+    except Exception as e:
+        logger.warning(f"Firma {firma_id}: aylık bakiye anlık görüntüleri yenilenemedi: {e}")
+        return 0
+
+
+def rebuild_monthly_snapshots(firma_id=None):
+    """ Anlık görüntüleri silip günlük bakiyelerden baştan üretir ve commit eder. """
+    tablo = AylikHesapBakiyesi.__table__
+    if firma_id is None:
+        firma_idleri = db.session.execute(select(GunlukHesapBakiyesi.firma_id).distinct()).scalars().all()
+        silme = delete(tablo)
+    else:
+        firma_idleri = [firma_id]
+        silme = delete(tablo).where(tablo.c.firma_id == firma_id)
+    try:
+        db.session.execute(silme)
+        toplam = sum(refresh_monthly_snapshots(f_id) for f_id in firma_idleri)
+        _surumu_artir(firma_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Aylık bakiye anlık görüntüleri yeniden oluşturuldu (firma: {firma_id or 'tümü'}, {toplam} satır).")
+    return toplam
+
+
+def _son_anlik_goruntu(firma_id, sinir, hesap_kodu=None):
+    """
+    Ay başı `sinir`e eşit veya önce olan en son anlık görüntü: (ay, {hesap_kodu: (borc, alacak)}).
+    `hesap_kodu` verilirse yalnızca o hesabın satırı okunur.
+    """
+    tablo = AylikHesapBakiyesi.__table__
+    goruntu_ay = db.session.execute(
+        select(func.max(tablo.c.ay)).where(tablo.c.firma_id == firma_id, tablo.c.ay <= sinir)
+    ).scalar()
+    if goruntu_ay is None:
+        return None, {}
+    sorgu = select(tablo.c.hesap_kodu, tablo.c.kumulatif_borc, tablo.c.kumulatif_alacak).where(
+        tablo.c.firma_id == firma_id, tablo.c.ay == goruntu_ay
+    )
+    if hesap_kodu is not None:
+        sorgu = sorgu.where(tablo.c.hesap_kodu == hesap_kodu)
+    return goruntu_ay, {
+        kod: (Decimal(borc), Decimal(alacak)) for kod, borc, alacak in db.session.execute(sorgu)
+    }
+
+
+def get_cumulative_balances(firma_id, tarih, hesap_kodu=None):
+    """
+    `tarih` itibarıyla hesap bazında kümülatif (borç, alacak) toplamlarını döndürür:
+    {hesap_kodu: (borc, alacak)}. `tarih`ten önce biten son ayın anlık görüntüsü ile
+    sonraki günlerin günlük bakiyeleri toplanır; okunan satır sayısı hesap sayısı ile
+    en fazla bir aylık günlük satırla sınırlıdır. `hesap_kodu` verilirse yalnızca o hesap hesaplanır.
+    """
+    gunluk = GunlukHesapBakiyesi.__table__
+
+    # tarih ay sonuysa o ayın görüntüsü de kullanılabilir
+    sinir = _ay_basi(tarih) if tarih == _ay_sonu(_ay_basi(tarih)) else _ay_basi(tarih) - timedelta(days=1)
+    goruntu_ay, toplamlar = _son_anlik_goruntu(firma_id, sinir, hesap_kodu)
+
+    kuyruk = select(
+        gunluk.c.hesap_kodu, func.sum(gunluk.c.borc_toplami), func.sum(gunluk.c.alacak_toplami)
+    ).where(gunluk.c.firma_id == firma_id, gunluk.c.gun <= tarih).group_by(gunluk.c.hesap_kodu)
+    if hesap_kodu is not None:
+        kuyruk = kuyruk.where(gunluk.c.hesap_kodu == hesap_kodu)
+    if goruntu_ay is not None:
+        kuyruk = kuyruk.where(gunluk.c.gun > _ay_sonu(goruntu_ay))
+
+    for hesap_kodu, borc, alacak in db.session.execute(kuyruk):
+        onceki_borc, onceki_alacak = toplamlar.get(hesap_kodu, (_SIFIR, _SIFIR))
+        toplamlar[hesap_kodu] = (onceki_borc + Decimal(borc or 0), onceki_alacak + Decimal(alacak or 0))
+    return toplamlar
+
+
+def get_period_balances(firma_id, baslangic, bitis):
+    """
+    Dönem sonu kümülatif toplamları ile dönem içi hareketleri tek taramada döndürür:
+    {hesap_kodu: (kumulatif_borc, kumulatif_alacak, donem_borc, donem_alacak)}.
+    Dönem başından önce biten son anlık görüntüden sonraki günlük satırlar bir kez okunur;
+    dönem içi tutarlar aynı GROUP BY içinde SUM(CASE WHEN gun >= baslangic ...) ile ayrılır.
+    """
+    gunluk = GunlukHesapBakiyesi.__table__
+
+    goruntu_ay, toplamlar = _son_anlik_goruntu(firma_id, _ay_basi(baslangic) - timedelta(days=1))
+    donem_ici = gunluk.c.gun >= baslangic
+    kuyruk = select(
+        gunluk.c.hesap_kodu,
+        func.sum(gunluk.c.borc_toplami), func.sum(gunluk.c.alacak_toplami),
+        func.sum(case((donem_ici, gunluk.c.borc_toplami), else_=0)),
+        func.sum(case((donem_ici, gunluk.c.alacak_toplami), else_=0)),
+    ).where(gunluk.c.firma_id == firma_id, gunluk.c.gun <= bitis).group_by(gunluk.c.hesap_kodu)
+    if goruntu_ay is not None:
+        kuyruk = kuyruk.where(gunluk.c.gun > _ay_sonu(goruntu_ay))
+
+    sonuc = {hesap_kodu: (borc, alacak, _SIFIR, _SIFIR) for hesap_kodu, (borc, alacak) in toplamlar.items()}
+    for hesap_kodu, borc, alacak, donem_borc, donem_alacak in db.session.execute(kuyruk):
+        onceki_borc, onceki_alacak = toplamlar.get(hesap_kodu, (_SIFIR, _SIFIR))
+        sonuc[hesap_kodu] = (
+            onceki_borc + Decimal(borc or 0), onceki_alacak + Decimal(alacak or 0),
+            Decimal(donem_borc or 0), Decimal(donem_alacak or 0),
+        )
+    return sonuc
+
+
+def get_multi_period_balances(firma_id, donemler):
+    """
+    Birden çok dönem için get_period_balances'ın karşılığını tek GROUP BY ile döndürür:
+    {hesap_kodu: [(kumulatif_borc, kumulatif_alacak, donem_borc, donem_alacak), ...]}
+    (liste `donemler` sırasıyla). `donemler` artan sıralı, çakışmayan (baslangic, bitis)
+    çiftleridir. Günlük satırlar CASE ile kovalara ayrılır: 2i = i. dönemden önceki boşluk,
+    2i + 1 = i. dönem; kümülatif toplamlar kovaların sıralı toplamıdır.
+    """
+    gunluk = GunlukHesapBakiyesi.__table__
+
+    goruntu_ay, toplamlar = _son_anlik_goruntu(firma_id, _ay_basi(donemler[0][0]) - timedelta(days=1))
+    kosullar = []
+    for i, (baslangic, bitis) in enumerate(donemler):
+        kosullar.append((gunluk.c.gun < baslangic, 2 * i))
+        kosullar.append((gunluk.c.gun <= bitis, 2 * i + 1))
+    kova = case(*kosullar, else_=2 * len(donemler) - 1).label('kova')
+    # GROUP BY'da takma ad kullanılır: CASE içindeki bind parametreleri SELECT ve GROUP BY'da
+    # farklı numaralandığından PostgreSQL ifadeleri eşleştiremez.
+    kuyruk = select(
+        gunluk.c.hesap_kodu, kova, func.sum(gunluk.c.borc_toplami), func.sum(gunluk.c.alacak_toplami),
+    ).where(
+        gunluk.c.firma_id == firma_id, gunluk.c.gun <= donemler[-1][1]
+    ).group_by(gunluk.c.hesap_kodu, literal_column('kova'))
+    if goruntu_ay is not None:
+        kuyruk = kuyruk.where(gunluk.c.gun > _ay_sonu(goruntu_ay))
+
+    kovalar = {}
+    for hesap_kodu, k, borc, alacak in db.session.execute(kuyruk):
+        hesap_kovalari = kovalar.get(hesap_kodu)
+        if hesap_kovalari is None:
+            hesap_kovalari = kovalar[hesap_kodu] = [(_SIFIR, _SIFIR)] * (2 * len(donemler))
+        hesap_kovalari[k] = (Decimal(borc or 0), Decimal(alacak or 0))
+
+    sonuc = {}
+    for hesap_kodu in toplamlar.keys() | kovalar.keys():
+        borc, alacak = toplamlar.get(hesap_kodu, (_SIFIR, _SIFIR))
+        hesap_kovalari = kovalar.get(hesap_kodu)
+        satir = []
+        for i in range(len(donemler)):
+            donem_borc = donem_alacak = _SIFIR
+            if hesap_kovalari is not None:
+                (bosluk_borc, bosluk_alacak), (donem_borc, donem_alacak) = hesap_kovalari[2 * i:2 * i + 2]
+                borc += bosluk_borc + donem_borc
+                alacak += bosluk_alacak + donem_alacak
+            satir.append((borc, alacak, donem_borc, donem_alacak))
+        sonuc[hesap_kodu] = satir
+    return sonuc
@@ -0,0 +1,150 @@
+# app/account_resolver.py
+# Hesap kodu -> hesap detayı çözümleyici. Kurallar hane hane bir önek ağacına (trie)
+# yerleştirilir; bir kod için en uzun eşleşen önek seçilir, böylece alt hesaplar
+# (120.01, 12001 ...) ana hesaplarına düşer ve çözümleme maliyeti hesap planının
+# büyüklüğünden bağımsız olarak kod uzunluğuyla sınırlı kalır. Çözülen kodlar önbelleğe alınır.
+#
+# Kural desenleri:
+#   '120'      tam hesap (ve alt hesapları)
+#   '12x'      12 ile başlayan tüm hesaplar ('x', 'X' veya '*')
+#   '100-108'  aynı uzunlukta sayısal aralık; aralıktaki her kod ayrı kural olur
+# Daha uzun (daha özel) önek her zaman kazanır: '12x' ile '120' varsa 120.01 -> '120'.
+#
+# Bilinmeyen kodlar hesap başına log yazmak yerine istek boyunca toplanır ve istek sonunda
+# tek bir özet uyarı olarak yazılır; toplam sayaç /metrics üzerinden okunabilir.
+
+from flask import g, has_request_context
+from functools import lru_cache
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_JOKERLER = ('x', 'X', '*')
+_AYRACLAR = '. '  # alt hesap ayraçları (120.01, 120 01)
+
+
+def _desen_onekleri(desen):
+    """ Bir kural desenini önek listesine açar. """
+    desen = desen.strip()
+    if '-' in desen:
+        bas, son = (p.strip() for p in desen.split('-', 1))
+        if not (bas.isdigit() and son.isdigit() and len(bas) == len(son) and int(bas) <= int(son)):
+            raise ValueError(f"Geçersiz hesap aralığı: {desen}")
+        return [str(k).zfill(len(bas)) for k in range(int(bas), int(son) + 1)]
+    while desen and desen[-1] in _JOKERLER:
+        desen = desen[:-1]
+    if not desen:
+        raise ValueError("Boş hesap kuralı.")
+    return [desen]
+
+
+class HesapCozucu:
+    """ Önek ağacı tabanlı, önbellekli hesap kodu çözümleyici. """
+
+    def __init__(self, kurallar=None, onbellek_boyutu=65536):
+        self._kok = {}
+        self.kural_sayisi = 0
+        for desen, detay in (kurallar or {}).items():
+            self.kural_ekle(desen, detay)
+        self.coz = lru_cache(maxsize=onbellek_boyutu)(self._coz)
+
+    def kural_ekle(self, desen, detay):
+        """ Kural ekler; daha önce çözülmüş kodların önbelleği temizlenir. """
+        for onek in _desen_onekleri(desen):
+            dugum = self._kok
+            for karakter in onek:
+                if karakter in _AYRACLAR:
+                    continue
+                dugum = dugum.setdefault(karakter, {})
+            dugum[None] = detay  # None anahtarı: bu düğümde biten kuralın değeri
+            self.kural_sayisi += 1
+        if hasattr(self, 'coz'):
+            self.coz.cache_clear()
+
+    def _coz(self, hesap_kodu):
+        dugum = self._kok
+        bulunan = dugum.get(None)
+        for karakter in hesap_kodu:
+            if karakter in _AYRACLAR:
+                continue
+            dugum = dugum.get(karakter)
+            if dugum is None:
+                break
+            bulunan = dugum.get(None, bulunan)
+        return bulunan
+
+    def onbellek_bilgisi(self):
+        return self.coz.cache_info()
+
+
+# === BİLİNMEYEN HESAP KODLARI ===
+
+_sayac_kilidi = threading.Lock()
+_bilinmeyen_toplam = 0
+_istek_disi_bildirilenler = set()
+
+
+def bilinmeyen_kod_bildir(hesap_kodu, baglam=None):
+    """
+    Çözülemeyen bir hesap kodunu kaydeder. İstek içindeyse istek sonu özetine eklenir;
+    istek dışında (arka plan işleri) her kod süreç başına bir kez loglanır.
+    """
+    global _bilinmeyen_toplam
+    with _sayac_kilidi:
+        _bilinmeyen_toplam += 1
+    if has_request_context():
+        kodlar = g.setdefault('bilinmeyen_hesap_kodlari', {})
+        kodlar.setdefault(hesap_kodu, set()).add(baglam)
+        return
+    with _sayac_kilidi:
+        if hesap_kodu in _istek_disi_bildirilenler:
+            return
+        _istek_disi_bildirilenler.add(hesap_kodu)
+    logger.warning(f"Bilinmeyen hesap kodu {hesap_kodu}{f' ({baglam})' if baglam else ''}.")
+
+
+def bilinmeyen_kod_sayisi():
+    return _bilinmeyen_toplam
+
+
+def _istek_ozeti_yaz(hata=None):
+    kodlar = g.pop('bilinmeyen_hesap_kodlari', None)
+    if not kodlar:
+        return
+    ornek = ', '.join(sorted(kodlar)[:20]) + (' ...' if len(kodlar) > 20 else '')
+    baglamlar = '; '.join(sorted({b for bs in kodlar.values() for b in bs if b}))
+    logger.warning(
+        f"Bu istekte {len(kodlar)} farklı bilinmeyen hesap kodu atlandı: {ornek}"
+        + (f" [{baglamlar}]" if baglamlar else "")
+    )
+
+
+def init_app(app):
+    app.teardown_request(_istek_ozeti_yaz)
+
+
+def metrikler():
+    """ /metrics için (ad, tür, açıklama, değer) listesi. """
+    bilgi = varsayilan_cozucu().onbellek_bilgisi()
+    return [
+        ('hesap_cozucu_bilinmeyen_kod_toplam', 'counter', "Çözülemeyen hesap kodu sayısı", bilinmeyen_kod_sayisi()),
+        ('hesap_cozucu_onbellek_isabet_toplam', 'counter', "Önbellekten çözülen kod sayısı", bilgi.hits),
+        ('hesap_cozucu_onbellek_iskalama_toplam', 'counter', "Önek ağacında çözülen kod sayısı", bilgi.misses),
+        ('hesap_cozucu_onbellek_boyutu', 'gauge', "Önbellekteki kod sayısı", bilgi.currsize),
+    ]
+
+
+@lru_cache(maxsize=None)
+def varsayilan_cozucu():
+    """ HESAP_DETAYLARI kurallarıyla kurulan uygulama geneli çözümleyici. """
+    from app.financial_statement_service import HESAP_DETAYLARI
+    return HesapCozucu(HESAP_DETAYLARI)
+
+
+def hesap_detayi(hesap_kodu, baglam=None):
+    """ Hesap kodunun detayını döndürür; bulunamazsa bildirip None döner. """
+    detay = varsayilan_cozucu().coz(hesap_kodu)
+    if detay is None:
+        bilinmeyen_kod_bildir(hesap_kodu, baglam)
+    return detay
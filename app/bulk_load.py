@@ -0,0 +1,128 @@
+# app/bulk_load.py
+# Büyük hacimli tablolar (yevmiye satırları vb.) için toplu yükleme katmanı.
+# PostgreSQL'de satırlar psycopg2 üzerinden COPY ... FROM STDIN ile tek akışta yazılır;
+# diğer veritabanlarında (SQLite) büyük parçalar halinde executemany kullanılır.
+# Tüm işlemler oturumun (db.session) mevcut transaction'ı içinde çalışır; commit çağırana aittir.
+
+from app import db
+from sqlalchemy import insert, text
+from datetime import date, datetime
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# COPY kullanılamayan veritabanlarında tek executemany çağrısına verilecek satır sayısı
+EXECUTEMANY_PARCA = 10000
+
+# COPY text formatında özel anlamı olan karakterler
+_COPY_KACIS = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_destekleniyor():
+    """ Oturumun bağlı olduğu veritabanı COPY FROM STDIN destekliyor mu (PostgreSQL + psycopg2). """
+    bind = db.session.get_bind()
+    return bind.dialect.name == 'postgresql' and bind.dialect.driver == 'psycopg2'
+
+
+def _varsayilanlar(tablo, sutunlar):
+    """
+    Kayıtlarda eksik olabilecek sütunlar için Python tarafı varsayılanları hesaplar.
+    Core INSERT bunları kendisi uygular; COPY'de elle doldurulmaları gerekir.
+    """
+    degerler = {}
+    for sutun in sutunlar:
+        varsayilan = tablo.c[sutun].default
+        if varsayilan is None:
+            degerler[sutun] = None
+        elif varsayilan.is_scalar:
+            degerler[sutun] = varsayilan.arg
+        elif varsayilan.is_callable:
+            degerler[sutun] = varsayilan.arg(None)
+        else:
+            degerler[sutun] = None
+    return degerler
+
+
+def _copy_degeri(deger):
+    if deger is None:
+        return '\\N'
+    if deger.__class__ is str:
+        return deger.translate(_COPY_KACIS)
+    if isinstance(deger, bool):
+        return 't' if deger else 'f'
+    if isinstance(deger, (date, datetime)):
+        return deger.isoformat()
+    return str(deger).translate(_COPY_KACIS)
+
+
+def _copy_ile_yaz(tablo, sutunlar, kayitlar):
+    varsayilanlar = _varsayilanlar(tablo, sutunlar)
+    tampon = io.StringIO()
+    yaz = tampon.write
+    for kayit in kayitlar:
+        yaz('\t'.join([_copy_degeri(kayit.get(s, varsayilanlar[s])) for s in sutunlar]))
+        yaz('\n')
+    tampon.seek(0)
+
+    # Oturumun kullandığı bağlantının ham psycopg2 bağlantısı; COPY aynı transaction'da çalışır.
+    dbapi_baglanti = db.session.connection().connection.dbapi_connection
+    with dbapi_baglanti.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {tablo.name} ({', '.join(sutunlar)}) FROM STDIN WITH (FORMAT text)", tampon
+        )
+
+
+def bulk_insert(tablo, kayitlar, sutunlar=None):
+    """
+    Sözlük listesini tabloya toplu yazar. `sutunlar` verilmezse tablodaki (id hariç) tüm
+    sütunlar kullanılır; kayıtta bulunmayan alanlara sütun varsayılanı yazılır.
+    Eklenen satır sayısını döndürür.
+    """
+    if not kayitlar:
+        return 0
+    if copy_destekleniyor():
+        sutunlar = sutunlar or [c.key for c in tablo.columns if not c.primary_key]
+        _copy_ile_yaz(tablo, sutunlar, kayitlar)
+    else:
+        for i in range(0, len(kayitlar), EXECUTEMANY_PARCA):
+            db.session.execute(insert(tablo), kayitlar[i:i + EXECUTEMANY_PARCA])
+    return len(kayitlar)
+
+
+def reserve_ids(tablo, adet):
+    """
+    PostgreSQL'de tablonun id sequence'ından `adet` değeri tek sorguda ayırır.
+    Sequence yoksa veya veritabanı PostgreSQL değilse None döner.
+    """
+    if adet <= 0 or db.session.get_bind().dialect.name != 'postgresql':
+        return None
+    sequence = db.session.execute(
+        text("SELECT pg_get_serial_sequence(:tablo, 'id')"), {'tablo': tablo.name}
+    ).scalar()
+    if sequence is None:
+        return None
+    return db.session.execute(
+        text("SELECT nextval(:sequence) FROM generate_series(1, :adet)"),
+        {'sequence': sequence, 'adet': adet},
+    ).scalars().all()
+
+
+def bulk_insert_returning_ids(tablo, kayitlar):
+    """
+    Kayıtları ekler ve id'lerini kayıtlarla aynı sırada döndürür; madde başına ayrı bir
+    gidiş-dönüş yapılmaz. PostgreSQL'de id'ler sequence'tan tek sorguda ayrılıp kayıtlar
+    COPY ile yazılır; diğer veritabanlarında INSERT ... RETURNING (insertmanyvalues) kullanılır.
+    """
+    if not kayitlar:
+        return []
+    if copy_destekleniyor():
+        ids = reserve_ids(tablo, len(kayitlar))
+        if ids is not None:
+            for kayit_id, kayit in zip(ids, kayitlar):
+                kayit['id'] = kayit_id
+            _copy_ile_yaz(tablo, [c.key for c in tablo.columns], kayitlar)
+            return ids
+    return db.session.execute(
+        insert(tablo).returning(tablo.c.id, sort_by_parameter_order=True), kayitlar
+    ).scalars().all()
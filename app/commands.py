@@ -0,0 +1,64 @@
+# app/commands.py
+# Bakım komutları (flask <komut>). Örn:
+#   flask bakiyeleri-yeniden-olustur --firma-id 3
+#   flask satir-firma-id-doldur
+#   flask oranlari-yeniden-hesapla
+#   flask isleri-kurtar
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('bakiyeleri-yeniden-olustur')
+@click.option('--firma-id', type=int, default=None, help="Yalnızca bu firmanın bakiyelerini oluştur (varsayılan: tümü).")
+@with_appcontext
+def bakiyeleri_yeniden_olustur(firma_id):
+    """ Günlük hesap bakiyelerini ve aylık anlık görüntüleri yevmiye satırlarından baştan oluşturur. """
+    from app.account_balance_service import rebuild_daily_balances, rebuild_monthly_snapshots
+    from app.edefter_service import backfill_line_firma_ids
+    backfill_line_firma_ids(firma_id)
+    satir = rebuild_daily_balances(firma_id)
+    click.echo(f"{satir} günlük bakiye satırı oluşturuldu.")
+    goruntu = rebuild_monthly_snapshots(firma_id)
+    click.echo(f"{goruntu} aylık anlık görüntü satırı oluşturuldu.")
+
+
+@click.command('satir-firma-id-doldur')
+@click.option('--firma-id', type=int, default=None, help="Yalnızca bu firmanın satırlarını doldur (varsayılan: tümü).")
+@click.option('--parca', type=int, default=50000, show_default=True, help="Tek UPDATE/commit'teki id aralığı.")
+@with_appcontext
+def satir_firma_id_doldur(firma_id, parca):
+    """ firma_id'si boş yevmiye satırlarını başlık kayıtlarından doldurur. """
+    from app.edefter_service import backfill_line_firma_ids
+    satir = backfill_line_firma_ids(firma_id, parca)
+    click.echo(f"{satir} yevmiye satırının firma_id alanı dolduruldu.")
+
+
+@click.command('oranlari-yeniden-hesapla')
+@click.option('--firma-id', type=int, default=None, help="Yalnızca bu firmanın dönemlerini hesapla (varsayılan: tümü).")
+@click.option('--parca', type=int, default=10000, show_default=True, help="Tek UPDATE/commit'teki satır sayısı.")
+@with_appcontext
+def oranlari_yeniden_hesapla(firma_id, parca):
+    """ FinansalVeri'deki türetilmiş oranları (cari oran, borç/özkaynak, Altman Z') yeniden hesaplar. """
+    from app.financial_data_service import recompute_derived_ratios
+    satir = recompute_derived_ratios(firma_id, parca)
+    click.echo(f"{satir} finansal veri satırının oranları güncellendi.")
+
+
+@click.command('isleri-kurtar')
+@click.option('--zaman-asimi', type=int, default=None, help="Saniye; varsayılan INGEST_JOB_TIMEOUT.")
+@with_appcontext
+def isleri_kurtar(zaman_asimi):
+    """ Süreci ölmüş içe aktarma işlerini 'hata'ya çeker ve yarım kalan içe aktarmalarını geri alır. """
+    from flask import current_app
+    from app.jobs import recover_stale_jobs
+    from datetime import timedelta
+    sayi = recover_stale_jobs(timedelta(seconds=zaman_asimi or current_app.config['INGEST_JOB_TIMEOUT']))
+    click.echo(f"{sayi} yarıda kalmış iş kurtarıldı.")
+
+
+def init_app(app):
+    app.cli.add_command(bakiyeleri_yeniden_olustur)
+    app.cli.add_command(satir_firma_id_doldur)
+    app.cli.add_command(oranlari_yeniden_hesapla)
+    app.cli.add_command(isleri_kurtar)
@@ -0,0 +1,190 @@
+# app/comparative_statement_service.py
+# Karşılaştırmalı (çok dönemli) mali tablolar: örneğin 3-5 yıl ya da 12 ay yan yana.
+# Tüm dönemlerin bakiye ve hareketleri günlük bakiyeler üzerinde tek GROUP BY ile dönem
+# kovalarına ayrılarak okunur (account_balance_service.get_multi_period_balances); her dönemin
+# bilanço ve gelir tablosu bu tek sonuçtan derlenmiş motorla kurulur. Yatay analiz (önceki
+# döneme göre değişim %) ve dikey analiz (bilançoda taraf toplamına, gelir tablosunda net
+# satışlara oran %) düğüm × dönem tutar matrisleri üzerinde numpy ile tek seferde hesaplanır.
+
+from app.financial_statement_service import get_donemsel_bakiyeler_ve_hareketler
+from app.statement_engine import bilanco_motoru, gelir_tablosu_motoru, bilanco_ve_toplamlar, gelir_tablosu_ve_tutarlar
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+AZAMI_DONEM = 24
+# periyot -> (ay adımı, varsayılan dönem sayısı)
+PERIYOTLAR = {'yillik': (12, 3), 'aylik': (1, 12)}
+GELIR_TABLOSU_PAYDASI = 'NET SATIŞLAR'
+
+
+class KarsilastirmaHatasi(ValueError):
+    """ Geçersiz dönem listesi veya periyot parametresi (istemci hatası, 400). """
+
+
+def _tarih(metin):
+    try:
+        return datetime.strptime(metin.strip(), '%Y-%m-%d').date()
+    except ValueError:
+        raise KarsilastirmaHatasi(f"Geçersiz tarih: '{metin}'. Lütfen YYYY-AA-GG kullanın.")
+
+
+def _dogrula(donemler):
+    if not donemler:
+        raise KarsilastirmaHatasi("En az bir dönem belirtilmelidir.")
+    if len(donemler) > AZAMI_DONEM:
+        raise KarsilastirmaHatasi(f"En fazla {AZAMI_DONEM} dönem karşılaştırılabilir.")
+    donemler = sorted(donemler)
+    for baslangic, bitis in donemler:
+        if baslangic > bitis:
+            raise KarsilastirmaHatasi(f"Başlangıç tarihi bitiş tarihinden sonra olamaz: {baslangic}:{bitis}")
+    for (_, onceki_bitis), (baslangic, bitis) in zip(donemler, donemler[1:]):
+        if baslangic <= onceki_bitis:
+            raise KarsilastirmaHatasi(f"Dönemler çakışamaz: {baslangic}:{bitis}")
+    return donemler
+
+
+def _ay_geri(tarih, ay):
+    """ `tarih`ten `ay` ay öncesi. Ay sonları ay sonuna eşlenir; diğer günler hedef ayın uzunluğuyla sınırlanır. """
+    yil, ay_indeksi = divmod(tarih.year * 12 + tarih.month - 1 - ay, 12)
+    ilk = date(yil, ay_indeksi + 1, 1)
+    ay_sonu = (ilk.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    if (tarih + timedelta(days=1)).day == 1:
+        return ay_sonu
+    return ilk.replace(day=min(tarih.day, ay_sonu.day))
+
+
+def ardisik_donemler(periyot, adet, bitis):
+    """ `bitis`te biten `adet` ardışık yıllık/aylık dönem, eskiden yeniye. """
+    if periyot not in PERIYOTLAR:
+        raise KarsilastirmaHatasi(f"Bilinmeyen periyot: '{periyot}'. İzin verilenler: {', '.join(PERIYOTLAR)}")
+    adim = PERIYOTLAR[periyot][0]
+    return _dogrula([
+        (_ay_geri(bitis, (k + 1) * adim) + timedelta(days=1), _ay_geri(bitis, k * adim))
+        for k in range(adet)
+    ])
+
+
+def karsilastirma_donemleri(parametreler):
+    """
+    İstek parametrelerinden dönem listesi:
+      ?donemler=2023-01-01:2023-12-31,2024-01-01:2024-12-31  (açık liste) veya
+      ?karsilastirma=yillik|aylik&donem_bitis=YYYY-AA-GG[&donem_sayisi=N]
+    """
+    if parametreler.get('donemler'):
+        donemler = []
+        for parca in parametreler['donemler'].split(','):
+            if not parca.strip():
+                continue
+            baslangic, ayrac, bitis = parca.partition(':')
+            if not ayrac:
+                raise KarsilastirmaHatasi(f"Dönem 'BASLANGIC:BITIS' biçiminde olmalıdır: '{parca}'")
+            donemler.append((_tarih(baslangic), _tarih(bitis)))
+        return _dogrula(donemler)
+
+    periyot = parametreler.get('karsilastirma')
+    if periyot not in PERIYOTLAR:
+        raise KarsilastirmaHatasi(f"Bilinmeyen periyot: '{periyot}'. İzin verilenler: {', '.join(PERIYOTLAR)}")
+    if not parametreler.get('donem_bitis'):
+        raise KarsilastirmaHatasi("Lütfen 'donem_bitis' parametresini YYYY-AA-GG formatında sağlayın.")
+    adet = parametreler.get('donem_sayisi', PERIYOTLAR[periyot][1])
+    try:
+        adet = int(adet)
+    except ValueError:
+        raise KarsilastirmaHatasi("'donem_sayisi' bir tam sayı olmalıdır.")
+    if not 1 <= adet <= AZAMI_DONEM:
+        raise KarsilastirmaHatasi(f"'donem_sayisi' 1 ile {AZAMI_DONEM} arasında olmalıdır.")
+    return ardisik_donemler(periyot, adet, _tarih(parametreler['donem_bitis']))
+
+
+@lru_cache(maxsize=None)
+def _bilanco_duzeni():
+    """ Bilanço düğümlerinin taraf (AKTIFLER / PASIFLER) indeksleri ve derinlikleri. """
+    motor = bilanco_motoru()
+    taraf, derinlik = [], []
+    for i, ebeveyn in enumerate(motor.ebeveyn):  # ön-sıralı: ebeveyn her zaman önce gelir
+        taraf.append(i if ebeveyn < 0 else taraf[ebeveyn])
+        derinlik.append(0 if ebeveyn < 0 else derinlik[ebeveyn] + 1)
+    return np.array(taraf), tuple(derinlik)
+
+
+def _yuzde(pay, payda):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(payda != 0, pay / payda * 100.0, np.nan)
+
+
+def analiz_matrisleri(tutarlar, payda_satirlari):
+    """
+    `tutarlar` düğüm × dönem matrisi için (dikey, yatay) yüzde matrisleri. Dikey analizde
+    her düğüm `payda_satirlari`ndaki satıra oranlanır; yatay analiz önceki döneme göre
+    değişimdir (negatif tabanlarda yön korunsun diye payda mutlak değerdir). Tanımsız
+    oranlar (sıfır payda, ilk dönemin yatay değeri) NaN'dır.
+    """
+    dikey = _yuzde(tutarlar, tutarlar[payda_satirlari])
+    yatay = np.full(tutarlar.shape, np.nan)
+    onceki = tutarlar[:, :-1]
+    yatay[:, 1:] = _yuzde(tutarlar[:, 1:] - onceki, np.abs(onceki))
+    return dikey, yatay
+
+
+def _oranlar(satir):
+    return [None if np.isnan(deger) else round(float(deger), 2) + 0.0 for deger in satir]  # -0.0 -> 0.0
+
+
+def _analiz_satirlari(adlar, sutunlar, dikey, yatay, ek_alanlar):
+    return [
+        {'kalem': ad, **ek_alanlar[i],
+         'tutarlar': [f"{sutun[i]:.2f}" for sutun in sutunlar],
+         'dikey_yuzde': _oranlar(dikey[i]), 'yatay_yuzde': _oranlar(yatay[i])}
+        for i, ad in enumerate(adlar)
+    ]
+
+
+def get_karsilastirmali_tablolar(firma_id, donemler):
+    """
+    `donemler` (karsilastirma_donemleri çıktısı) için her dönemin bilanço ve gelir tablosu
+    ile kalem bazında yan yana tutarlar ve yatay/dikey analiz yüzdeleri. Hiçbir dönemde
+    bakiye yoksa None döner.
+    """
+    donemsel = get_donemsel_bakiyeler_ve_hareketler(firma_id, donemler)
+    if not any(bakiyeler for bakiyeler, _ in donemsel):
+        return None
+
+    tablolar, bilanco_sutunlari, gelir_sutunlari = [], [], []
+    for (baslangic, bitis), (bakiyeler, hareketler) in zip(donemler, donemsel):
+        bilanco, toplamlar = bilanco_ve_toplamlar(bakiyeler)
+        gelir_tablosu, tutarlar = gelir_tablosu_ve_tutarlar(hareketler)
+        tablolar.append({
+            'donem_baslangic': baslangic.isoformat(), 'donem_bitis': bitis.isoformat(),
+            'bilanco': bilanco, 'gelir_tablosu': gelir_tablosu,
+        })
+        bilanco_sutunlari.append(toplamlar)
+        gelir_sutunlari.append(tutarlar)
+
+    bilanco_motor = bilanco_motoru()
+    taraf, derinlik = _bilanco_duzeni()
+    b_dikey, b_yatay = analiz_matrisleri(np.array(bilanco_sutunlari, dtype=float).T, taraf)
+
+    gelir_motor = gelir_tablosu_motoru()
+    payda = gelir_motor.adlar.index(GELIR_TABLOSU_PAYDASI)
+    g_dikey, g_yatay = analiz_matrisleri(
+        np.array(gelir_sutunlari, dtype=float).T, np.full(len(gelir_motor.adlar), payda)
+    )
+
+    logger.info(f"Firma {firma_id}: {len(donemler)} dönemlik karşılaştırmalı mali tablolar oluşturuldu.")
+    return {
+        'donemler': tablolar,
+        'analiz': {
+            'bilanco': _analiz_satirlari(
+                bilanco_motor.adlar, bilanco_sutunlari, b_dikey, b_yatay,
+                [{'seviye': d} for d in derinlik],
+            ),
+            'gelir_tablosu': _analiz_satirlari(
+                gelir_motor.adlar, gelir_sutunlari, g_dikey, g_yatay,
+                [{'ara_toplam': h is not None} for h in gelir_motor.hesaplamalar],
+            ),
+        },
+    }
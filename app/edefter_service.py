@@ -0,0 +1,610 @@
+# app/edefter_service.py
+# E-defter (XBRL-GL yevmiye) dosyalarının akış (streaming) halinde içe aktarılması.
+# Dosya hiçbir zaman tamamen belleğe alınmaz: lxml iterparse ile her <gl-cor:entryDetail>
+# ve <gl-cor:entryHeader> işlendikten hemen sonra ağaçtan temizlenir.
+
+from app import db
+from app.models import YevmiyeMaddesiBasligi, YevmiyeFisiSatiri, IceAktarmaKaydi
+from app.response_cache import veri_surumunu_artir
+from app.bulk_load import bulk_insert, bulk_insert_returning_ids
+from app.account_balance_service import (
+    add_lines_to_balances, subtract_headers_from_balances, refresh_monthly_snapshots_safe,
+)
+from sqlalchemy import delete, select, update, func, or_
+from lxml import etree
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+import hashlib
+import io
+import logging
+import mmap
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bir yazma işleminde (batch) toplanacak yaklaşık yevmiye satırı sayısı.
+# Bellek kullanımı bu değer + en büyük tek yevmiye maddesinin satır sayısı ile sınırlıdır.
+DEFAULT_BATCH_SIZE = 5000
+
+# Bu süre boyunca yeni batch yazılmamış tamamlanmamış içe aktarmalar yarıda kalmış (süreci ölmüş) sayılır.
+YARIM_KALAN_ZAMAN_ASIMI = timedelta(minutes=15)
+
+# XBRL-GL yerel etiket adı -> YevmiyeMaddesiBasligi alanı
+_BASLIK_ALANLARI = {
+    'entryNumberCounter': 'yevmiye_madde_no_counter',
+    'entryNumber': 'muhasebe_fis_no',
+    'enteredDate': 'kayit_tarihi_giris',
+    'entryComment': 'aciklama_baslik',
+    'totalDebit': 'toplam_borc',
+    'totalCredit': 'toplam_alacak',
+}
+
+# XBRL-GL yerel etiket adı -> YevmiyeFisiSatiri alanı
+_SATIR_ALANLARI = {
+    'postingDate': 'muhasebe_kayit_tarihi',
+    'accountMainID': 'hesap_kodu',
+    'accountMainDescription': 'hesap_adi',
+    'accountSubID': 'alt_hesap_kodu',
+    'accountSubDescription': 'alt_hesap_adi',
+    'detailComment': 'aciklama_satir',
+    'documentType': 'belge_tipi',
+    'documentTypeDescription': 'belge_tipi_aciklama',
+    'documentNumber': 'belge_no',
+    'documentDate': 'belge_tarihi',
+    'documentReference': 'belge_referansi',
+    'paymentMethod': 'odeme_yontemi',
+}
+
+_TARIH_ALANLARI = {'kayit_tarihi_giris', 'muhasebe_kayit_tarihi', 'belge_tarihi'}
+
+# Alanların DB sütun uzunlukları; e-defterlerde uzun açıklamalar sık görülür.
+_METIN_SINIRLARI = {
+    'yevmiye_madde_no_counter': 50, 'muhasebe_fis_no': 100,
+    'hesap_kodu': 50, 'hesap_adi': 255, 'alt_hesap_kodu': 50, 'alt_hesap_adi': 255,
+    'belge_tipi': 50, 'belge_tipi_aciklama': 255, 'belge_no': 100,
+    'belge_referansi': 100, 'odeme_yontemi': 100,
+}
+
+_BOS_SATIR = {alan: None for alan in _SATIR_ALANLARI.values()}
+
+
+class EDefterFormatHatasi(ValueError):
+    """ E-defter içeriği beklenen XBRL-GL yapısına uymadığında fırlatılır. """
+
+
+_YEREL_AD_ONBELLEGI = {}
+
+
+def _yerel_ad(tag):
+    """ '{namespace}entryDetail' -> 'entryDetail' """
+    ad = _YEREL_AD_ONBELLEGI.get(tag)
+    if ad is None:
+        ad = tag.rpartition('}')[2] if isinstance(tag, str) else ''
+        if isinstance(tag, str):
+            _YEREL_AD_ONBELLEGI[tag] = ad
+    return ad
+
+
+# Tam (namespace'li) etiket -> alan adı önbelleği; her satırda string işlemi yapmamak için.
+_SATIR_ETIKET_ONBELLEGI = {}
+
+
+def _satir_etiketi(tag):
+    alan = _SATIR_ETIKET_ONBELLEGI.get(tag)
+    if alan is None:
+        ad = _yerel_ad(tag)
+        alan = _SATIR_ALANLARI.get(ad) or (ad if ad in ('amount', 'debitCreditCode') else '')
+        _SATIR_ETIKET_ONBELLEGI[tag] = alan
+    return alan
+
+
+def _tarih(deger):
+    return date.fromisoformat(deger[:10]) if deger else None
+
+
+def _tutar(deger):
+    if not deger:
+        return Decimal('0.00')
+    try:
+        return Decimal(deger)
+    except InvalidOperation:
+        raise EDefterFormatHatasi(f"Geçersiz tutar değeri: '{deger}'")
+
+
+def _temizle(elem):
+    """ İşlenmiş elemanı ve ondan önceki kardeşlerini ağaçtan siler; bellek sabit kalır. """
+    elem.clear(keep_tail=False)
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def _satiri_temizle(detail):
+    """
+    İşlenmiş <entryDetail>'i temizler ve daha önce işlenmiş kardeş satırları siler.
+    Başlık alanları (entryNumber vb.) aynı ebeveyndedir ve başlık kapanana kadar korunur.
+    """
+    detail.clear(keep_tail=False)
+    parent = detail.getparent()
+    prev = detail.getprevious()
+    while prev is not None and _yerel_ad(prev.tag) == 'entryDetail':
+        parent.remove(prev)
+        prev = detail.getprevious()
+
+
+def _satir_oku(detail):
+    satir = dict(_BOS_SATIR)
+    tutar = None
+    borc_alacak = None
+    for el in detail.iter():
+        tag = el.tag
+        alan = _SATIR_ETIKET_ONBELLEGI.get(tag)
+        if alan is None:
+            alan = _satir_etiketi(tag)
+        if not alan:
+            continue
+        metin = el.text
+        if metin is None:
+            continue
+        metin = metin.strip()
+        if alan == 'amount':
+            tutar = _tutar(metin)
+        elif alan == 'debitCreditCode':
+            borc_alacak = metin.upper()
+        elif metin:
+            satir[alan] = metin
+
+    if tutar is None:
+        tutar = Decimal('0.00')
+    if borc_alacak in ('D', 'DEBIT', 'B', 'BORC', 'BORÇ'):
+        satir['borc_tutari'], satir['alacak_tutari'] = tutar, Decimal('0.00')
+    elif borc_alacak in ('C', 'CREDIT', 'A', 'ALACAK'):
+        satir['borc_tutari'], satir['alacak_tutari'] = Decimal('0.00'), tutar
+    else:
+        raise EDefterFormatHatasi(f"Geçersiz borç/alacak kodu: '{borc_alacak}'")
+    return satir
+
+
+def _baslik_oku(header):
+    baslik = {alan: None for alan in _BASLIK_ALANLARI.values()}
+    for el in header:  # Sadece doğrudan alt elemanlar; satırlar zaten işlendi ve silindi
+        alan = _BASLIK_ALANLARI.get(_yerel_ad(el.tag))
+        if alan is not None:
+            metin = (el.text or '').strip()
+            if metin:
+                baslik[alan] = metin
+    return baslik
+
+
+def _normalize(kayit):
+    for alan, sinir in _METIN_SINIRLARI.items():
+        deger = kayit.get(alan)
+        if deger is not None and len(deger) > sinir:
+            kayit[alan] = deger[:sinir]
+    for alan in _TARIH_ALANLARI:
+        deger = kayit.get(alan)
+        if deger.__class__ is str:
+            try:
+                kayit[alan] = _tarih(deger)
+            except ValueError:
+                raise EDefterFormatHatasi(f"Geçersiz tarih değeri: '{deger}'")
+    return kayit
+
+
+@contextmanager
+def mmap_source(yol):
+    """
+    Diskteki dosyayı salt okunur mmap ile açar; parser sayfaları doğrudan işletim sisteminin
+    sayfa önbelleğinden okur, Python tarafında dosya boyutunda bir bytes/str oluşmaz.
+    """
+    with open(yol, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:  # Boş dosya mmap'lenemez
+            yield io.BytesIO(b'')
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield mm
+
+
+def parse_edefter_batches(kaynak, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    E-defter (yevmiye) XML'ini akış halinde okur ve (baslik, satirlar) çiftlerinden oluşan
+    listeleri yaklaşık `batch_size` satırlık gruplar halinde üretir (generator).
+    `kaynak` bir dosya yolu (mmap ile okunur) veya read() metodu olan ikili (binary) bir
+    dosya nesnesidir. Başlık sözlükleri YevmiyeMaddesiBasligi, satır sözlükleri YevmiyeFisiSatiri sütun
+    adlarını kullanır; yevmiye_maddesi_id ve firma_id yazma aşamasında doldurulur.
+    """
+    if isinstance(kaynak, (str, os.PathLike)):
+        with mmap_source(kaynak) as mm:
+            yield from parse_edefter_batches(mm, batch_size=batch_size)
+        return
+
+    donem_baslangic = donem_bitis = None
+    maddeler = []
+    madde_satirlari = []
+    bekleyen_satir_sayisi = 0
+
+    context = etree.iterparse(
+        kaynak, events=('end',), huge_tree=True, remove_comments=True, resolve_entities=False,
+        tag=('{*}periodCoveredStart', '{*}periodCoveredEnd', '{*}entryDetail', '{*}entryHeader'),
+    )
+    for _, elem in context:
+        ad = _yerel_ad(elem.tag)
+        if ad == 'entryDetail':
+            madde_satirlari.append(_satir_oku(elem))
+            _satiri_temizle(elem)
+        elif ad == 'entryHeader':
+            baslik = _normalize(_baslik_oku(elem))
+            baslik['dosya_donemi_baslangic'] = donem_baslangic
+            baslik['dosya_donemi_bitis'] = donem_bitis
+            for satir in madde_satirlari:
+                _normalize(satir)
+                if satir['muhasebe_kayit_tarihi'] is None:
+                    satir['muhasebe_kayit_tarihi'] = baslik['kayit_tarihi_giris']
+                if satir['muhasebe_kayit_tarihi'] is None or satir['hesap_kodu'] is None:
+                    raise EDefterFormatHatasi(
+                        f"Yevmiye maddesi {baslik['yevmiye_madde_no_counter'] or baslik['muhasebe_fis_no']}: "
+                        f"satırda hesap kodu veya kayıt tarihi eksik."
+                    )
+            baslik['toplam_borc'] = _tutar(baslik['toplam_borc']) if baslik['toplam_borc'] \
+                else sum((s['borc_tutari'] for s in madde_satirlari), Decimal('0.00'))
+            baslik['toplam_alacak'] = _tutar(baslik['toplam_alacak']) if baslik['toplam_alacak'] \
+                else sum((s['alacak_tutari'] for s in madde_satirlari), Decimal('0.00'))
+
+            maddeler.append((baslik, madde_satirlari))
+            bekleyen_satir_sayisi += len(madde_satirlari)
+            madde_satirlari = []
+            _temizle(elem)
+
+            if bekleyen_satir_sayisi >= batch_size:
+                yield maddeler
+                maddeler = []
+                bekleyen_satir_sayisi = 0
+        elif ad == 'periodCoveredStart':
+            donem_baslangic = _tarih((elem.text or '').strip())
+        elif ad == 'periodCoveredEnd':
+            donem_bitis = _tarih((elem.text or '').strip())
+    del context
+
+    if maddeler:
+        yield maddeler
+
+
+def write_edefter_batch(firma_id, maddeler, dosya_adi=None, ice_aktarma_kaydi_id=None):
+    """
+    Bir batch'i toplu yükleme katmanıyla (app.bulk_load) yazar: başlık id'leri madde başına
+    gidiş-dönüş olmadan çözülür (PostgreSQL'de sequence'tan toplu ayırma + COPY, diğerlerinde
+    INSERT ... RETURNING), satırlar ise COPY / büyük executemany ile eklenir ve günlük hesap
+    bakiyelerine işlenir.
+    Commit çağırana aittir. Eklenen başlıkların id listesini döndürür.
+    """
+    if not maddeler:
+        return []
+    basliklar = []
+    for baslik, _ in maddeler:
+        baslik['firma_id'] = firma_id
+        baslik['orjinal_dosya_adi'] = dosya_adi
+        baslik['ice_aktarma_kaydi_id'] = ice_aktarma_kaydi_id
+        basliklar.append(baslik)
+
+    baslik_ids = bulk_insert_returning_ids(YevmiyeMaddesiBasligi.__table__, basliklar)
+
+    satirlar = []
+    for baslik_id, (_, madde_satirlari) in zip(baslik_ids, maddeler):
+        for satir in madde_satirlari:
+            satir['yevmiye_maddesi_id'] = baslik_id
+            satir['firma_id'] = firma_id
+            satirlar.append(satir)
+    bulk_insert(YevmiyeFisiSatiri.__table__, satirlar)
+    add_lines_to_balances(firma_id, satirlar)
+    veri_surumunu_artir(firma_id)
+    return baslik_ids
+
+
+def delete_yevmiye_maddeleri(baslik_ids, parca=500):
+    """
+    Verilen başlıkları ve satırlarını toplu DELETE'lerle siler; satırların günlük bakiyelere
+    katkısı önce düşülür. Commit çağırana aittir.
+    """
+    baslik_ids = list(baslik_ids)
+    for i in range(0, len(baslik_ids), parca):
+        grup = baslik_ids[i:i + parca]
+        subtract_headers_from_balances(grup)
+        db.session.execute(delete(YevmiyeFisiSatiri.__table__).where(YevmiyeFisiSatiri.__table__.c.yevmiye_maddesi_id.in_(grup)))
+        db.session.execute(delete(YevmiyeMaddesiBasligi.__table__).where(YevmiyeMaddesiBasligi.__table__.c.id.in_(grup)))
+
+
+def backfill_line_firma_ids(firma_id=None, parca=50000):
+    """
+    firma_id'si boş olan (sütun eklenmeden önce yüklenmiş) yevmiye satırlarını başlıktan
+    doldurur. Büyük tablolarda kilitleri kısa tutmak için id aralıkları halinde güncellenir
+    ve her parça commit edilir. Güncellenen satır sayısını döndürür.
+    """
+    satir = YevmiyeFisiSatiri.__table__
+    baslik = YevmiyeMaddesiBasligi.__table__
+    en_kucuk, en_buyuk = db.session.execute(
+        select(func.min(satir.c.id), func.max(satir.c.id)).where(satir.c.firma_id.is_(None))
+    ).one()
+    if en_kucuk is None:
+        return 0
+
+    baslik_firmasi = (
+        select(baslik.c.firma_id).where(baslik.c.id == satir.c.yevmiye_maddesi_id).scalar_subquery()
+    )
+    toplam = 0
+    for alt in range(en_kucuk, en_buyuk + 1, parca):
+        stmt = update(satir).where(
+            satir.c.firma_id.is_(None), satir.c.id >= alt, satir.c.id < alt + parca
+        ).values(firma_id=baslik_firmasi)
+        if firma_id is not None:
+            stmt = stmt.where(satir.c.yevmiye_maddesi_id.in_(select(baslik.c.id).where(baslik.c.firma_id == firma_id)))
+        guncellenen = db.session.execute(stmt).rowcount
+        if guncellenen:
+            # Satır bazlı uçlar (mizan, muavin, yevmiye) satırın firma_id'sini okur.
+            if firma_id is not None:
+                veri_surumunu_artir(firma_id)
+            else:
+                veri_surumunu_artir(*db.session.execute(
+                    select(baslik.c.firma_id).distinct().where(
+                        baslik.c.id.in_(select(satir.c.yevmiye_maddesi_id).where(satir.c.id >= alt, satir.c.id < alt + parca))
+                    )
+                ).scalars())
+        toplam += guncellenen
+        db.session.commit()
+    logger.info(f"Yevmiye satırlarına firma_id dolduruldu (firma: {firma_id or 'tümü'}, {toplam} satır).")
+    return toplam
+
+
+def dosya_ozeti(yol, blok_boyutu=1 << 20):
+    """ Dosya içeriğinin SHA-256 özeti (hex); dosya bloklar halinde okunur. """
+    h = hashlib.sha256()
+    with open(yol, 'rb') as f:
+        while True:
+            blok = f.read(blok_boyutu)
+            if not blok:
+                break
+            h.update(blok)
+    return h.hexdigest()
+
+
+def _yarim_kalmis(kayit, zaman_asimi=YARIM_KALAN_ZAMAN_ASIMI):
+    """ Tamamlanmamış ve `zaman_asimi` boyunca yeni batch yazılmamış (süreci ölmüş) manifest kaydı mı? """
+    son = kayit.guncellenme_tarihi or kayit.yuklenme_tarihi
+    return not kayit.tamamlandi and (son is None or son < datetime.utcnow() - zaman_asimi)
+
+
+def yarim_kalan_ice_aktarmalari_temizle(firma_id=None, zaman_asimi=YARIM_KALAN_ZAMAN_ASIMI):
+    """
+    Süreci yarıda ölmüş (tamamlanmamış ve `zaman_asimi`ndan beri güncellenmemiş) içe aktarmaları,
+    eklenmiş maddeleriyle birlikte siler; böylece aynı dosya yeniden yüklenebilir. Silinen kayıt sayısını döndürür.
+    """
+    sorgu = IceAktarmaKaydi.query.filter(
+        IceAktarmaKaydi.tamamlandi.is_(False),
+        or_(IceAktarmaKaydi.guncellenme_tarihi.is_(None),
+               IceAktarmaKaydi.guncellenme_tarihi < datetime.utcnow() - zaman_asimi),
+    )
+    if firma_id is not None:
+        sorgu = sorgu.filter_by(firma_id=firma_id)
+    kayitlar = sorgu.all()
+    for kayit in kayitlar:
+        firma, kayit_id, dosya_adi = kayit.firma_id, kayit.id, kayit.orjinal_dosya_adi
+        silinen = delete_ice_aktarma(kayit)
+        logger.warning(
+            f"Firma {firma}: '{dosya_adi}' içe aktarması yarıda kalmış (kayıt {kayit_id}), eklenen {silinen} madde silindi."
+        )
+    return len(kayitlar)
+
+
+def start_ice_aktarma(firma_id, yol, dosya_adi=None):
+    """
+    Dosyanın içerik özetini hesaplar ve firma için manifest'e bakar (tekil indeks, O(1)).
+    Dosya daha önce yüklenmişse (None, onceki_kayit), değilse (yeni_kayit, None) döner.
+    Aynı dosyanın yarıda kalmış bir yüklemesi önce geri alınır; hâlâ sürüyorsa ValueError fırlatılır.
+    Yeni kayıt henüz oturuma eklenmemiştir; write_edefter_batches verilerle birlikte yazar.
+    """
+    ozet = dosya_ozeti(yol)
+    onceki = IceAktarmaKaydi.query.filter_by(firma_id=firma_id, dosya_ozeti=ozet).first()
+    if onceki is not None:
+        if onceki.tamamlandi:
+            return None, onceki
+        if not _yarim_kalmis(onceki):
+            raise ValueError(f"Bu dosya şu anda içe aktarılıyor (kayıt {onceki.id}); lütfen işin bitmesini bekleyin.")
+        logger.warning(f"Firma {firma_id}: '{dosya_adi}' dosyasının yarıda kalmış yüklemesi (kayıt {onceki.id}) geri alınıyor.")
+        delete_ice_aktarma(onceki)
+    return IceAktarmaKaydi(
+        firma_id=firma_id, dosya_ozeti=ozet, orjinal_dosya_adi=dosya_adi,
+        dosya_boyutu=os.path.getsize(yol),
+    ), None
+
+
+def mukerrer_dosya_sonucu(firma_id, onceki, dosya_adi=None):
+    logger.info(
+        f"Firma {firma_id}: '{dosya_adi}' daha önce '{onceki.orjinal_dosya_adi}' olarak yüklenmiş "
+        f"(kayıt {onceki.id}), atlanıyor."
+    )
+    return {
+        'madde_sayisi': 0,
+        'satir_sayisi': 0,
+        'atlanan_madde_sayisi': 0,
+        'mukerrer_dosya': True,
+        'ice_aktarma_kaydi_id': onceki.id,
+        'sure_saniye': 0.0,
+    }
+
+
+def _madde_ozeti(baslik, satirlar):
+    """ Bir maddenin (başlık alanları + satırları) içerik özeti; dosya/firma bilgisinden bağımsızdır. """
+    icerik = (
+        tuple(baslik[alan] for alan in _BASLIK_ALANLARI.values()),
+        [tuple(satir.values()) for satir in satirlar],
+    )
+    return hashlib.blake2b(repr(icerik).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def filter_new_entries(firma_id, maddeler, parca=500):
+    """
+    Firmada zaten kayıtlı olan maddeleri ayıklar. Anahtar (yevmiye_madde_no_counter,
+    muhasebe_fis_no, kayit_tarihi_giris) olup mevcut kayıtlar, batch'teki madde numaraları
+    için indeksli sütunlar üzerinden toplu IN sorgularıyla okunur (madde başına sorgu yoktur).
+    Madde numarası olmayan maddeler her zaman yeni kabul edilir.
+    (yeni_maddeler, atlanan_sayisi, farkli_icerikli_sayisi) döndürür.
+    """
+    tablo = YevmiyeMaddesiBasligi.__table__
+    sayaclar = set()
+    for baslik, satirlar in maddeler:
+        baslik['madde_ozeti'] = _madde_ozeti(baslik, satirlar)
+        if baslik['yevmiye_madde_no_counter'] is not None:
+            sayaclar.add(baslik['yevmiye_madde_no_counter'])
+    if not sayaclar:
+        return maddeler, 0, 0
+
+    mevcut = {}
+    sayaclar = list(sayaclar)
+    for i in range(0, len(sayaclar), parca):
+        sorgu = select(
+            tablo.c.yevmiye_madde_no_counter, tablo.c.muhasebe_fis_no,
+            tablo.c.kayit_tarihi_giris, tablo.c.madde_ozeti,
+        ).where(tablo.c.firma_id == firma_id, tablo.c.yevmiye_madde_no_counter.in_(sayaclar[i:i + parca]))
+        for sayac, fis_no, tarih, madde_ozeti in db.session.execute(sorgu):
+            mevcut[(sayac, fis_no, tarih)] = madde_ozeti
+
+    yeni = []
+    atlanan = farkli = 0
+    for baslik, satirlar in maddeler:
+        anahtar = (baslik['yevmiye_madde_no_counter'], baslik['muhasebe_fis_no'], baslik['kayit_tarihi_giris'])
+        if anahtar in mevcut:
+            atlanan += 1
+            if mevcut[anahtar] is not None and mevcut[anahtar] != baslik['madde_ozeti']:
+                farkli += 1
+            continue
+        yeni.append((baslik, satirlar))
+    return yeni, atlanan, farkli
+
+
+def delete_ice_aktarma(kayit):
+    """
+    Bir manifest kaydını, onunla yüklenmiş tüm yevmiye maddelerini ve bunların günlük bakiye
+    katkılarını siler; ardından aynı dosya yeniden yüklenebilir. Commit eder. Silinen madde sayısını döndürür.
+    """
+    baslik_ids = [
+        baslik_id for (baslik_id,) in db.session.query(YevmiyeMaddesiBasligi.id).filter_by(ice_aktarma_kaydi_id=kayit.id)
+    ]
+    try:
+        delete_yevmiye_maddeleri(baslik_ids)
+        db.session.delete(kayit)
+        veri_surumunu_artir(kayit.firma_id)
+        refresh_monthly_snapshots_safe(kayit.firma_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(baslik_ids)
+
+
+def write_edefter_batches(firma_id, batchler, ilerleme=None, kayit=None, tekillestir=True):
+    """
+    (dosya_adi, maddeler) çiftleri üreten bir iterable'ı tek yazıcı olarak veritabanına yazar.
+    Varsayılan olarak her şey tek bir transaction'dadır; hata olursa hiçbir kayıt kalmaz.
+
+    `tekillestir` açıkken firmada zaten kayıtlı maddeler atlanır (bkz. filter_new_entries);
+    `kayit` (yeni bir IceAktarmaKaydi) verilirse maddelerle birlikte yazılır ve sayaçları doldurulur.
+
+    `ilerleme` verilirse her batch yazıldıktan sonra ilerleme(okunan_satir, eklenen_satir)
+    çağrılır ve batch commit edilir (arka plan işlerinde ilerlemenin görülebilmesi için).
+    Bu modda hata olursa o ana kadar eklenen maddeler (ve manifest kaydı) silinerek yükleme
+    yine bütünüyle geri alınır. Süreç yarıda ölürse manifest kaydı tamamlanmamış kalır ve
+    yarim_kalan_ice_aktarmalari_temizle ile geri alınır. Sayaçları içeren bir sözlük döndürür.
+    """
+    okunan_satir = madde_sayisi = satir_sayisi = atlanan = farkli = 0
+    eklenen_ids = []
+    kayit_id = None
+    commit_edildi = False
+    try:
+        if kayit is not None:
+            db.session.add(kayit)
+            db.session.flush()
+            kayit_id = kayit.id
+        for dosya_adi, maddeler in batchler:
+            okunan_satir += sum(len(satirlar) for _, satirlar in maddeler)
+            if tekillestir:
+                maddeler, batch_atlanan, batch_farkli = filter_new_entries(firma_id, maddeler)
+                atlanan += batch_atlanan
+                farkli += batch_farkli
+            baslik_ids = write_edefter_batch(firma_id, maddeler, dosya_adi, kayit_id)
+            madde_sayisi += len(maddeler)
+            satir_sayisi += sum(len(satirlar) for _, satirlar in maddeler)
+            if ilerleme is not None:
+                eklenen_ids.extend(baslik_ids)
+                ilerleme(okunan_satir, satir_sayisi)
+                if kayit is not None:
+                    kayit.guncellenme_tarihi = datetime.utcnow()
+                db.session.commit()
+                commit_edildi = True
+        if kayit is not None:
+            kayit.madde_sayisi = madde_sayisi
+            kayit.satir_sayisi = satir_sayisi
+            kayit.atlanan_madde_sayisi = atlanan
+            kayit.tamamlandi = True
+            kayit.guncellenme_tarihi = datetime.utcnow()
+        # Geriye dönük maddeler eklendiyse etkilenen aydan sonraki anlık görüntüler silinmiştir.
+        refresh_monthly_snapshots_safe(firma_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        if commit_edildi:
+            logger.warning(f"Firma {firma_id}: Yükleme yarıda kaldı, eklenen {len(eklenen_ids)} madde geri alınıyor.")
+            delete_yevmiye_maddeleri(eklenen_ids)
+            if kayit_id is not None:
+                db.session.execute(delete(IceAktarmaKaydi.__table__).where(IceAktarmaKaydi.__table__.c.id == kayit_id))
+            ilerleme(okunan_satir, 0)
+            veri_surumunu_artir(firma_id)
+            refresh_monthly_snapshots_safe(firma_id)
+            db.session.commit()
+        raise
+
+    if farkli:
+        logger.warning(
+            f"Firma {firma_id}: {farkli} madde daha önce farklı içerikle yüklenmiş; mevcut kayıtlar korundu."
+        )
+    return {
+        'madde_sayisi': madde_sayisi,
+        'satir_sayisi': satir_sayisi,
+        'atlanan_madde_sayisi': atlanan,
+        'farkli_icerikli_madde_sayisi': farkli,
+        'ice_aktarma_kaydi_id': kayit_id,
+    }
+
+
+def ingest_edefter_xml(firma_id, kaynak, dosya_adi=None, batch_size=DEFAULT_BATCH_SIZE, ilerleme=None,
+                       tekillestir=True):
+    """
+    E-defter dosyasını akış halinde parse edip batch'ler halinde veritabanına yazar.
+    `kaynak` bir dosya yoluysa ve `tekillestir` açıksa aynı içerikli dosya daha önce
+    yüklenmişse dosya hiç parse edilmeden atlanır. Transaction ve `ilerleme` davranışı için
+    bkz. write_edefter_batches. İstatistik sözlüğü döndürür.
+    """
+    baslangic = time.perf_counter()
+    kayit = None
+    if tekillestir and isinstance(kaynak, (str, os.PathLike)):
+        kayit, onceki = start_ice_aktarma(firma_id, kaynak, dosya_adi)
+        if onceki is not None:
+            return mukerrer_dosya_sonucu(firma_id, onceki, dosya_adi)
+
+    sonuc = write_edefter_batches(
+        firma_id,
+        ((dosya_adi, maddeler) for maddeler in parse_edefter_batches(kaynak, batch_size=batch_size)),
+        ilerleme=ilerleme, kayit=kayit, tekillestir=tekillestir,
+    )
+
+    sure = time.perf_counter() - baslangic
+    logger.info(
+        f"Firma {firma_id}: '{dosya_adi}' e-defterinden {sonuc['madde_sayisi']} yevmiye maddesi, "
+        f"{sonuc['satir_sayisi']} satır {sure:.2f} sn'de yüklendi ({sonuc['satir_sayisi'] / sure if sure else 0:.0f} satır/sn); "
+        f"{sonuc['atlanan_madde_sayisi']} madde zaten kayıtlı olduğu için atlandı."
+    )
+    sonuc['sure_saniye'] = round(sure, 3)
+    return sonuc
@@ -0,0 +1,173 @@
+# app/edefter_zip_service.py
+# Bir yıllık e-defter arşivinin (12 aylık yevmiye XML'i + berat dosyaları, tek ZIP)
+# paralel içe aktarılması. Her ZIP üyesi ayrı bir süreçte (process pool, GIL dışında)
+# parse edilir; parse edilen batch'ler sınırlı boyutlu bir kuyruk üzerinden tek bir
+# yazıcıya (çağıran thread) akar ve o da write_edefter_batches ile toplu ekleme yapar.
+
+from app.edefter_service import (
+    parse_edefter_batches, write_edefter_batches, start_ice_aktarma, mukerrer_dosya_sonucu,
+    DEFAULT_BATCH_SIZE, _yerel_ad,
+)
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+import logging
+import multiprocessing
+import os
+import queue
+import time
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# Kuyrukta işçi başına bekleyebilecek batch sayısı; yazıcı yavaşsa işçiler bekler (bellek sınırı).
+KUYRUK_CARPANI = 2
+
+# Berat (imza) ve kebir dosyaları yevmiye maddesi içermez/tekrarlar; adlarından tanınır.
+# Örn: 1234567890-202401-Y-000000.xml (yevmiye), ...-YB-... (yevmiye beratı), ...-K-... (kebir)
+_ATLANAN_AD_PARCALARI = ('-YB-', '-KB-', '-K-', 'BERAT')
+
+# İşçi süreç durumu (initializer ile kurulur)
+_kuyruk = None
+_iptal = None
+
+
+def list_edefter_members(zf):
+    """ ZIP içindeki yevmiye adaylarını (XML, berat/kebir olmayan) ad sırasıyla döndürür. """
+    uyeler = []
+    for bilgi in zf.infolist():
+        ad = bilgi.filename
+        if bilgi.is_dir() or not ad.lower().endswith('.xml') or '__MACOSX' in ad:
+            continue
+        if any(parca in os.path.basename(ad).upper() for parca in _ATLANAN_AD_PARCALARI):
+            continue
+        uyeler.append(ad)
+    return sorted(uyeler)
+
+
+def _defter_turu(dosya):
+    """
+    gl-cor:entriesType değerini ilk yevmiye maddesine kadar okuyarak bulur
+    ('journal' = yevmiye, 'ledger' = kebir). Bulunamazsa None.
+    """
+    for _, elem in etree.iterparse(dosya, events=('end',), resolve_entities=False,
+                                   tag=('{*}entriesType', '{*}entryHeader')):
+        if _yerel_ad(elem.tag) == 'entriesType':
+            return (elem.text or '').strip().lower() or None
+        return None
+    return None
+
+
+def _isci_baslat(kuyruk, iptal):
+    global _kuyruk, _iptal
+    _kuyruk, _iptal = kuyruk, iptal
+    # Yazıcı normal akışta 'bitti' mesajlarının hepsini aldıktan sonra havuzu kapatır; iptal
+    # durumunda ise kuyrukta okunmamış veri kalabilir ve süreç çıkışta onu beklememelidir.
+    kuyruk.cancel_join_thread()
+
+
+def _uye_isle(zip_yolu, uye, batch_size):
+    """ İşçi süreçte çalışır: bir ZIP üyesini parse edip batch'leri kuyruğa koyar. """
+    try:
+        with zipfile.ZipFile(zip_yolu) as zf:
+            with zf.open(uye) as f:
+                tur = _defter_turu(f)
+            if tur not in (None, 'journal'):
+                _kuyruk.put(('atlandi', uye, tur))
+                return
+            with zf.open(uye) as f:
+                for maddeler in parse_edefter_batches(f, batch_size=batch_size):
+                    if _iptal.is_set():
+                        break
+                    _kuyruk.put(('batch', uye, maddeler))
+        _kuyruk.put(('bitti', uye, None))
+    except Exception as e:
+        _kuyruk.put(('hata', uye, f"{type(e).__name__}: {e}"))
+
+
+def _batchleri_topla(gelecekler, kuyruk, iptal, uye_sayisi, ozet):
+    """ Kuyruktaki batch'leri yazıcıya aktaran generator; bir üyede hata olursa tüm işi iptal eder. """
+    kalan = uye_sayisi
+    while kalan:
+        try:
+            tip, uye, veri = kuyruk.get(timeout=1)
+        except queue.Empty:
+            # Bir işçi süreci çöktüyse (BrokenProcessPool) kuyruğa hiç mesaj gelmez.
+            for gelecek in gelecekler:
+                if gelecek.done() and gelecek.exception() is not None:
+                    iptal.set()
+                    raise gelecek.exception()
+            continue
+        if tip == 'batch':
+            uye_ozeti = ozet.setdefault(uye, {'madde_sayisi': 0, 'satir_sayisi': 0})
+            uye_ozeti['madde_sayisi'] += len(veri)
+            uye_ozeti['satir_sayisi'] += sum(len(satirlar) for _, satirlar in veri)
+            yield uye, veri
+        elif tip == 'bitti':
+            ozet.setdefault(uye, {'madde_sayisi': 0, 'satir_sayisi': 0})
+            kalan -= 1
+        elif tip == 'atlandi':
+            ozet[uye] = {'atlandi': f"Yevmiye değil ({veri})"}
+            kalan -= 1
+        elif tip == 'hata':
+            iptal.set()
+            raise ValueError(f"'{uye}' işlenemedi: {veri}")
+
+
+def ingest_edefter_zip(firma_id, zip_yolu, max_workers=None, batch_size=DEFAULT_BATCH_SIZE, ilerleme=None,
+                       dosya_adi=None, tekillestir=True):
+    """
+    ZIP arşivindeki aylık yevmiye dosyalarını paralel parse edip tek yazıcıyla yükler.
+    Arşiv bütün olarak işlenir: herhangi bir üye hatalıysa hiçbir kayıt kalmaz
+    (transaction/ilerleme ve tekilleştirme davranışı için bkz. write_edefter_batches).
+    """
+    baslangic = time.perf_counter()
+    kayit = None
+    if tekillestir:
+        kayit, onceki = start_ice_aktarma(firma_id, zip_yolu, dosya_adi)
+        if onceki is not None:
+            return mukerrer_dosya_sonucu(firma_id, onceki, dosya_adi)
+    with zipfile.ZipFile(zip_yolu) as zf:
+        uyeler = list_edefter_members(zf)
+    if not uyeler:
+        raise ValueError("ZIP arşivinde yevmiye XML dosyası bulunamadı.")
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(uyeler)))
+    # 'spawn': çok thread'li (gunicorn/iş havuzu) bir süreçten fork etmek güvenli değildir.
+    ctx = multiprocessing.get_context('spawn')
+    kuyruk = ctx.Queue(maxsize=max_workers * KUYRUK_CARPANI)
+    iptal = ctx.Event()
+    ozet = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx,
+                             initializer=_isci_baslat, initargs=(kuyruk, iptal)) as havuz:
+        gelecekler = [havuz.submit(_uye_isle, zip_yolu, uye, batch_size) for uye in uyeler]
+        try:
+            sonuc = write_edefter_batches(
+                firma_id, _batchleri_topla(gelecekler, kuyruk, iptal, len(uyeler), ozet),
+                ilerleme=ilerleme, kayit=kayit, tekillestir=tekillestir,
+            )
+        except BaseException:
+            iptal.set()
+            for gelecek in gelecekler:
+                gelecek.cancel()
+            # Kuyrukta bekleyen işçiler put() üzerinde takılı kalmasın diye kuyruk boşaltılır.
+            while not all(g.done() for g in gelecekler):
+                try:
+                    kuyruk.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            raise
+
+    sure = time.perf_counter() - baslangic
+    logger.info(
+        f"Firma {firma_id}: ZIP arşivinden {len(uyeler)} dosya ({max_workers} işçi), {sonuc['madde_sayisi']} yevmiye maddesi, "
+        f"{sonuc['satir_sayisi']} satır {sure:.2f} sn'de yüklendi ({sonuc['satir_sayisi'] / sure if sure else 0:.0f} satır/sn); "
+        f"{sonuc['atlanan_madde_sayisi']} madde zaten kayıtlı olduğu için atlandı."
+    )
+    sonuc.update({
+        'dosya_sayisi': len(uyeler),
+        'isci_sayisi': max_workers,
+        'sure_saniye': round(sure, 3),
+        'dosyalar': ozet,
+    })
+    return sonuc
@@ -0,0 +1,240 @@
+# app/financial_data_service.py
+# FinansalVeri (dönemsel özet finansal veri) için toplu (set-based) yazma işlemleri.
+# CSV'ler pandas ile parça parça (chunksize) okunur, sütunlar bir kez eşlenir ve
+# her parça _finansal_veri_firma_donem_uc kısıtı üzerinde tek bir UPSERT ile yazılır.
+# Türetilmiş oran sütunları (cari_oran, borc_ozkaynak_orani, altman_z_skoru) yazma sırasında
+# app.risk_engine ile hesaplanır; okuma uçları bu sütunları yalnızca okur.
+
+from app import db
+from app.models import FinansalVeri
+from app.response_cache import veri_surumunu_artir
+from app.risk_engine import skorla, sutunlara_donustur, float_sutunlari, float_satirlarindan_sutunlar
+from sqlalchemy import insert, delete, update, select, tuple_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+import pandas as pd
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# pd.read_csv ile tek seferde okunacak satır sayısı
+DEFAULT_CHUNK_SIZE = 10000
+
+_ANAHTAR_SUTUNLAR = ('id', 'firma_id', 'donem')
+
+# Kaynak verilerden türetilen, her yazmada yeniden hesaplanan sütunlar (risk_engine model adlarıyla aynı)
+TURETILMIS_SUTUNLAR = ('cari_oran', 'borc_ozkaynak_orani', 'altman_z_skoru')
+
+# UPSERT ile yazılan değer sütunları (id/firma_id/donem hariç tüm model sütunları)
+DEGER_SUTUNLARI = [c.key for c in FinansalVeri.__table__.columns if c.key not in _ANAHTAR_SUTUNLAR]
+
+# CSV'de bulunmayan sütunlar, satır yeniden oluşturulmuş gibi model varsayılanlarına döner
+# (eski "sil + ekle" davranışıyla aynı sonuç).
+_VARSAYILAN_DEGERLER = {
+    c.key: (c.default.arg if c.default is not None and not callable(c.default.arg) else None)
+    for c in FinansalVeri.__table__.columns if c.key in DEGER_SUTUNLARI
+}
+
+
+def map_csv_columns(csv_sutunlari):
+    """
+    CSV başlıklarını bir kez model alanlarına eşler (küçük harf karşılaştırması).
+    (donem_sutunu, {csv_sutunu: model_alani}, bilinmeyen_sutunlar) döndürür.
+    """
+    donem_sutunu = None
+    eslesme = {}
+    bilinmeyen = []
+    for csv_sutunu in csv_sutunlari:
+        aday = str(csv_sutunu).strip().lower()
+        if aday == 'donem':
+            donem_sutunu = csv_sutunu
+        elif aday in DEGER_SUTUNLARI:
+            eslesme[csv_sutunu] = aday
+        else:
+            bilinmeyen.append(csv_sutunu)
+    return donem_sutunu, eslesme, bilinmeyen
+
+
+def prepare_financial_records(df, firma_id, donem_sutunu, eslesme):
+    """
+    Bir CSV parçasını sütun bazında (vektörel) dönüştürür ve UPSERT'e hazır kayıt
+    listesi döndürür. (kayitlar, atlanan_satir_sayisi, {alan: gecersiz_deger_sayisi})
+    """
+    donemler = df[donem_sutunu].astype('string').str.strip()
+    gecerli = donemler.notna() & (donemler != '')
+    atlanan = int((~gecerli).sum())
+    if atlanan:
+        df = df[gecerli]
+        donemler = donemler[gecerli]
+
+    veri = pd.DataFrame(index=df.index)
+    veri['firma_id'] = firma_id
+    veri['donem'] = donemler
+    gecersiz = {}
+    for csv_sutunu, alan in eslesme.items():
+        ham = df[csv_sutunu]
+        sayisal = pd.to_numeric(ham, errors='coerce')
+        hatali = int((ham.notna() & sayisal.isna()).sum())
+        if hatali:
+            gecersiz[alan] = hatali
+        veri[alan] = sayisal
+    for alan in DEGER_SUTUNLARI:
+        if alan not in veri.columns:
+            veri[alan] = _VARSAYILAN_DEGERLER[alan]
+
+    # Aynı dönem bir parçada birden çok kez geçiyorsa sonuncusu geçerlidir
+    # (tek bir ON CONFLICT ifadesi aynı satırı iki kez güncelleyemez).
+    veri = veri.drop_duplicates(subset='donem', keep='last')
+    veri = veri.astype(object).where(veri.notna(), None)
+    return veri.to_dict('records'), atlanan, gecersiz
+
+
+def _oranlar(sutunlar):
+    """ Sütun dizilerinden türetilmiş sütun listeleri (NaN -> None). """
+    sonuclar = skorla(sutunlar, TURETILMIS_SUTUNLAR)
+    return {
+        alan: [None if deger != deger else deger for deger in sonuclar[alan].tolist()]
+        for alan in TURETILMIS_SUTUNLAR
+    }
+
+
+def turetilmis_sutunlari_hesapla(kayitlar):
+    """ Kayıt sözlüklerindeki türetilmiş oran alanlarını (vektörel olarak) doldurur; dosyadaki değerler yok sayılır. """
+    if not kayitlar:
+        return kayitlar
+    oranlar = _oranlar(sutunlara_donustur(kayitlar))
+    for i, kayit in enumerate(kayitlar):
+        for alan in TURETILMIS_SUTUNLAR:
+            kayit[alan] = oranlar[alan][i]
+    return kayitlar
+
+
+def upsert_finansal_veri(kayitlar):
+    """
+    FinansalVeri kayıtlarını (firma_id, donem) üzerinde tek bir toplu UPSERT ile yazar.
+    PostgreSQL ve SQLite'ta INSERT ... ON CONFLICT DO UPDATE; diğer veritabanlarında
+    tek bir toplu DELETE + INSERT kullanılır. Türetilmiş oranlar yazmadan önce hesaplanır.
+    Commit çağırana aittir.
+    """
+    if not kayitlar:
+        return 0
+    turetilmis_sutunlari_hesapla(kayitlar)
+    tablo = FinansalVeri.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(tablo)
+        stmt = stmt.on_conflict_do_update(
+            constraint='_finansal_veri_firma_donem_uc',
+            set_={alan: stmt.excluded[alan] for alan in DEGER_SUTUNLARI},
+        )
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(tablo)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['firma_id', 'donem'],
+            set_={alan: stmt.excluded[alan] for alan in DEGER_SUTUNLARI},
+        )
+    else:
+        anahtarlar = {(k['firma_id'], k['donem']) for k in kayitlar}
+        db.session.execute(
+            delete(tablo).where(tuple_(tablo.c.firma_id, tablo.c.donem).in_(anahtarlar))
+        )
+        stmt = insert(tablo)
+
+    db.session.execute(stmt, kayitlar)
+    veri_surumunu_artir(*{k['firma_id'] for k in kayitlar})
+    return len(kayitlar)
+
+
+def recompute_derived_ratios(firma_id=None, parca=DEFAULT_CHUNK_SIZE):
+    """
+    Kayıtlı tüm (veya bir firmanın) FinansalVeri satırlarının türetilmiş oranlarını yeniden
+    hesaplar; formüller değiştiğinde kullanılır. id sırasıyla `parca` satırlık gruplar halinde
+    okunur, her grup tek bir toplu UPDATE (executemany) ile yazılıp commit edilir.
+    Güncellenen satır sayısını döndürür.
+    """
+    tablo = FinansalVeri.__table__
+    guncelle = (
+        update(tablo)
+        .where(tablo.c.id == bindparam('_id'))
+        .values({alan: bindparam(alan) for alan in TURETILMIS_SUTUNLAR})
+    )
+    son_id = toplam = 0
+    while True:
+        sorgu = select(tablo.c.id, *float_sutunlari(tablo)).where(tablo.c.id > son_id)
+        if firma_id is not None:
+            sorgu = sorgu.where(tablo.c.firma_id == firma_id)
+        satirlar = db.session.execute(sorgu.order_by(tablo.c.id).limit(parca)).all()
+        if not satirlar:
+            break
+        oranlar = _oranlar(float_satirlarindan_sutunlar(satirlar, bas=1))
+        parametreler = [
+            {'_id': satir[0], **{alan: oranlar[alan][i] for alan in TURETILMIS_SUTUNLAR}}
+            for i, satir in enumerate(satirlar)
+        ]
+        try:
+            db.session.execute(guncelle, parametreler)
+            if firma_id is not None:
+                veri_surumunu_artir(firma_id)
+            else:
+                veri_surumunu_artir(tumu=True)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        toplam += len(satirlar)
+        son_id = satirlar[-1][0]
+        if len(satirlar) < parca:
+            break
+    logger.info(f"Türetilmiş oranlar yeniden hesaplandı: {toplam} satır (firma: {firma_id or 'tümü'}).")
+    return toplam
+
+
+def ingest_financials_csv(firma_id, kaynak, chunksize=DEFAULT_CHUNK_SIZE, ilerleme=None):
+    """
+    Finansal veri CSV'sini (dosya yolu veya ikili dosya nesnesi) parça parça okuyup her
+    parçayı tek bir UPSERT ile yazar. Tüm dosya tek transaction'dır. 'Donem' sütunu yoksa ValueError fırlatır.
+    `ilerleme` verilirse her parçadan sonra ilerleme(okunan_satir, donem_sayisi) çağrılır ve
+    parça commit edilir; UPSERT idempotent olduğundan yarıda kalan dosya tekrar yüklenebilir.
+    """
+    okunan_satir = donem_sayisi = atlanan_satir = 0
+    gecersiz_toplam = {}
+    bilinmeyen = []
+    try:
+        # Diskteki dosyalar (spool) memory_map ile okunur.
+        okuyucu = pd.read_csv(kaynak, encoding='utf-8-sig', dtype=str, chunksize=chunksize,
+                              memory_map=isinstance(kaynak, (str, os.PathLike)))
+        eslesme = donem_sutunu = None
+        for parca in okuyucu:
+            if eslesme is None:
+                donem_sutunu, eslesme, bilinmeyen = map_csv_columns(parca.columns)
+                if donem_sutunu is None:
+                    raise ValueError("CSV dosyasında 'Donem' sütunu bulunamadı.")
+                if bilinmeyen:
+                    logger.warning(f"Firma {firma_id}: CSV sütunları modelde bulunamadı, yok sayılıyor: {bilinmeyen}")
+
+            kayitlar, atlanan, gecersiz = prepare_financial_records(parca, firma_id, donem_sutunu, eslesme)
+            donem_sayisi += upsert_finansal_veri(kayitlar)
+            okunan_satir += len(parca)
+            atlanan_satir += atlanan
+            for alan, sayi in gecersiz.items():
+                gecersiz_toplam[alan] = gecersiz_toplam.get(alan, 0) + sayi
+            if ilerleme is not None:
+                ilerleme(okunan_satir, donem_sayisi)
+                db.session.commit()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if atlanan_satir:
+        logger.warning(f"Firma {firma_id}: 'Donem' bilgisi eksik {atlanan_satir} satır atlandı.")
+    if gecersiz_toplam:
+        logger.warning(f"Firma {firma_id}: Geçersiz sayısal değerler None olarak ayarlandı: {gecersiz_toplam}")
+    return {
+        'okunan_satir': okunan_satir,
+        'donem_sayisi': donem_sayisi,
+        'atlanan_satir': atlanan_satir,
+        'gecersiz_degerler': gecersiz_toplam,
+        'bilinmeyen_sutunlar': [str(s) for s in bilinmeyen],
+    }
@@ -1,6 +1,8 @@
-from app.models import YevmiyeMaddesiBasligi, YevmiyeFisiSatiri, Firma
+from app.models import Firma, GunlukHesapBakiyesi
 from sqlalchemy import func, and_, or_
 from app import db
+from app.account_balance_service import get_cumulative_balances, get_period_balances, get_multi_period_balances
+from app.account_resolver import hesap_detayi as cozulmus_hesap_detayi
 from collections import defaultdict
 from datetime import date, timedelta
 import logging
@@ -42,6 +44,7 @@ HESAP_DETAYLARI = {
     '257': {'adi': 'BİRİKMİŞ AMORTİSMANLAR (-)', 'type': 'REG_A', 'normal_balance': 'C', 'fs_section': 'BILANCO_AKTIF', 'fs_group': 'II. DURAN VARLIKLAR', 'fs_sub_group': 'B. MADDİ DURAN VARLIKLAR'},
 
     # KISA VADELİ YABANCI KAYNAKLAR
+    '300': {'adi': 'BANKA KREDİLERİ', 'type': 'P', 'normal_balance': 'C', 'fs_section': 'BILANCO_PASIF', 'fs_group': 'III. KISA VADELİ YABANCI KAYNAKLAR', 'fs_sub_group': 'A. MALİ BORÇLAR'},
     '320': {'adi': 'SATICILAR', 'type': 'P', 'normal_balance': 'C', 'fs_section': 'BILANCO_PASIF', 'fs_group': 'III. KISA VADELİ YABANCI KAYNAKLAR', 'fs_sub_group': 'B. TİCARİ BORÇLAR'},
     '391': {'adi': 'HESAPLANAN KDV', 'type': 'P', 'normal_balance': 'C', 'fs_section': 'BILANCO_PASIF', 'fs_group': 'III. KISA VADELİ YABANCI KAYNAKLAR', 'fs_sub_group': 'E. ÖDENECEK VERGİ VE DİĞER YÜKÜMLÜLÜKLER'},
 
@@ -77,6 +80,7 @@ BILANCO_YAPISI = {
     },
     "PASIFLER": {
         "III. KISA VADELİ YABANCI KAYNAKLAR": {
+            "A. MALİ BORÇLAR": ['300'],
             "B. TİCARİ BORÇLAR": ['320'],
             "E. ÖDENECEK VERGİ VE DİĞER YÜKÜMLÜLÜKLER": ['360','391']
         },
@@ -108,6 +112,45 @@ GELIR_TABLOSU_YAPISI = [
 ]
 
 
+def _yuvarla(deger):
+    return Decimal(deger or 0.0).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _net(hesap_detayi, borc, alacak):
+    """ Hesabın normal bakiye yönüne göre net tutar (borç karakterliyse B-A, alacak karakterliyse A-B). """
+    if hesap_detayi['normal_balance'] == 'D':
+        return borc - alacak
+    elif hesap_detayi['normal_balance'] == 'C':
+        return alacak - borc
+    return Decimal(0)
+
+
+def _donem_sonu_kaydi(hesap_detayi, kümülatif_borc, kümülatif_alacak):
+    return {
+        'adi': hesap_detayi['adi'],
+        'kümülatif_borc': kümülatif_borc,
+        'kümülatif_alacak': kümülatif_alacak,
+        'dönem_sonu_bakiye': _net(hesap_detayi, kümülatif_borc, kümülatif_alacak),
+        'normal_balance': hesap_detayi['normal_balance'],
+        'fs_impact_bilanco': hesap_detayi.get('fs_impact_bilanco', 0), # Varsayılan 0, sadece map'te olanlar etki etsin
+        'bilanco_grup': hesap_detayi.get('bilanco_grup')
+    }
+
+
+def _donem_hareketi_kaydi(hesap_detayi, donem_borc, donem_alacak):
+    # Gelir tablosu hesapları için dönem içi net hareket
+    # (borç karakterli gider/maliyet/indirim hesaplarında B-A, gelir hesaplarında A-B)
+    return {
+        'adi': hesap_detayi['adi'],
+        'donem_borc_hareket': donem_borc,
+        'donem_alacak_hareket': donem_alacak,
+        'net_donem_hareketi': _net(hesap_detayi, donem_borc, donem_alacak),
+        'normal_balance': hesap_detayi['normal_balance'],
+        'fs_impact_gelir_tablosu': hesap_detayi.get('fs_impact_gelir_tablosu', 0),
+        'gelir_tablosu_grup': hesap_detayi.get('gelir_tablosu_grup')
+    }
+
+
 def get_donem_sonu_bakiyeleri(firma_id: int, donem_bitis_date: date):
     """
     Belirtilen firma ve dönem sonu tarihi itibarıyla tüm hesapların
@@ -115,44 +158,15 @@ def get_donem_sonu_bakiyeleri(firma_id: int, donem_bitis_date: date):
     Bu, Bilanço için gereklidir.
     """
     try:
-        results = db.session.query(
-            YevmiyeFisiSatiri.hesap_kodu,
-            func.sum(YevmiyeFisiSatiri.borc_tutari).label('kümülatif_borc'),
-            func.sum(YevmiyeFisiSatiri.alacak_tutari).label('kümülatif_alacak')
-        ).join(YevmiyeMaddesiBasligi, YevmiyeFisiSatiri.yevmiye_maddesi_id == YevmiyeMaddesiBasligi.id)\
-        .filter(
-            YevmiyeMaddesiBasligi.firma_id == firma_id,
-            YevmiyeFisiSatiri.muhasebe_kayit_tarihi <= donem_bitis_date # O tarihe kadar olan TÜM hareketler
-        ).group_by(
-            YevmiyeFisiSatiri.hesap_kodu
-        ).all()
+        # Ay sonu anlık görüntüsü + ay içi günlük bakiyeler (bkz. account_balance_service).
+        toplamlar = get_cumulative_balances(firma_id, donem_bitis_date)
 
         hesap_bakiyeleri = {}
-        for row in results:
-            hesap_kodu = row.hesap_kodu
-            kümülatif_borc = Decimal(row.kümülatif_borc or 0.0).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            kümülatif_alacak = Decimal(row.kümülatif_alacak or 0.0).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            
-            hesap_detayi = HESAP_DETAYLARI.get(hesap_kodu) or HESAP_DETAYLARI.get(hesap_kodu[:3])
+        for hesap_kodu, (borc, alacak) in toplamlar.items():
+            hesap_detayi = cozulmus_hesap_detayi(hesap_kodu, f"firma {firma_id}")
             if not hesap_detayi:
-                logger.warning(f"Firma {firma_id}, Dönem Sonu {donem_bitis_date}: Bakiye hesaplamada bilinmeyen hesap kodu {hesap_kodu}.")
                 continue
-
-            net_bakiye = Decimal(0)
-            if hesap_detayi['normal_balance'] == 'D':
-                net_bakiye = kümülatif_borc - kümülatif_alacak
-            elif hesap_detayi['normal_balance'] == 'C':
-                net_bakiye = kümülatif_alacak - kümülatif_borc
-                
-            hesap_bakiyeleri[hesap_kodu] = {
-                'adi': hesap_detayi['adi'],
-                'kümülatif_borc': kümülatif_borc,
-                'kümülatif_alacak': kümülatif_alacak,
-                'dönem_sonu_bakiye': net_bakiye,
-                'normal_balance': hesap_detayi['normal_balance'],
-                'fs_impact_bilanco': hesap_detayi.get('fs_impact_bilanco', 0), # Varsayılan 0, sadece map'te olanlar etki etsin
-                'bilanco_grup': hesap_detayi.get('bilanco_grup')
-            }
+            hesap_bakiyeleri[hesap_kodu] = _donem_sonu_kaydi(hesap_detayi, _yuvarla(borc), _yuvarla(alacak))
         logger.info(f"Firma {firma_id}, Dönem Sonu {donem_bitis_date} için {len(hesap_bakiyeleri)} hesabın kümülatif bakiyesi hesaplandı.")
         return hesap_bakiyeleri
     except Exception as e:
@@ -166,54 +180,86 @@ def get_donem_ici_hareketler(firma_id: int, donem_baslangic_date: date, donem_bi
     Bu, Gelir Tablosu için gereklidir.
     """
     try:
-        # Bu fonksiyon bir önceki yanıttaki get_hesap_bakiyeleri_for_period ile aynı mantıkta
-        # Sadece ismi daha açıklayıcı oldu.
         results = db.session.query(
-            YevmiyeFisiSatiri.hesap_kodu,
-            func.sum(YevmiyeFisiSatiri.borc_tutari).label('donem_borc_hareket'),
-            func.sum(YevmiyeFisiSatiri.alacak_tutari).label('donem_alacak_hareket')
-        ).join(YevmiyeMaddesiBasligi, YevmiyeFisiSatiri.yevmiye_maddesi_id == YevmiyeMaddesiBasligi.id)\
-        .filter(
-            YevmiyeMaddesiBasligi.firma_id == firma_id,
-            YevmiyeFisiSatiri.muhasebe_kayit_tarihi >= donem_baslangic_date,
-            YevmiyeFisiSatiri.muhasebe_kayit_tarihi <= donem_bitis_date
+            GunlukHesapBakiyesi.hesap_kodu,
+            func.sum(GunlukHesapBakiyesi.borc_toplami).label('donem_borc_hareket'),
+            func.sum(GunlukHesapBakiyesi.alacak_toplami).label('donem_alacak_hareket')
+        ).filter(
+            GunlukHesapBakiyesi.firma_id == firma_id,
+            GunlukHesapBakiyesi.gun >= donem_baslangic_date,
+            GunlukHesapBakiyesi.gun <= donem_bitis_date
         ).group_by(
-            YevmiyeFisiSatiri.hesap_kodu
+            GunlukHesapBakiyesi.hesap_kodu
         ).all()
 
         hesap_hareketleri = {}
         for row in results:
             hesap_kodu = row.hesap_kodu
-            donem_borc = Decimal(row.donem_borc_hareket or 0.0).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            donem_alacak = Decimal(row.donem_alacak_hareket or 0.0).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            
-            hesap_detayi = HESAP_DETAYLARI.get(hesap_kodu) or HESAP_DETAYLARI.get(hesap_kodu[:3])
+            hesap_detayi = cozulmus_hesap_detayi(hesap_kodu, f"firma {firma_id}")
             if not hesap_detayi:
-                logger.warning(f"Firma {firma_id}, Dönem {donem_baslangic_date}-{donem_bitis_date}: Hareket hesaplamada bilinmeyen hesap kodu {hesap_kodu}.")
                 continue
-            
-            # Gelir tablosu hesapları için dönem içi net hareket
-            net_hareket = Decimal(0)
-            if hesap_detayi['normal_balance'] == 'D': # Gider/Maliyet/İndirim hesapları
-                net_hareket = donem_borc - donem_alacak
-            elif hesap_detayi['normal_balance'] == 'C': # Gelir hesapları
-                net_hareket = donem_alacak - donem_borc
-                
-            hesap_hareketleri[hesap_kodu] = {
-                'adi': hesap_detayi['adi'],
-                'donem_borc_hareket': donem_borc,
-                'donem_alacak_hareket': donem_alacak,
-                'net_donem_hareketi': net_hareket,
-                'normal_balance': hesap_detayi['normal_balance'],
-                'fs_impact_gelir_tablosu': hesap_detayi.get('fs_impact_gelir_tablosu', 0),
-                'gelir_tablosu_grup': hesap_detayi.get('gelir_tablosu_grup')
-            }
+            hesap_hareketleri[hesap_kodu] = _donem_hareketi_kaydi(
+                hesap_detayi, _yuvarla(row.donem_borc_hareket), _yuvarla(row.donem_alacak_hareket)
+            )
         logger.info(f"Firma {firma_id}, Dönem {donem_baslangic_date}-{donem_bitis_date} için {len(hesap_hareketleri)} hesabın dönem içi hareketi hesaplandı.")
         return hesap_hareketleri
     except Exception as e:
         logger.error(f"get_donem_ici_hareketler hata: {e}", exc_info=True)
         raise
 
+
+def get_donem_bakiyeleri_ve_hareketleri(firma_id: int, donem_baslangic_date: date, donem_bitis_date: date):
+    """
+    Bilanço ve gelir tablosu için gereken iki veri setini tek sorgudan üretir:
+    (get_donem_sonu_bakiyeleri, get_donem_ici_hareketler) ile aynı biçimde iki sözlük döner.
+    Kümülatif ve dönem içi toplamlar koşullu toplama ile aynı taramada hesaplanır.
+    """
+    try:
+        toplamlar = get_period_balances(firma_id, donem_baslangic_date, donem_bitis_date)
+
+        hesap_bakiyeleri = {}
+        hesap_hareketleri = {}
+        for hesap_kodu, (borc, alacak, donem_borc, donem_alacak) in toplamlar.items():
+            hesap_detayi = cozulmus_hesap_detayi(hesap_kodu, f"firma {firma_id}")
+            if not hesap_detayi:
+                continue
+            hesap_bakiyeleri[hesap_kodu] = _donem_sonu_kaydi(hesap_detayi, _yuvarla(borc), _yuvarla(alacak))
+            # get_donem_ici_hareketler yalnızca dönem içinde satırı olan hesapları döndürür
+            if donem_borc or donem_alacak:
+                hesap_hareketleri[hesap_kodu] = _donem_hareketi_kaydi(hesap_detayi, _yuvarla(donem_borc), _yuvarla(donem_alacak))
+        logger.info(f"Firma {firma_id}, Dönem {donem_baslangic_date}-{donem_bitis_date} için {len(hesap_bakiyeleri)} hesabın bakiyesi ve {len(hesap_hareketleri)} hesabın hareketi hesaplandı.")
+        return hesap_bakiyeleri, hesap_hareketleri
+    except Exception as e:
+        logger.error(f"get_donem_bakiyeleri_ve_hareketleri hata: {e}", exc_info=True)
+        raise
+
+
+def get_donemsel_bakiyeler_ve_hareketler(firma_id: int, donemler):
+    """
+    Karşılaştırmalı tablolar için get_donem_bakiyeleri_ve_hareketleri'nin çok dönemli hali:
+    `donemler` ((baslangic, bitis) listesi, artan ve çakışmasız) sırasıyla her dönem için
+    (hesap_bakiyeleri, hesap_hareketleri) çifti döner. Tüm dönemler tek sorgudan üretilir.
+    """
+    try:
+        toplamlar = get_multi_period_balances(firma_id, donemler)
+
+        sonuc = [({}, {}) for _ in donemler]
+        for hesap_kodu, donemsel in toplamlar.items():
+            hesap_detayi = cozulmus_hesap_detayi(hesap_kodu, f"firma {firma_id}")
+            if not hesap_detayi:
+                continue
+            for (hesap_bakiyeleri, hesap_hareketleri), (borc, alacak, donem_borc, donem_alacak) in zip(sonuc, donemsel):
+                if not (borc or alacak):
+                    continue  # ilk hareketinden önceki dönemlerde hesap yok sayılır
+                hesap_bakiyeleri[hesap_kodu] = _donem_sonu_kaydi(hesap_detayi, _yuvarla(borc), _yuvarla(alacak))
+                if donem_borc or donem_alacak:
+                    hesap_hareketleri[hesap_kodu] = _donem_hareketi_kaydi(hesap_detayi, _yuvarla(donem_borc), _yuvarla(donem_alacak))
+        logger.info(f"Firma {firma_id}, {len(donemler)} dönem ({donemler[0][0]}-{donemler[-1][1]}) için {len(toplamlar)} hesabın bakiye ve hareketleri hesaplandı.")
+        return sonuc
+    except Exception as e:
+        logger.error(f"get_donemsel_bakiyeler_ve_hareketler hata: {e}", exc_info=True)
+        raise
+
 def _generate_fs_recursive(hesap_verileri, yapi_seviyesi, anahtar_bakiye_alanı, anahtar_impact_alanı, anahtar_grup_alanı):
     """ Mali tablo kalemlerini ve alt toplamlarını rekürsif olarak hesaplar. """
     kalem_sonuclari = {}
@@ -296,6 +342,7 @@ def generate_bilanco_v3(donem_sonu_bakiyeleri):
 
 def generate_gelir_tablosu_v3(donem_ici_hareketler):
     gelir_tablosu_sonuclari = {}
+    kalem_tutarlari = {} # Ara toplam hesaplamaları detaylı kalemlerde de tutar görsün
     logger.info("Gelir Tablosu v3 oluşturuluyor...")
     
     try:
@@ -303,7 +350,8 @@ def generate_gelir_tablosu_v3(donem_ici_hareketler):
             kalem_adi = item['kalem_adi']
             if 'hesaplama' in item and callable(item['hesaplama']):
                 # Ara toplamlar veya özel hesaplamalar
-                gelir_tablosu_sonuclari[kalem_adi] = item['hesaplama'](gelir_tablosu_sonuclari)
+                kalem_tutarlari[kalem_adi] = item['hesaplama'](kalem_tutarlari)
+                gelir_tablosu_sonuclari[kalem_adi] = kalem_tutarlari[kalem_adi]
             elif 'hesap_gruplari' in item:
                 kalem_toplami = Decimal(0)
                 detaylar = {}
@@ -316,6 +364,7 @@ def generate_gelir_tablosu_v3(donem_ici_hareketler):
                             etkilenmis_hareket = hareket * Decimal(hesap_data.get('fs_impact_gelir_tablosu', 1))
                             detaylar[f"{kod} {hesap_data.get('adi','')}"] = etkilenmis_hareket
                             kalem_toplami += etkilenmis_hareket
+                kalem_tutarlari[kalem_adi] = kalem_toplami
                 gelir_tablosu_sonuclari[kalem_adi] = {
                     "TUTAR": kalem_toplami,
                     "DETAY": detaylar
@@ -0,0 +1,317 @@
+# app/jobs.py
+# Harici bir kuyruk sunucusu (broker) gerektirmeyen arka plan içe aktarma işleri.
+# Yükleme endpoint'leri dosyayı diske alır (spool), ice_aktarma_isi tablosuna bir kayıt
+# ekler ve iş kimliğini döndürür. Her süreçteki (gunicorn worker) bir thread havuzu işi
+# veritabanında atomik olarak sahiplenir (beklemede -> calisiyor), dosyayı işler ve
+# ilerlemeyi aynı tabloya yazar. Böylece /jobs/<id> herhangi bir worker'dan sorgulanabilir.
+#
+# Her süreç ilk isteğinde, süreci ölmüş (INGEST_JOB_TIMEOUT boyunca ilerleme yazmamış)
+# 'calisiyor' işleri 'hata'ya çeker ve yarım kalan içe aktarmalarını geri alır; ardından
+# 'beklemede' işleri kuyruğa alır. Hata ile biten işlerin spool dosyası silinmez, iş
+# retry_job (POST /jobs/<id>/yeniden_dene) ile yeniden kuyruğa alınabilir.
+
+from app import db
+from app.models import IceAktarmaIsi
+from sqlalchemy import update
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# İş türü -> işleyici fonksiyon. İşleyici imzası: handler(is_kaydi, ilerleme) -> sonuç sözlüğü
+JOB_HANDLERS = {}
+# İş türü -> yarıda kalmış işin kısmi sonuçlarını geri alan fonksiyon: cleanup(is_kaydi, zaman_asimi)
+JOB_CLEANUPS = {}
+
+
+def job_handler(tur):
+    """ Bir fonksiyonu verilen iş türünün işleyicisi olarak kaydeder. """
+    def decorator(fonksiyon):
+        JOB_HANDLERS[tur] = fonksiyon
+        return fonksiyon
+    return decorator
+
+
+def job_cleanup(*turler):
+    """ Bir fonksiyonu verilen iş türlerinin yarıda kalma temizleyicisi olarak kaydeder. """
+    def decorator(fonksiyon):
+        for tur in turler:
+            JOB_CLEANUPS[tur] = fonksiyon
+        return fonksiyon
+    return decorator
+
+
+class IngestionJobQueue:
+    """ Süreç içi (in-process) thread havuzu; iş durumu veritabanında tutulur. """
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+        self._kurtarildi = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('INGEST_WORKERS', int(os.environ.get('INGEST_WORKERS', 2)))
+        app.config.setdefault('INGEST_SPOOL_DIR', os.environ.get('INGEST_SPOOL_DIR') or os.path.join(app.instance_path, 'spool'))
+        app.config.setdefault('INGEST_JOB_TIMEOUT', int(os.environ.get('INGEST_JOB_TIMEOUT', 900)))
+        os.makedirs(app.config['INGEST_SPOOL_DIR'], exist_ok=True)
+        app.extensions['ingest_jobs'] = self
+        self._app = app
+        self._kurtarildi = False
+        app.before_request(self._ilk_istek)
+
+    def _ilk_istek(self):
+        """ Süreçteki ilk istekte (gunicorn fork'undan sonra) yarıda kalmış ve bekleyen işler ele alınır. """
+        if self._kurtarildi:
+            return
+        with self._lock:
+            if self._kurtarildi:
+                return
+            self._kurtarildi = True
+        try:
+            self.kurtar()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Yarıda kalan içe aktarma işleri kurtarılamadı: {e}", exc_info=True)
+
+    def kurtar(self):
+        """
+        Ölmüş işleri temizler (bkz. recover_stale_jobs) ve önceki bir süreçten kalmış 'beklemede'
+        işleri kuyruğa alır. Aynı iş iki kez kuyruğa alınsa da yalnızca biri sahiplenebilir.
+        """
+        recover_stale_jobs(timedelta(seconds=self._app.config['INGEST_JOB_TIMEOUT']))
+        if self._app.config['INGEST_WORKERS'] <= 0:
+            return
+        havuz = self._havuz()
+        for (is_id,) in db.session.query(IceAktarmaIsi.id).filter_by(durum='beklemede').all():
+            havuz.submit(self._calistir, is_id)
+
+    def _havuz(self):
+        """ Havuz ilk istekte ya da ilk iş geldiğinde başlatılır (gunicorn fork'undan sonra, her worker'da ayrı). """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._app.config['INGEST_WORKERS'], thread_name_prefix='ingest'
+                )
+            return self._executor
+
+    def submit(self, is_id):
+        """ İşi kuyruğa alır. INGEST_WORKERS=0 ise iş istek içinde senkron çalıştırılır. """
+        if self._app.config['INGEST_WORKERS'] <= 0:
+            self._calistir(is_id)
+        else:
+            self._havuz().submit(self._calistir, is_id)
+
+    def _calistir(self, is_id):
+        with self._app.app_context():
+            try:
+                run_job(is_id)
+            finally:
+                db.session.remove()
+
+
+job_queue = IngestionJobQueue()
+
+
+def spool_upload(file_storage, spool_dir=None):
+    """ Yüklenen dosyayı belleğe almadan (parça parça kopyalayarak) spool dizinine yazar. """
+    from flask import current_app
+    spool_dir = spool_dir or current_app.config['INGEST_SPOOL_DIR']
+    uzanti = os.path.splitext(file_storage.filename or '')[1].lower()
+    yol = os.path.join(spool_dir, f"{uuid.uuid4().hex}{uzanti}")
+    file_storage.save(yol)
+    return yol
+
+
+def recover_stale_jobs(zaman_asimi):
+    """
+    `zaman_asimi` boyunca ilerleme yazmamış 'calisiyor' işleri (süreci ölmüş) atomik olarak
+    'hata'ya çeker ve türünün temizleyicisiyle kısmi içe aktarmasını geri alır. Spool dosyası
+    korunur; iş retry_job ile yeniden denenebilir. Kurtarılan iş sayısını döndürür.
+    """
+    tablo = IceAktarmaIsi.__table__
+    sinir = datetime.utcnow() - zaman_asimi
+    adaylar = [i for (i,) in db.session.query(IceAktarmaIsi.id).filter(
+        IceAktarmaIsi.durum == 'calisiyor', IceAktarmaIsi.guncellenme_tarihi < sinir,
+    ).all()]
+    kurtarilan = 0
+    for is_id in adaylar:
+        sonuc = db.session.execute(
+            update(tablo)
+            .where(tablo.c.id == is_id, tablo.c.durum == 'calisiyor', tablo.c.guncellenme_tarihi < sinir)
+            .values(durum='hata', bitis_tarihi=datetime.utcnow(),
+                    hata_mesaji="İş yarıda kaldı (işleyen süreç sonlandı); kısmi sonuçlar geri alındı.")
+        )
+        db.session.commit()
+        if sonuc.rowcount != 1:
+            continue  # Başka bir worker kurtardı
+        is_kaydi = db.session.get(IceAktarmaIsi, is_id)
+        logger.warning(f"İçe aktarma işi {is_id} (Firma {is_kaydi.firma_id}) yarıda kalmış, hata olarak işaretlendi.")
+        temizleyici = JOB_CLEANUPS.get(is_kaydi.tur)
+        if temizleyici is not None:
+            temizleyici(is_kaydi, zaman_asimi)
+        is_kaydi.eklenen_satir = 0
+        db.session.commit()
+        kurtarilan += 1
+    return kurtarilan
+
+
+def retry_job(is_id):
+    """
+    Hata ile bitmiş bir işi (spool dosyası hâlâ duruyorsa) sayaçlarını sıfırlayıp yeniden kuyruğa alır.
+    İş yoksa None döner; iş 'hata' durumunda değilse ya da dosyası yoksa ValueError fırlatır.
+    """
+    is_kaydi = db.session.get(IceAktarmaIsi, is_id)
+    if is_kaydi is None:
+        return None
+    if not os.path.exists(is_kaydi.dosya_yolu):
+        raise ValueError("İşin yükleme dosyası artık mevcut değil; dosyayı yeniden yükleyin.")
+    tablo = IceAktarmaIsi.__table__
+    sonuc = db.session.execute(
+        update(tablo)
+        .where(tablo.c.id == is_id, tablo.c.durum == 'hata')
+        .values(durum='beklemede', okunan_satir=0, eklenen_satir=0, hata_mesaji=None, sonuc=None,
+                baslama_tarihi=None, bitis_tarihi=None)
+    )
+    db.session.commit()
+    if sonuc.rowcount != 1:
+        raise ValueError(f"Yalnızca hata ile bitmiş işler yeniden denenebilir (durum: {is_kaydi.durum}).")
+    job_queue.submit(is_id)
+    db.session.refresh(is_kaydi)
+    return is_kaydi
+
+
+def create_job(firma_id, tur, dosya_yolu, orjinal_dosya_adi=None, user_id=None):
+    """ Yeni bir 'beklemede' içe aktarma işini oturuma ekler; commit ve kuyruğa alma çağıranındır. """
+    if tur not in JOB_HANDLERS:
+        raise ValueError(f"Bilinmeyen iş türü: {tur}")
+    is_kaydi = IceAktarmaIsi(
+        id=uuid.uuid4().hex, firma_id=firma_id, user_id=user_id, tur=tur,
+        durum='beklemede', dosya_yolu=dosya_yolu, orjinal_dosya_adi=orjinal_dosya_adi,
+    )
+    db.session.add(is_kaydi)
+    return is_kaydi
+
+
+def enqueue_job(firma_id, tur, dosya_yolu, orjinal_dosya_adi=None, user_id=None):
+    """ Yeni bir içe aktarma işi oluşturur, commit eder ve kuyruğa alır. """
+    is_kaydi = create_job(firma_id, tur, dosya_yolu, orjinal_dosya_adi, user_id)
+    db.session.commit()
+    job_queue.submit(is_kaydi.id)
+    return is_kaydi
+
+
+def _sahiplen(is_id):
+    """ İşi atomik olarak 'calisiyor' durumuna alır; başka bir worker aldıysa False döner. """
+    tablo = IceAktarmaIsi.__table__
+    sonuc = db.session.execute(
+        update(tablo)
+        .where(tablo.c.id == is_id, tablo.c.durum == 'beklemede')
+        .values(durum='calisiyor', baslama_tarihi=datetime.utcnow(), guncellenme_tarihi=datetime.utcnow())
+    )
+    db.session.commit()
+    return sonuc.rowcount == 1
+
+
+def run_job(is_id):
+    """
+    Bir işi sahiplenip çalıştırır ve sonucu/hatayı iş kaydına yazar. Spool dosyası yalnızca iş
+    başarıyla tamamlanınca silinir; hata durumunda iş retry_job ile yeniden denenebilir.
+    """
+    if not _sahiplen(is_id):
+        return
+    is_kaydi = db.session.get(IceAktarmaIsi, is_id)
+    handler = JOB_HANDLERS.get(is_kaydi.tur)
+
+    def ilerleme(okunan_satir, eklenen_satir):
+        # Çağıran (servis katmanı) bu güncellemeyi batch ile birlikte commit eder.
+        is_kaydi.okunan_satir = okunan_satir
+        is_kaydi.eklenen_satir = eklenen_satir
+        is_kaydi.guncellenme_tarihi = datetime.utcnow()
+
+    try:
+        if handler is None:
+            raise ValueError(f"Bilinmeyen iş türü: {is_kaydi.tur}")
+        sonuc = handler(is_kaydi, ilerleme)
+        is_kaydi.sonuc = sonuc
+        is_kaydi.durum = 'tamamlandi'
+        is_kaydi.bitis_tarihi = datetime.utcnow()
+        db.session.commit()
+        logger.info(f"İçe aktarma işi {is_id} tamamlandı (Firma {is_kaydi.firma_id}): {sonuc}")
+        try:
+            os.remove(is_kaydi.dosya_yolu)
+        except OSError:
+            pass
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"İçe aktarma işi {is_id} hata ile sonuçlandı: {e}", exc_info=True)
+        is_kaydi = db.session.get(IceAktarmaIsi, is_id)
+        is_kaydi.durum = 'hata'
+        is_kaydi.hata_mesaji = str(e)
+        is_kaydi.bitis_tarihi = datetime.utcnow()
+        db.session.commit()
+
+
+def serialize_job(is_kaydi):
+    return {
+        "id": is_kaydi.id,
+        "firma_id": is_kaydi.firma_id,
+        "tur": is_kaydi.tur,
+        "durum": is_kaydi.durum,
+        "orjinal_dosya_adi": is_kaydi.orjinal_dosya_adi,
+        "okunan_satir": is_kaydi.okunan_satir,
+        "eklenen_satir": is_kaydi.eklenen_satir,
+        "hata_mesaji": is_kaydi.hata_mesaji,
+        "sonuc": is_kaydi.sonuc,
+        "olusturulma_tarihi": is_kaydi.olusturulma_tarihi.isoformat() if is_kaydi.olusturulma_tarihi else None,
+        "baslama_tarihi": is_kaydi.baslama_tarihi.isoformat() if is_kaydi.baslama_tarihi else None,
+        "bitis_tarihi": is_kaydi.bitis_tarihi.isoformat() if is_kaydi.bitis_tarihi else None,
+        "guncellenme_tarihi": is_kaydi.guncellenme_tarihi.isoformat() if is_kaydi.guncellenme_tarihi else None,
+    }
+
+
+# === İŞ TÜRLERİ ===
+@job_handler('edefter_xml')
+def _edefter_xml_isi(is_kaydi, ilerleme):
+    from app.edefter_service import ingest_edefter_xml
+    sonuc = ingest_edefter_xml(
+        is_kaydi.firma_id, is_kaydi.dosya_yolu, dosya_adi=is_kaydi.orjinal_dosya_adi,
+        ilerleme=ilerleme,
+    )
+    if sonuc['madde_sayisi'] == 0 and not sonuc.get('mukerrer_dosya') and not sonuc['atlanan_madde_sayisi']:
+        raise ValueError("E-defter dosyasında yevmiye maddesi (gl-cor:entryHeader) bulunamadı.")
+    return sonuc
+
+
+@job_cleanup('edefter_xml', 'edefter_zip')
+def _edefter_temizle(is_kaydi, zaman_asimi):
+    from app.edefter_service import yarim_kalan_ice_aktarmalari_temizle
+    yarim_kalan_ice_aktarmalari_temizle(is_kaydi.firma_id, zaman_asimi)
+
+
+# finansal_csv için temizleyici yoktur: UPSERT idempotent olduğundan dosya yeniden yüklenebilir.
+@job_handler('finansal_csv')
+def _finansal_csv_isi(is_kaydi, ilerleme):
+    from app.financial_data_service import ingest_financials_csv
+    sonuc = ingest_financials_csv(is_kaydi.firma_id, is_kaydi.dosya_yolu, ilerleme=ilerleme)
+    if sonuc['donem_sayisi'] == 0:
+        raise ValueError("CSV'den işlenecek geçerli veri satırı bulunamadı.")
+    return sonuc
+
+
+@job_handler('edefter_zip')
+def _edefter_zip_isi(is_kaydi, ilerleme):
+    from flask import current_app
+    from app.edefter_zip_service import ingest_edefter_zip
+    sonuc = ingest_edefter_zip(
+        is_kaydi.firma_id, is_kaydi.dosya_yolu,
+        max_workers=current_app.config.get('EDEFTER_ZIP_WORKERS'), ilerleme=ilerleme,
+        dosya_adi=is_kaydi.orjinal_dosya_adi,
+    )
+    if sonuc['madde_sayisi'] == 0 and not sonuc.get('mukerrer_dosya') and not sonuc['atlanan_madde_sayisi']:
+        raise ValueError("ZIP arşivindeki dosyalarda yevmiye maddesi (gl-cor:entryHeader) bulunamadı.")
+    return sonuc
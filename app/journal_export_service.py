@@ -0,0 +1,117 @@
+# app/journal_export_service.py
+# Yevmiye satırlarının (başlık bilgileriyle birlikte) NDJSON / CSV olarak dışa aktarımı.
+# Sorgu sunucu tarafı imleçle (stream_results + yield_per) okunur: PostgreSQL'de adlandırılmış
+# imleç, SQLite'ta satır satır fetch kullanılır. Satırlar yield_per büyüklüğündeki parçalar
+# halinde metne çevrilip üretilir; bellek kullanımı toplam satır sayısından bağımsızdır ve
+# ilk parça okunur okunmaz yanıt gönderilmeye başlanır.
+
+from app import db
+from app.models import YevmiyeMaddesiBasligi, YevmiyeFisiSatiri
+from sqlalchemy import select
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+VARSAYILAN_PARCA = 5000
+
+_satir = YevmiyeFisiSatiri.__table__
+_baslik = YevmiyeMaddesiBasligi.__table__
+
+# Çıktı alanı -> sütun (sıra CSV başlık sırasıdır)
+DISA_AKTARIM_ALANLARI = {
+    'madde_id': _baslik.c.id,
+    'yevmiye_madde_no': _baslik.c.yevmiye_madde_no_counter,
+    'muhasebe_fis_no': _baslik.c.muhasebe_fis_no,
+    'kayit_tarihi_giris': _baslik.c.kayit_tarihi_giris,
+    'aciklama_baslik': _baslik.c.aciklama_baslik,
+    'satir_id': _satir.c.id,
+    'muhasebe_kayit_tarihi': _satir.c.muhasebe_kayit_tarihi,
+    'hesap_kodu': _satir.c.hesap_kodu,
+    'hesap_adi': _satir.c.hesap_adi,
+    'alt_hesap_kodu': _satir.c.alt_hesap_kodu,
+    'alt_hesap_adi': _satir.c.alt_hesap_adi,
+    'borc_tutari': _satir.c.borc_tutari,
+    'alacak_tutari': _satir.c.alacak_tutari,
+    'aciklama_satir': _satir.c.aciklama_satir,
+    'belge_tipi': _satir.c.belge_tipi,
+    'belge_tipi_aciklama': _satir.c.belge_tipi_aciklama,
+    'belge_no': _satir.c.belge_no,
+    'belge_tarihi': _satir.c.belge_tarihi,
+    'belge_referansi': _satir.c.belge_referansi,
+    'odeme_yontemi': _satir.c.odeme_yontemi,
+}
+
+
+def yevmiye_sorgusu(firma_id, baslangic=None, bitis=None, hesap_kodu=None, belge_no=None):
+    """
+    Firmanın yevmiye satırlarını başlıklarıyla birlikte (muhasebe_kayit_tarihi, id) sırasıyla
+    seçen sorgu. `hesap_kodu` önek olarak eşleşir (120 -> 120, 120.01 ...); `belge_no` tam eşleşir.
+    Satırdaki firma_id ve (firma_id, muhasebe_kayit_tarihi, ...) indeksi kullanılır.
+    """
+    sorgu = (
+        select(*(sutun.label(ad) for ad, sutun in DISA_AKTARIM_ALANLARI.items()))
+        .select_from(_satir.join(_baslik, _baslik.c.id == _satir.c.yevmiye_maddesi_id))
+        .where(_satir.c.firma_id == firma_id)
+    )
+    if baslangic is not None:
+        sorgu = sorgu.where(_satir.c.muhasebe_kayit_tarihi >= baslangic)
+    if bitis is not None:
+        sorgu = sorgu.where(_satir.c.muhasebe_kayit_tarihi <= bitis)
+    if hesap_kodu:
+        sorgu = sorgu.where(_satir.c.hesap_kodu.startswith(hesap_kodu, autoescape=True))
+    if belge_no:
+        sorgu = sorgu.where(_satir.c.belge_no == belge_no)
+    return sorgu.order_by(_satir.c.muhasebe_kayit_tarihi, _satir.c.id)
+
+
+def iter_yevmiye_parcalari(sorgu, parca=VARSAYILAN_PARCA):
+    """ Sorgu sonucunu sunucu tarafı imleçle okuyup `parca` satırlık tuple listeleri üretir. """
+    sonuc = db.session.execute(sorgu.execution_options(stream_results=True, yield_per=parca))
+    try:
+        for satirlar in sonuc.partitions():
+            yield satirlar
+    finally:
+        sonuc.close()
+
+
+def _metin(deger):
+    # Decimal -> '1250.00', date -> 'YYYY-AA-GG'
+    return None if deger is None else str(deger)
+
+
+def iter_ndjson(sorgu, parca=VARSAYILAN_PARCA):
+    """ Satır başına bir JSON nesnesi; tutarlar ve tarihler metin olarak (hassasiyet kaybı olmadan). """
+    alanlar = list(DISA_AKTARIM_ALANLARI)
+    toplam = 0
+    for satirlar in iter_yevmiye_parcalari(sorgu, parca):
+        yield ''.join(
+            json.dumps(dict(zip(alanlar, satir)), ensure_ascii=False, default=_metin) + '\n' for satir in satirlar
+        )
+        toplam += len(satirlar)
+    logger.info(f"Yevmiye dışa aktarımı (ndjson) tamamlandı: {toplam} satır.")
+
+
+def iter_csv(sorgu, parca=VARSAYILAN_PARCA):
+    """ Başlık satırıyla birlikte CSV (virgül ayraçlı, UTF-8). """
+    tampon = io.StringIO()
+    yazici = csv.writer(tampon, lineterminator='\n')
+    yazici.writerow(DISA_AKTARIM_ALANLARI)
+    toplam = 0
+    for satirlar in iter_yevmiye_parcalari(sorgu, parca):
+        yazici.writerows(satirlar)
+        yield tampon.getvalue()
+        tampon.seek(0)
+        tampon.truncate()
+        toplam += len(satirlar)
+    if tampon.tell():
+        yield tampon.getvalue()
+    logger.info(f"Yevmiye dışa aktarımı (csv) tamamlandı: {toplam} satır.")
+
+
+FORMATLAR = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'csv': (iter_csv, 'text/csv'),
+}
@@ -0,0 +1,97 @@
+# app/ledger_service.py
+# Muavin (hesap ekstresi): bir hesabın yevmiye satırları, satır satır yürüyen bakiyeyle.
+# Yürüyen bakiye veritabanında pencere fonksiyonuyla hesaplanır:
+#   SUM(borc - alacak) OVER (ORDER BY muhasebe_kayit_tarihi, id)
+# Sayfalar (muhasebe_kayit_tarihi, id) üzerinde keyset ile ilerler. Her sayfanın açılış bakiyesi
+# geçmiş satırlar taranmadan toplamlardan bulunur: imleç gününden önceki kısım aylık anlık görüntü
+# + günlük bakiyelerden (get_cumulative_balances), imleç günü içindeki kısım o günün satırlarından.
+# Böylece 500. sayfanın maliyeti 1. sayfanınkiyle aynıdır.
+
+from app import db
+from app.models import YevmiyeMaddesiBasligi, YevmiyeFisiSatiri
+from app.account_balance_service import get_cumulative_balances
+from app.pagination import keyset_kosulu
+from sqlalchemy import select, func, type_coerce
+from datetime import timedelta
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SIFIR = Decimal('0.00')
+_KURUS = Decimal('0.01')
+
+_satir = YevmiyeFisiSatiri.__table__
+_baslik = YevmiyeMaddesiBasligi.__table__
+
+
+def acilis_bakiyesi(firma_id, hesap_kodu, tarih, son_satir_id=None):
+    """
+    Hesabın (borç - alacak) bakiyesi: `tarih`ten önceki tüm hareketler ve `son_satir_id`
+    verilirse `tarih` günündeki id'si ona eşit veya küçük satırlar dahil.
+    """
+    borc, alacak = get_cumulative_balances(firma_id, tarih - timedelta(days=1), hesap_kodu).get(
+        hesap_kodu, (_SIFIR, _SIFIR)
+    )
+    bakiye = borc - alacak
+    if son_satir_id is not None:
+        ayni_gun = db.session.execute(
+            select(func.sum(_satir.c.borc_tutari - _satir.c.alacak_tutari)).where(
+                _satir.c.firma_id == firma_id, _satir.c.hesap_kodu == hesap_kodu,
+                _satir.c.muhasebe_kayit_tarihi == tarih, _satir.c.id <= son_satir_id,
+            )
+        ).scalar()
+        bakiye += Decimal(ayni_gun or 0)
+    return bakiye.quantize(_KURUS)
+
+
+def muavin_sayfasi(firma_id, hesap_kodu, baslangic=None, bitis=None, imlec=None, limit=100):
+    """
+    Muavinin bir sayfası. `imlec` önceki sayfanın son satırının (tarih, satir_id) çiftidir.
+    (acilis_bakiyesi, satirlar, sonraki_imlec) döndürür; satırlar sözlüktür ve 'bakiye'
+    satır dahil yürüyen (borç - alacak) bakiyesidir. Son sayfada sonraki_imlec None'dur.
+    """
+    if imlec is not None:
+        acilis = acilis_bakiyesi(firma_id, hesap_kodu, imlec[0], imlec[1])
+    elif baslangic is not None:
+        acilis = acilis_bakiyesi(firma_id, hesap_kodu, baslangic)
+    else:
+        acilis = _SIFIR
+
+    # Pencere, WHERE'den geçen satırlar üzerinde çalışır; açılış bakiyesi Python'da eklenir.
+    yuruyen = type_coerce(
+        func.sum(_satir.c.borc_tutari - _satir.c.alacak_tutari).over(
+            order_by=(_satir.c.muhasebe_kayit_tarihi, _satir.c.id)
+        ),
+        db.Numeric(18, 2),
+    )
+    sorgu = (
+        select(
+            _satir.c.id.label('satir_id'), _satir.c.muhasebe_kayit_tarihi, _baslik.c.id.label('madde_id'),
+            _baslik.c.yevmiye_madde_no_counter.label('yevmiye_madde_no'), _baslik.c.muhasebe_fis_no,
+            _satir.c.alt_hesap_kodu, _satir.c.aciklama_satir, _satir.c.belge_no, _satir.c.belge_tarihi,
+            _satir.c.borc_tutari, _satir.c.alacak_tutari, yuruyen.label('hareket_toplami'),
+        )
+        .select_from(_satir.join(_baslik, _baslik.c.id == _satir.c.yevmiye_maddesi_id))
+        .where(_satir.c.firma_id == firma_id, _satir.c.hesap_kodu == hesap_kodu)
+    )
+    if baslangic is not None:
+        sorgu = sorgu.where(_satir.c.muhasebe_kayit_tarihi >= baslangic)
+    if bitis is not None:
+        sorgu = sorgu.where(_satir.c.muhasebe_kayit_tarihi <= bitis)
+    if imlec is not None:
+        sorgu = sorgu.where(keyset_kosulu([_satir.c.muhasebe_kayit_tarihi, _satir.c.id], imlec))
+    sonuc = db.session.execute(
+        sorgu.order_by(_satir.c.muhasebe_kayit_tarihi, _satir.c.id).limit(limit + 1)
+    ).all()
+
+    sonraki = None
+    if len(sonuc) > limit:
+        sonuc = sonuc[:limit]
+        sonraki = (sonuc[-1].muhasebe_kayit_tarihi, sonuc[-1].satir_id)
+    satirlar = []
+    for satir in sonuc:
+        kayit = dict(satir._mapping)
+        kayit['bakiye'] = (acilis + Decimal(kayit.pop('hareket_toplami') or 0)).quantize(_KURUS)
+        satirlar.append(kayit)
+    return acilis, satirlar, sonraki
@@ -35,12 +35,25 @@ class Firma(db.Model):
     faaliyet_alani = db.Column(db.Text, nullable=True)
     vkn = db.Column(db.String(20), unique=True, nullable=False, index=True) # vkn için index eklendi
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Firmanın verisi (yüklemeler, silmeler, firma bilgileri) her değiştiğinde artırılır; yanıt önbelleği anahtarının parçası
+    veri_surumu = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # İlişkiler daha önce tanımlanmıştı, backref isimleri kontrol edildi.
     # sahibi = db.relationship('User', backref='firmalar') -> User modelinde zaten var
     finansal_veriler = db.relationship('FinansalVeri', backref='firma_detay_ref', lazy='dynamic', cascade="all, delete-orphan") # backref adı düzeltildi
     yevmiye_maddeleri = db.relationship('YevmiyeMaddesiBasligi', backref='firma_baslik_ref', lazy='dynamic', cascade="all, delete-orphan") # backref adı düzeltildi
+    ice_aktarma_isleri = db.relationship('IceAktarmaIsi', backref='firma_is_ref', lazy='dynamic', cascade="all, delete-orphan")
+    parcali_yuklemeler = db.relationship('ParcaliYukleme', backref='firma_yukleme_ref', lazy='dynamic', cascade="all, delete-orphan")
+    ice_aktarma_kayitlari = db.relationship('IceAktarmaKaydi', backref='firma_kayit_ref', lazy='dynamic', cascade="all, delete-orphan")
+    gunluk_bakiyeler = db.relationship('GunlukHesapBakiyesi', backref='firma_bakiye_ref', lazy='dynamic', cascade="all, delete-orphan")
+    aylik_bakiyeler = db.relationship('AylikHesapBakiyesi', backref='firma_aylik_bakiye_ref', lazy='dynamic', cascade="all, delete-orphan")
 
+    # /firmalar keyset sayfalaması (adi, id) sırasıyla okur; filtreler aynı sırayı koruyan bileşik indekslerle desteklenir.
+    __table_args__ = (
+        db.Index('ix_firma_adi_id', 'adi', 'id'),
+        db.Index('ix_firma_user_adi_id', 'user_id', 'adi', 'id'),
+        db.Index('ix_firma_tipi_adi_id', 'firma_tipi', 'adi', 'id'),
+    )
 
     def __repr__(self):
         return f'<Firma {self.id}: {self.adi} - Tipi: {self.firma_tipi}>'
@@ -97,6 +110,9 @@ class YevmiyeMaddesiBasligi(db.Model):
     aciklama_baslik = db.Column(db.Text, nullable=True)     # <gl-cor:entryComment>
     toplam_borc = db.Column(db.Numeric(18, 2), nullable=False)       # <gl-bus:totalDebit>
     toplam_alacak = db.Column(db.Numeric(18, 2), nullable=False)     # <gl-bus:totalCredit>
+
+    ice_aktarma_kaydi_id = db.Column(db.Integer, db.ForeignKey('ice_aktarma_kaydi.id'), nullable=True, index=True) # Maddeyi getiren dosya
+    madde_ozeti = db.Column(db.String(32), nullable=True) # Başlık + satır içeriğinin özeti (mükerrer madde kontrolü)
     
     satirlar = db.relationship('YevmiyeFisiSatiri', backref='yevmiye_maddesi_ref', lazy='select', cascade="all, delete-orphan") # backref adı düzeltildi
 
@@ -108,6 +124,9 @@ class YevmiyeFisiSatiri(db.Model):
     __tablename__ = 'yevmiye_fisi_satiri'
     id = db.Column(db.Integer, primary_key=True)
     yevmiye_maddesi_id = db.Column(db.Integer, db.ForeignKey('yevmiye_maddesi_basligi.id'), nullable=False, index=True)
+    # Başlıktan kopyalanır; firma bazlı toplamalar başlık tablosuna join yapmadan çalışır.
+    # Eski satırlar için: flask satir-firma-id-doldur
+    firma_id = db.Column(db.Integer, db.ForeignKey('firma.id'), nullable=True)
     
     muhasebe_kayit_tarihi = db.Column(db.Date, nullable=False, index=True) # <gl-cor:postingDate>
     hesap_kodu = db.Column(db.String(50), nullable=False, index=True)    # <gl-cor:accountMainID>
@@ -126,5 +145,145 @@ class YevmiyeFisiSatiri(db.Model):
     belge_referansi = db.Column(db.String(100), nullable=True)          # <gl-cor:documentReference>
     odeme_yontemi = db.Column(db.String(100), nullable=True)            # <gl-bus:paymentMethod>
 
+    # Firma + tarih/hesap filtreli GROUP BY sorguları için kapsayan (covering) indeksler;
+    # PostgreSQL'de tutarlar INCLUDE ile indekse eklenir ve sorgu index-only scan ile çalışır.
+    __table_args__ = (
+        db.Index('ix_yevmiye_satiri_firma_tarih_hesap', 'firma_id', 'muhasebe_kayit_tarihi', 'hesap_kodu',
+                 postgresql_include=['borc_tutari', 'alacak_tutari']),
+        db.Index('ix_yevmiye_satiri_firma_hesap_tarih', 'firma_id', 'hesap_kodu', 'muhasebe_kayit_tarihi',
+                 postgresql_include=['borc_tutari', 'alacak_tutari']),
+    )
+
     def __repr__(self):
         return f'<YevmiyeFisiSatiri ID: {self.id}, MaddeID: {self.yevmiye_maddesi_id}, Hesap: {self.hesap_kodu}, Borç: {self.borc_tutari}, Alacak: {self.alacak_tutari}>'
+
+
+# Arka plan içe aktarma işi durumları
+IS_DURUMLARI = ["beklemede", "calisiyor", "tamamlandi", "hata"]
+
+class IceAktarmaIsi(db.Model):
+    __tablename__ = 'ice_aktarma_isi'
+    id = db.Column(db.String(32), primary_key=True) # uuid4().hex, tahmin edilemez iş kimliği
+    firma_id = db.Column(db.Integer, db.ForeignKey('firma.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    tur = db.Column(db.String(30), nullable=False)           # 'edefter_xml', 'finansal_csv' ...
+    durum = db.Column(db.String(20), nullable=False, default='beklemede', index=True)
+
+    dosya_yolu = db.Column(db.String(500), nullable=False)   # Diske alınmış (spool) yükleme dosyası
+    orjinal_dosya_adi = db.Column(db.String(255), nullable=True)
+
+    okunan_satir = db.Column(db.Integer, nullable=False, default=0)   # Parse edilen satır
+    eklenen_satir = db.Column(db.Integer, nullable=False, default=0)  # Veritabanına yazılan satır
+    hata_mesaji = db.Column(db.Text, nullable=True)
+    sonuc = db.Column(db.JSON, nullable=True)
+
+    olusturulma_tarihi = db.Column(db.DateTime, default=datetime.utcnow)
+    baslama_tarihi = db.Column(db.DateTime, nullable=True)
+    bitis_tarihi = db.Column(db.DateTime, nullable=True)
+    # Çalışan iş her batch'te günceller (heartbeat); uzun süre güncellenmeyen 'calisiyor' iş ölmüş sayılır.
+    guncellenme_tarihi = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<IceAktarmaIsi {self.id}: FirmaID: {self.firma_id}, Tür: {self.tur}, Durum: {self.durum}>'
+
+
+# Parçalı (resumable) yükleme durumları
+YUKLEME_DURUMLARI = ["aktif", "tamamlandi", "iptal"]
+
+class ParcaliYukleme(db.Model):
+    __tablename__ = 'parcali_yukleme'
+    id = db.Column(db.String(32), primary_key=True) # uuid4().hex, istemcinin upload-id'si
+    firma_id = db.Column(db.Integer, db.ForeignKey('firma.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    tur = db.Column(db.String(30), nullable=False)           # Tamamlanınca oluşturulacak iş türü
+    durum = db.Column(db.String(20), nullable=False, default='aktif')
+
+    dosya_yolu = db.Column(db.String(500), nullable=False)   # Parçaların eklendiği spool dosyası
+    orjinal_dosya_adi = db.Column(db.String(255), nullable=True)
+    toplam_boyut = db.Column(db.BigInteger, nullable=True)   # İstemcinin bildirdiği boyut (bilinmiyorsa None)
+    alinan_boyut = db.Column(db.BigInteger, nullable=False, default=0) # Bir sonraki parçanın offset'i
+    ice_aktarma_isi_id = db.Column(db.String(32), db.ForeignKey('ice_aktarma_isi.id'), nullable=True)
+
+    olusturulma_tarihi = db.Column(db.DateTime, default=datetime.utcnow)
+    guncellenme_tarihi = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ParcaliYukleme {self.id}: FirmaID: {self.firma_id}, {self.alinan_boyut}/{self.toplam_boyut} bayt, Durum: {self.durum}>'
+
+
+# İçe aktarılmış her e-defter dosyasının manifest kaydı; aynı içerikli dosya ikinci kez işlenmez.
+class IceAktarmaKaydi(db.Model):
+    __tablename__ = 'ice_aktarma_kaydi'
+    id = db.Column(db.Integer, primary_key=True)
+    firma_id = db.Column(db.Integer, db.ForeignKey('firma.id'), nullable=False, index=True)
+    dosya_ozeti = db.Column(db.String(64), nullable=False)   # Dosya içeriğinin SHA-256 özeti (hex)
+    orjinal_dosya_adi = db.Column(db.String(255), nullable=True)
+    dosya_boyutu = db.Column(db.BigInteger, nullable=True)
+
+    madde_sayisi = db.Column(db.Integer, nullable=False, default=0)          # Eklenen yevmiye maddesi
+    satir_sayisi = db.Column(db.Integer, nullable=False, default=0)          # Eklenen satır
+    atlanan_madde_sayisi = db.Column(db.Integer, nullable=False, default=0)  # Daha önce yüklenmiş olduğu için atlanan
+    yuklenme_tarihi = db.Column(db.DateTime, default=datetime.utcnow)
+    # Batch'ler ayrı commit edilirken (arka plan işi) kayıt ilk batch ile yazılır ve son commit'te
+    # tamamlanır. Yarım kalmış kayıtlar mükerrer sayılmaz; guncellenme_tarihi her batch'te yenilenir.
+    tamamlandi = db.Column(db.Boolean, nullable=False, default=False, server_default='1') # Eski kayıtlar tamamlanmış sayılır
+    guncellenme_tarihi = db.Column(db.DateTime, default=datetime.utcnow)
+
+    yevmiye_maddeleri = db.relationship('YevmiyeMaddesiBasligi', backref='ice_aktarma_kaydi_ref', lazy='dynamic')
+
+    __table_args__ = (db.UniqueConstraint('firma_id', 'dosya_ozeti', name='_ice_aktarma_kaydi_firma_ozet_uc'),)
+
+    def __repr__(self):
+        return f'<IceAktarmaKaydi {self.id}: FirmaID: {self.firma_id}, Dosya: {self.orjinal_dosya_adi}, Özet: {self.dosya_ozeti[:12]}>'
+
+
+# Yevmiye satırlarının (firma, hesap, gün) bazında borç/alacak toplamları. İçe aktarma ve
+# silme işlemlerinde artımlı güncellenir; bakiye sorguları satır tablosu yerine bunu okur.
+class GunlukHesapBakiyesi(db.Model):
+    __tablename__ = 'gunluk_hesap_bakiyesi'
+    id = db.Column(db.Integer, primary_key=True)
+    firma_id = db.Column(db.Integer, db.ForeignKey('firma.id'), nullable=False)
+    hesap_kodu = db.Column(db.String(50), nullable=False)
+    gun = db.Column(db.Date, nullable=False)              # YevmiyeFisiSatiri.muhasebe_kayit_tarihi
+    borc_toplami = db.Column(db.Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    alacak_toplami = db.Column(db.Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    satir_sayisi = db.Column(db.Integer, default=0, nullable=False) # 0'a düşen satırlar temizlenir
+
+    __table_args__ = (
+        db.UniqueConstraint('firma_id', 'hesap_kodu', 'gun', name='_gunluk_bakiye_firma_hesap_gun_uc'),
+        db.Index('ix_gunluk_bakiye_firma_gun', 'firma_id', 'gun'),
+    )
+
+    def __repr__(self):
+        return f'<GunlukHesapBakiyesi FirmaID: {self.firma_id}, Hesap: {self.hesap_kodu}, Gün: {self.gun}, B: {self.borc_toplami}, A: {self.alacak_toplami}>'
+
+
+# Ay sonu itibarıyla kümülatif (başlangıçtan o ayın sonuna kadar) borç/alacak toplamları.
+# Her hesap için ilk hareket ayından firmanın son hareket ayına kadar her ay bir satır bulunur;
+# geriye dönük bir kayıt geldiğinde etkilenen aydan sonrası silinip yeniden oluşturulur.
+class AylikHesapBakiyesi(db.Model):
+    __tablename__ = 'aylik_hesap_bakiyesi'
+    id = db.Column(db.Integer, primary_key=True)
+    firma_id = db.Column(db.Integer, db.ForeignKey('firma.id'), nullable=False)
+    hesap_kodu = db.Column(db.String(50), nullable=False)
+    ay = db.Column(db.Date, nullable=False)                # Ayın ilk günü
+    kumulatif_borc = db.Column(db.Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+    kumulatif_alacak = db.Column(db.Numeric(18, 2), default=Decimal('0.00'), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('firma_id', 'ay', 'hesap_kodu', name='_aylik_bakiye_firma_ay_hesap_uc'),
+    )
+
+    def __repr__(self):
+        return f'<AylikHesapBakiyesi FirmaID: {self.firma_id}, Hesap: {self.hesap_kodu}, Ay: {self.ay}, B: {self.kumulatif_borc}, A: {self.kumulatif_alacak}>'
+
+
+
+# Firmaya bağlı olmayan kaynakların (ör. firma listesi) veri sürümleri; ETag'ler bu sayaçlardan üretilir.
+class VeriSurumu(db.Model):
+    __tablename__ = 'veri_surumu'
+    ad = db.Column(db.String(50), primary_key=True)
+    surum = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<VeriSurumu {self.ad}: {self.surum}>'
@@ -0,0 +1,270 @@
+# app/muhasebe_kayitlari_service.py
+# <MuhasebeKayitlari Donem="..."> biçimindeki dönem sonu bakiye (mizan) dosyalarının içe aktarılması
+# (örnek: ornek1.xml). Yevmiye satırı yazılmaz: dosya akış halinde okunur, her hesap kodu
+# account_resolver kuralları / BILANCO_YAPISI (bulunamazsa Tekdüzen Hesap Planı sınıfı) üzerinden bir
+# FinansalVeri kalemine eşlenir ve dönem için tek bir FinansalVeri satırı UPSERT edilir.
+
+from app import db
+from app.financial_data_service import upsert_finansal_veri, _VARSAYILAN_DEGERLER
+from app.financial_statement_service import BILANCO_YAPISI
+from app.account_resolver import varsayilan_cozucu, bilinmeyen_kod_bildir
+from lxml import etree
+from decimal import Decimal, InvalidOperation
+import logging
+
+logger = logging.getLogger(__name__)
+
+VARSAYILAN_PARA_BIRIMI = 'TRY'
+
+# Toplamların dosyadaki <GenelToplamlar> ile karşılaştırılmasında kabul edilen fark
+_TOPLAM_TOLERANSI = Decimal('0.01')
+
+# HESAP_DETAYLARI fs_group / BILANCO_YAPISI ana grup adı -> ara kalem
+_GRUP_KALEMLERI = {
+    'I. DÖNEN VARLIKLAR': 'donen_varliklar',
+    'II. DURAN VARLIKLAR': 'duran_varliklar',
+    'III. KISA VADELİ YABANCI KAYNAKLAR': 'kisa_vadeli_yukumlulukler',
+    'IV. UZUN VADELİ YABANCI KAYNAKLAR': 'uzun_vadeli_yukumlulukler',
+    'V. ÖZKAYNAKLAR': 'oz_kaynaklar',
+    'A. BRÜT SATIŞLAR': 'brut_satislar',
+    'B. SATIŞ İNDİRİMLERİ (-)': 'satis_indirimleri',
+    'C. SATIŞLARIN MALİYETİ (-)': 'satilan_malin_maliyeti',
+    'D. FAALİYET GİDERLERİ (-)': 'faaliyet_giderleri',
+    'E. DİĞER FAALİYETLERDEN OLAĞAN GELİR VE KÂRLAR': 'diger_gelirler',
+    'F. DİĞER FAALİYETLERDEN OLAĞAN GİDER VE ZARARLAR (-)': 'diger_giderler',
+    'G. FİNANSMAN GİDERLERİ (-)': 'finansman_giderleri',
+}
+
+# Eşleme tablolarında olmayan hesaplar için Tekdüzen Hesap Planı sınıfı (en uzun önek önce)
+_HESAP_SINIFI_KALEMLERI = {
+    '691': 'vergi_karsiliklari',
+    '60': 'brut_satislar', '61': 'satis_indirimleri', '62': 'satilan_malin_maliyeti',
+    '63': 'faaliyet_giderleri', '64': 'diger_gelirler', '65': 'diger_giderler',
+    '66': 'finansman_giderleri', '67': 'olagandisi_gelirler', '68': 'olagandisi_giderler',
+    '1': 'donen_varliklar', '2': 'duran_varliklar', '3': 'kisa_vadeli_yukumlulukler',
+    '4': 'uzun_vadeli_yukumlulukler', '5': 'oz_kaynaklar',
+}
+_HESAP_SINIFI_ONEKLERI = sorted(_HESAP_SINIFI_KALEMLERI, key=len, reverse=True)
+
+# Tekdüzen Hesap Planı düzenleyici (ters bakiyeli, bulunduğu grubu azaltan) hesaplar
+_DUZENLEYICI_HESAPLAR = frozenset({
+    '103', '119', '122', '124', '129', '137', '139', '158', '199',
+    '222', '224', '229', '237', '239', '241', '243', '244', '246', '247', '249',
+    '257', '268', '278', '298', '299',
+    '302', '308', '322', '337', '402', '408', '422', '437',
+    '501', '503', '580', '591',
+})
+
+# Dağıtılmamış kârlar (Altman X2): geçmiş yıllar ve dönem kâr/zarar hesapları
+_DAGITILMAMIS_KAR_ONEKLERI = ('57', '58', '59')
+
+# Dönem sonu kapanış/yansıtma hesapları: 690/692 gelir tablosu hesaplarının özetidir,
+# 7xx maliyet hesapları 6xx'e yansıtılmıştır; tekrar sayılmamaları için atlanırlar.
+_ATLANAN_ONEKLER = ('690', '692', '697', '698', '7', '8', '9')
+
+_BILANCO_GRUPLARI = {
+    kod: ana_grup
+    for taraf in BILANCO_YAPISI.values()
+    for ana_grup, alt_gruplar in taraf.items()
+    for kodlar in alt_gruplar.values()
+    for kod in kodlar
+}
+
+
+def hesap_kalemi(hesap_kodu):
+    """
+    Ana hesap kodunu (ilk 3 hane) bir ara kaleme eşler: (kalem, işaret) ya da eşlenemezse
+    (None, 0). Sıra: account_resolver kuralı (HESAP_DETAYLARI ve sonradan eklenen '12x', '100-108' ...),
+    BILANCO_YAPISI, hesap sınıfı. Düzenleyici hesaplar -1 işaret alır. Çözümleme çözücünün önbelleğindedir.
+    """
+    if hesap_kodu.startswith(_ATLANAN_ONEKLER):
+        return None, 0
+    detay = varsayilan_cozucu().coz(hesap_kodu)
+    kalem = _GRUP_KALEMLERI.get(detay.get('fs_group')) if detay else None
+    if kalem is None:
+        kalem = _GRUP_KALEMLERI.get(_BILANCO_GRUPLARI.get(hesap_kodu))
+    if kalem is None:
+        for onek in _HESAP_SINIFI_ONEKLERI:
+            if hesap_kodu.startswith(onek):
+                kalem = _HESAP_SINIFI_KALEMLERI[onek]
+                break
+    if kalem is None:
+        return None, 0
+    duzenleyici = (detay.get('type') in ('REG_A', 'REG_P')) if detay else hesap_kodu in _DUZENLEYICI_HESAPLAR
+    return kalem, (-1 if duzenleyici else 1)
+
+
+def _tutar(metin, hesap_kodu):
+    try:
+        return Decimal((metin or '').strip() or '0')
+    except InvalidOperation:
+        raise ValueError(f"Hesap {hesap_kodu}: geçersiz bakiye değeri '{metin}'.")
+
+
+def parse_muhasebe_kayitlari(kaynak):
+    """
+    MuhasebeKayitlari XML'ini akış halinde okur. Aynı ana hesabın hem kendisi hem alt hesapları
+    (100, 100.01 ...) listelenmişse ana hesap satırı esas alınır, yoksa alt hesaplar toplanır.
+    {'donem', 'firma_adi', 'bakiyeler': {ana_hesap: Decimal}, 'genel_toplamlar', 'uyarilar'} döndürür.
+    """
+    donem = firma_adi = None
+    ana_hesaplar = {}
+    alt_hesaplar = {}
+    genel_toplamlar = {}
+    uyarilar = []
+    kok_goruldu = False
+
+    context = etree.iterparse(
+        kaynak, events=('start', 'end'), remove_comments=True, resolve_entities=False,
+        tag=('{*}MuhasebeKayitlari', '{*}FirmaAdi', '{*}Hesap', '{*}AktifToplami', '{*}PasifToplami'),
+    )
+    for olay, elem in context:
+        ad = etree.QName(elem).localname
+        if olay == 'start':
+            if ad == 'MuhasebeKayitlari':
+                kok_goruldu = True
+                donem = (elem.get('Donem') or '').strip() or None
+            continue
+
+        if ad == 'Hesap':
+            kod = (elem.get('Kodu') or '').strip()
+            bakiye_elem = next(elem.iterchildren('{*}Bakiye'), None)
+            if not kod or bakiye_elem is None:
+                uyarilar.append(f"Kodu veya Bakiye'si olmayan hesap satırı atlandı ({kod or '-'}).")
+            else:
+                para_birimi = (bakiye_elem.get('ParaBirimi') or VARSAYILAN_PARA_BIRIMI).upper()
+                if para_birimi != VARSAYILAN_PARA_BIRIMI:
+                    uyarilar.append(f"Hesap {kod}: {para_birimi} cinsinden bakiye atlandı.")
+                else:
+                    bakiye = _tutar(bakiye_elem.text, kod)
+                    ana = kod.replace('.', '').replace('-', '')[:3]
+                    if kod == ana:
+                        ana_hesaplar[ana] = ana_hesaplar.get(ana, Decimal('0')) + bakiye
+                    else:
+                        alt_hesaplar[ana] = alt_hesaplar.get(ana, Decimal('0')) + bakiye
+        elif ad == 'FirmaAdi':
+            firma_adi = (elem.text or '').strip() or None
+        elif ad in ('AktifToplami', 'PasifToplami'):
+            genel_toplamlar[ad] = _tutar(elem.text, ad)
+        elem.clear(keep_tail=False)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    del context
+
+    if not kok_goruldu:
+        raise ValueError("Dosya bir MuhasebeKayitlari belgesi değil.")
+    bakiyeler = dict(alt_hesaplar)
+    bakiyeler.update(ana_hesaplar)
+    return {
+        'donem': donem,
+        'firma_adi': firma_adi,
+        'bakiyeler': bakiyeler,
+        'genel_toplamlar': genel_toplamlar,
+        'uyarilar': uyarilar,
+    }
+
+
+def build_finansal_veri(bakiyeler):
+    """
+    Ana hesap bakiyelerinden FinansalVeri alanlarını hesaplar.
+    (alanlar, bilinmeyen_hesaplar) döndürür.
+    """
+    kalemler = {}
+    bilinmeyen = []
+    dagitilmamis = Decimal('0')
+    gelir_tablosu_var = False
+    for hesap_kodu, bakiye in bakiyeler.items():
+        kalem, isaret = hesap_kalemi(hesap_kodu)
+        if kalem is None:
+            if not hesap_kodu.startswith(_ATLANAN_ONEKLER):
+                bilinmeyen.append(hesap_kodu)
+                bilinmeyen_kod_bildir(hesap_kodu, 'muhasebe kayıtları')
+            continue
+        kalemler[kalem] = kalemler.get(kalem, Decimal('0')) + isaret * bakiye
+        if hesap_kodu.startswith('6'):
+            gelir_tablosu_var = True
+        if hesap_kodu.startswith(_DAGITILMAMIS_KAR_ONEKLERI):
+            dagitilmamis += isaret * bakiye
+
+    k = lambda ad: kalemler.get(ad, Decimal('0'))
+    alanlar = {
+        'donen_varliklar': k('donen_varliklar'),
+        'duran_varliklar': k('duran_varliklar'),
+        'kisa_vadeli_yukumlulukler': k('kisa_vadeli_yukumlulukler'),
+        'uzun_vadeli_yukumlulukler': k('uzun_vadeli_yukumlulukler'),
+        'oz_kaynaklar': k('oz_kaynaklar'),
+        'net_satislar': k('brut_satislar') - k('satis_indirimleri'),
+        'satilan_malin_maliyeti': k('satilan_malin_maliyeti'),
+        'faaliyet_giderleri': k('faaliyet_giderleri'),
+        'finansman_giderleri': k('finansman_giderleri'),
+        'dagitilmamis_karlar': dagitilmamis,
+    }
+    alanlar['aktif_toplami'] = alanlar['donen_varliklar'] + alanlar['duran_varliklar']
+    alanlar['toplam_yukumlulukler'] = alanlar['kisa_vadeli_yukumlulukler'] + alanlar['uzun_vadeli_yukumlulukler']
+    alanlar['brut_kar_zarar'] = alanlar['net_satislar'] - alanlar['satilan_malin_maliyeti']
+    alanlar['esas_faaliyet_kari_zarari'] = alanlar['brut_kar_zarar'] - alanlar['faaliyet_giderleri']
+    alanlar['vergi_oncesi_kar_zarar'] = (
+        alanlar['esas_faaliyet_kari_zarari'] + k('diger_gelirler') - k('diger_giderler')
+        - alanlar['finansman_giderleri'] + k('olagandisi_gelirler') - k('olagandisi_giderler')
+    )
+    if gelir_tablosu_var:
+        alanlar['donem_net_kari_zarari'] = alanlar['vergi_oncesi_kar_zarar'] - k('vergi_karsiliklari')
+    else:
+        # Kapanış sonrası mizan: gelir tablosu hesapları 590/591'e devredilmiştir.
+        alanlar['donem_net_kari_zarari'] = bakiyeler.get('590', Decimal('0')) - bakiyeler.get('591', Decimal('0'))
+    return alanlar, sorted(bilinmeyen)
+
+
+def _toplamlari_dogrula(alanlar, genel_toplamlar, uyarilar):
+    kontroller = (
+        ('AktifToplami', alanlar['aktif_toplami']),
+        ('PasifToplami', alanlar['toplam_yukumlulukler'] + alanlar['oz_kaynaklar']),
+    )
+    for ad, hesaplanan in kontroller:
+        beyan = genel_toplamlar.get(ad)
+        if beyan is not None and abs(beyan - hesaplanan) > _TOPLAM_TOLERANSI:
+            uyarilar.append(f"{ad}: dosyada {beyan}, hesap bakiyelerinden {hesaplanan} bulundu.")
+
+
+def import_muhasebe_kayitlari(firma_id, kaynak, donem=None):
+    """
+    MuhasebeKayitlari dosyasını (yol veya ikili dosya nesnesi) okuyup firma için dönemin
+    FinansalVeri satırını UPSERT eder ve commit eder. `donem` verilirse dosyadaki Donem
+    özniteliğinin yerine kullanılır. İçe aktarma özetini döndürür; format hatasında ValueError fırlatır.
+    """
+    try:
+        okunan = parse_muhasebe_kayitlari(kaynak)
+    except etree.XMLSyntaxError as e:
+        raise ValueError(f"XML dosyası okunamadı: {e}")
+    donem = donem or okunan['donem']
+    if not donem:
+        raise ValueError("Dönem bilgisi bulunamadı (MuhasebeKayitlari/@Donem veya 'donem' parametresi gerekli).")
+    if not okunan['bakiyeler']:
+        raise ValueError("Dosyada bakiyesi okunabilen hesap bulunamadı.")
+
+    alanlar, bilinmeyen = build_finansal_veri(okunan['bakiyeler'])
+    uyarilar = okunan['uyarilar']
+    _toplamlari_dogrula(alanlar, okunan['genel_toplamlar'], uyarilar)
+    if bilinmeyen:
+        uyarilar.append(f"Eşlenemeyen hesaplar yok sayıldı: {', '.join(bilinmeyen)}")
+
+    kayit = dict(_VARSAYILAN_DEGERLER)
+    kayit.update(alanlar)
+    kayit.update(firma_id=firma_id, donem=donem)
+    try:
+        upsert_finansal_veri([kayit])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for uyari in uyarilar:
+        logger.warning(f"Firma {firma_id}, Dönem {donem}: {uyari}")
+    return {
+        'donem': donem,
+        'firma_adi': okunan['firma_adi'],
+        'hesap_sayisi': len(okunan['bakiyeler']),
+        'bilinmeyen_hesaplar': bilinmeyen,
+        'uyarilar': uyarilar,
+        'finansal_veri': {alan: float(deger) for alan, deger in alanlar.items()},
+    }
@@ -0,0 +1,112 @@
+# app/pagination.py
+# Liste uçları için imleç (keyset) tabanlı sayfalama ve alan seçimi (projection).
+# Sayfalar OFFSET yerine son satırın sıralama anahtarından devam eder:
+#   WHERE (adi, id) > (:son_adi, :son_id) ORDER BY adi, id LIMIT :limit
+# böylece her sayfa indeks üzerinde aynı maliyetle okunur. İmleç, son satırın anahtarının
+# base64url kodlanmış JSON'udur ve istemci için opaktır. Yanıt gövdesi bir JSON dizisi olarak
+# kalır; sonraki sayfa varsa `Link: <...>; rel="next"` ve `X-Sonraki-Imlec` başlıkları eklenir.
+
+from flask import request, jsonify, url_for
+from sqlalchemy import and_, or_
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+VARSAYILAN_LIMIT = 100
+AZAMI_LIMIT = 1000
+
+
+class SayfalamaHatasi(ValueError):
+    """ Geçersiz limit, imleç veya alan parametresi (istemci hatası, 400). """
+
+
+def imlec_kodla(anahtar):
+    ham = json.dumps(list(anahtar), ensure_ascii=False, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(ham.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def imlec_coz(imlec, uzunluk):
+    """ İmleci `uzunluk` elemanlı anahtar listesine çözer; bozuksa SayfalamaHatasi. """
+    try:
+        ham = base64.urlsafe_b64decode(imlec + '=' * (-len(imlec) % 4))
+        anahtar = json.loads(ham.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        raise SayfalamaHatasi("Geçersiz imleç.")
+    if not isinstance(anahtar, list) or len(anahtar) != uzunluk:
+        raise SayfalamaHatasi("Geçersiz imleç.")
+    return anahtar
+
+
+def limit_parametresi(varsayilan=VARSAYILAN_LIMIT, azami=AZAMI_LIMIT):
+    deger = request.args.get('limit')
+    if deger is None:
+        return varsayilan
+    try:
+        limit = int(deger)
+    except ValueError:
+        raise SayfalamaHatasi("'limit' bir tam sayı olmalıdır.")
+    if not 1 <= limit <= azami:
+        raise SayfalamaHatasi(f"'limit' 1 ile {azami} arasında olmalıdır.")
+    return limit
+
+
+def alan_secimi(izinli, varsayilan):
+    """
+    ?fields=a,b,c parametresini doğrular; istenen alan adlarını (sırasıyla) döndürür.
+    Parametre yoksa `varsayilan` döner.
+    """
+    deger = request.args.get('fields')
+    if not deger:
+        return list(varsayilan)
+    alanlar = []
+    for alan in deger.split(','):
+        alan = alan.strip()
+        if not alan or alan in alanlar:
+            continue
+        if alan not in izinli:
+            raise SayfalamaHatasi(f"Bilinmeyen alan: '{alan}'. İzin verilenler: {', '.join(izinli)}")
+        alanlar.append(alan)
+    if not alanlar:
+        raise SayfalamaHatasi("'fields' en az bir alan içermelidir.")
+    return alanlar
+
+
+def keyset_kosulu(sutunlar, anahtar, azalan=False):
+    """
+    (s1, s2, ...) > (a1, a2, ...) satır karşılaştırmasının taşınabilir biçimi
+    (azalan=True ise <): s1 > a1 OR (s1 = a1 AND s2 > a2) ...
+    """
+    kosullar = []
+    for i, (sutun, deger) in enumerate(zip(sutunlar, anahtar)):
+        esitler = [s == a for s, a in zip(sutunlar[:i], anahtar[:i])]
+        kosullar.append(and_(*esitler, sutun < deger if azalan else sutun > deger))
+    return or_(*kosullar)
+
+
+def sayfa_yaniti(satirlar, alanlar, limit, anahtar_alanlari):
+    """
+    limit + 1 satır okunmuş bir sorgu sonucundan sayfa yanıtını kurar. `satirlar` en az
+    `alanlar` ve `anahtar_alanlari` sütunlarını içeren Row nesneleridir; çıktıda yalnızca
+    `alanlar` bulunur. Sonraki sayfa varsa Link ve X-Sonraki-Imlec başlıkları eklenir.
+    """
+    sonraki = None
+    if len(satirlar) > limit:
+        satirlar = satirlar[:limit]
+        son = satirlar[-1]._mapping
+        sonraki = imlec_kodla([son[alan] for alan in anahtar_alanlari])
+    yanit = jsonify([{alan: satir._mapping[alan] for alan in alanlar} for satir in satirlar])
+    if sonraki is not None:
+        sonraki_sayfa_basliklari(yanit, sonraki)
+    return yanit
+
+
+def sonraki_sayfa_basliklari(yanit, imlec):
+    """ Yanıta, aynı istek parametreleriyle `imlec`ten devam eden Link ve X-Sonraki-Imlec başlıklarını ekler. """
+    parametreler = request.args.to_dict(flat=False)
+    parametreler['imlec'] = imlec
+    adres = url_for(request.endpoint, **(request.view_args or {}), **parametreler)
+    yanit.headers['Link'] = f'<{adres}>; rel="next"'
+    yanit.headers['X-Sonraki-Imlec'] = imlec
+    return yanit
@@ -0,0 +1,97 @@
+# app/portfolio_service.py
+# Portföy genelinde (tüm firmalar veya seçilen firmalar) toplu risk skorlama.
+# Firmalar firma_id sırasıyla parçalar halinde okunur (keyset: firma_id > son_id): her parça
+# için tek bir set tabanlı sorgu o parçadaki firmaların seçilen (ya da en son) dönem verisini
+# getirir, app.risk_engine ile vektörel skorlanır ve satır satır üretilir. Bellek kullanımı
+# parça boyutuyla sınırlıdır; ilk sonuçlar ilk parça biter bitmez gönderilebilir.
+
+from app import db
+from app.models import Firma, FinansalVeri
+from app.risk_engine import float_sutunlari, float_satirlarindan_sutunlar, skorla
+from sqlalchemy import select, func, and_
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+VARSAYILAN_PARCA = 1000
+
+# Altman Z' yorum eşikleri (finansal_analiz ile aynı)
+ALTMAN_GUVENLI = 2.99
+ALTMAN_RISKLI = 1.81
+
+
+def altman_yorumlari(skorlar):
+    """ Altman Z' skor dizisi -> yorum listesi (finansal_analiz'deki eşiklerle). """
+    return np.select(
+        [np.isnan(skorlar), skorlar > ALTMAN_GUVENLI, skorlar < ALTMAN_RISKLI],
+        ["Hesaplanamadı veya Veri Yetersiz", "Güvenli Bölge (Düşük İflas Riski)", "Riskli Bölge (Yüksek İflas Riski)"],
+        default="Belirsiz Bölge (Gri Alan)",
+    ).tolist()
+
+
+def _parca_sorgusu(son_firma_id, parca, donem=None, firma_idleri=None):
+    """ firma_id > son_firma_id olan ilk `parca` firmanın dönem verisini getiren tek sorgu. """
+    fv = FinansalVeri.__table__
+    firma = Firma.__table__
+    kosullar = [fv.c.firma_id > son_firma_id]
+    if firma_idleri is not None:
+        kosullar.append(fv.c.firma_id.in_(firma_idleri))
+
+    if donem is not None:
+        kosullar.append(fv.c.donem == donem)
+        kaynak = fv
+    else:
+        # Firma başına en son dönem; (firma_id, donem) üzerindeki unique indeksle çözülür.
+        son_donemler = (
+            select(fv.c.firma_id, func.max(fv.c.donem).label('donem'))
+            .where(*kosullar)
+            .group_by(fv.c.firma_id)
+            .order_by(fv.c.firma_id)
+            .limit(parca)
+            .subquery()
+        )
+        kaynak = fv.join(son_donemler, and_(fv.c.firma_id == son_donemler.c.firma_id, fv.c.donem == son_donemler.c.donem))
+        kosullar = []
+
+    return (
+        select(fv.c.firma_id, firma.c.adi, fv.c.donem, *float_sutunlari(fv))
+        .select_from(kaynak.join(firma, firma.c.id == fv.c.firma_id))
+        .where(*kosullar)
+        .order_by(fv.c.firma_id)
+        .limit(parca)
+    )
+
+
+def iter_portfolio_scores(donem=None, firma_idleri=None, modeller=None, parca=VARSAYILAN_PARCA):
+    """
+    Firma başına {'firma_id', 'firma_adi', 'donem', <model>: skor | None, ...} sözlükleri üretir.
+    `donem` verilmezse her firmanın en son dönemi kullanılır. Veritabanına yazılmaz.
+    """
+    son_firma_id = 0
+    toplam = 0
+    while True:
+        satirlar = db.session.execute(_parca_sorgusu(son_firma_id, parca, donem, firma_idleri)).all()
+        if not satirlar:
+            break
+        sonuclar = skorla(float_satirlarindan_sutunlar(satirlar, bas=3), modeller)
+        if 'altman_z_skoru' in sonuclar:
+            sonuclar['altman_z_skoru_yorum'] = altman_yorumlari(sonuclar['altman_z_skoru'])
+        adlar = list(sonuclar)
+        degerler = [
+            sonuclar[ad] if isinstance(sonuclar[ad], list)
+            else [None if d != d else d for d in sonuclar[ad].tolist()]  # NaN -> None
+            for ad in adlar
+        ]
+        for i, satir in enumerate(satirlar):
+            kayit = {'firma_id': satir[0], 'firma_adi': satir[1], 'donem': satir[2]}
+            for ad, sutun in zip(adlar, degerler):
+                kayit[ad] = sutun[i]
+            yield kayit
+        toplam += len(satirlar)
+        son_firma_id = satirlar[-1][0]
+        # Parça arasında bağlantı/oturum kaynakları serbest bırakılır
+        db.session.rollback()
+        if len(satirlar) < parca:
+            break
+    logger.info(f"Portföy skorlama tamamlandı: {toplam} firma (dönem: {donem or 'en son'}).")
@@ -0,0 +1,307 @@
+# app/response_cache.py
+# Sürümlü yanıt önbelleği. Mali tablo ve analiz uçlarının JSON yanıtları
+# (firma_id, uç adı, sorgu parametreleri, veri_surumu) anahtarıyla saklanır. Firmanın verisini
+# değiştiren her yazma işlemi (yükleme, silme, firma güncelleme) aynı transaction içinde
+# Firma.veri_surumu sayacını artırır; böylece eski kayıtlar hiçbir zaman okunmaz ve açıkça
+# silinmeleri gerekmez, LRU tahliyesiyle kendiliğinden düşerler.
+#
+# Aynı sürüm sayaçları koşullu GET için de kullanılır (bkz. kosullu_get): ETag sürümden ve
+# sorgu parametrelerinden üretilir, If-None-Match eşleşirse görünüm hiç çalışmadan 304 döner.
+# Firmaya bağlı olmayan kaynaklar (firma listesi) VeriSurumu tablosundaki genel sayaçları kullanır.
+#
+# İki katman vardır:
+#   bellek  süreç içi LRU; toplam gövde boyutu YANIT_ONBELLEK_BAYT ile sınırlı
+#   disk    isteğe bağlı (YANIT_ONBELLEK_DIZINI); tüm gunicorn worker'larınca paylaşılır,
+#           toplam boyut YANIT_ONBELLEK_DISK_BAYT aşılınca en eski dosyalar silinir
+
+from app import db
+from app.models import Firma, VeriSurumu
+from flask import current_app, request
+from functools import wraps
+from collections import OrderedDict
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+VARSAYILAN_BELLEK_BAYT = 64 * 1024 * 1024
+VARSAYILAN_DISK_BAYT = 1024 * 1024 * 1024
+
+
+# === VERİ SÜRÜMÜ ===
+
+def veri_surumunu_artir(*firma_idleri, tumu=False):
+    """
+    Firmaların veri sürümünü tek bir UPDATE ile artırır (tumu=True ise tüm firmalar).
+    Verinin yazıldığı transaction içinde çağrılmalıdır; commit çağırana aittir.
+    """
+    tablo = Firma.__table__
+    stmt = update(tablo).values(veri_surumu=tablo.c.veri_surumu + 1)
+    if not tumu:
+        if not firma_idleri:
+            return
+        stmt = stmt.where(tablo.c.id.in_(set(firma_idleri)))
+    db.session.execute(stmt)
+
+
+def veri_surumu(firma_id):
+    """ Firmanın güncel veri sürümü; firma yoksa None. """
+    return db.session.execute(
+        select(Firma.__table__.c.veri_surumu).where(Firma.__table__.c.id == firma_id)
+    ).scalar()
+
+
+def genel_surumu_artir(ad):
+    """ `ad` adlı genel sayacı artırır (yoksa 1 ile oluşturur). Commit çağırana aittir. """
+    tablo = VeriSurumu.__table__
+    artir = update(tablo).where(tablo.c.ad == ad).values(surum=tablo.c.surum + 1)
+    if db.session.execute(artir).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(tablo).values(ad=ad, surum=1))
+    except IntegrityError:
+        db.session.execute(artir)  # aynı anda başka bir istek oluşturdu
+
+
+def genel_surum(ad):
+    """ `ad` adlı genel sayacın değeri (hiç artırılmadıysa 0). """
+    tablo = VeriSurumu.__table__
+    return db.session.execute(select(tablo.c.surum).where(tablo.c.ad == ad)).scalar() or 0
+
+
+# === ÖNBELLEK ===
+
+class YanitOnbellegi:
+    """ Boyut sınırlı bellek LRU'su ve isteğe bağlı paylaşılan disk katmanı. """
+
+    def __init__(self, azami_bayt=VARSAYILAN_BELLEK_BAYT, disk_dizini=None, disk_azami_bayt=VARSAYILAN_DISK_BAYT):
+        self.azami_bayt = azami_bayt
+        self.disk_dizini = disk_dizini
+        self.disk_azami_bayt = disk_azami_bayt
+        self._kayitlar = OrderedDict()  # anahtar -> gövde (bytes); sonda en son kullanılan
+        self._bayt = 0
+        self._kilit = threading.Lock()
+        self._disk_yazilan = 0          # son disk temizliğinden beri yazılan bayt
+        self.sayaclar = dict.fromkeys(
+            ('bellek_isabet', 'disk_isabet', 'iskalama', 'tahliye', 'disk_tahliye', 'disk_hata'), 0
+        )
+        if disk_dizini:
+            os.makedirs(disk_dizini, exist_ok=True)
+
+    def al(self, anahtar):
+        """ Gövdeyi döndürür; yoksa None. Diskte bulunan kayıt belleğe alınır. """
+        with self._kilit:
+            govde = self._kayitlar.get(anahtar)
+            if govde is not None:
+                self._kayitlar.move_to_end(anahtar)
+                self.sayaclar['bellek_isabet'] += 1
+                return govde
+        govde = self._diskten_oku(anahtar)
+        with self._kilit:
+            if govde is None:
+                self.sayaclar['iskalama'] += 1
+                return None
+            self.sayaclar['disk_isabet'] += 1
+            self._bellege_koy(anahtar, govde)
+        return govde
+
+    def koy(self, anahtar, govde):
+        with self._kilit:
+            self._bellege_koy(anahtar, govde)
+        self._diske_yaz(anahtar, govde)
+
+    def temizle(self):
+        with self._kilit:
+            self._kayitlar.clear()
+            self._bayt = 0
+
+    def _bellege_koy(self, anahtar, govde):
+        if len(govde) > self.azami_bayt:
+            return
+        eski = self._kayitlar.pop(anahtar, None)
+        if eski is not None:
+            self._bayt -= len(eski)
+        self._kayitlar[anahtar] = govde
+        self._bayt += len(govde)
+        while self._bayt > self.azami_bayt:
+            _, atilan = self._kayitlar.popitem(last=False)
+            self._bayt -= len(atilan)
+            self.sayaclar['tahliye'] += 1
+
+    # --- disk katmanı ---
+
+    def _dosya_yolu(self, anahtar):
+        return os.path.join(self.disk_dizini, f"{anahtar}.json")
+
+    def _diskten_oku(self, anahtar):
+        if not self.disk_dizini:
+            return None
+        yol = self._dosya_yolu(anahtar)
+        try:
+            with open(yol, 'rb') as f:
+                govde = f.read()
+            os.utime(yol)  # disk temizliğinde son kullanım zamanı olarak kullanılır
+            return govde
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            self.sayaclar['disk_hata'] += 1
+            logger.warning(f"Yanıt önbelleği diskten okunamadı ({yol}): {e}")
+            return None
+
+    def _diske_yaz(self, anahtar, govde):
+        if not self.disk_dizini or len(govde) > self.disk_azami_bayt:
+            return
+        try:
+            # Önce geçici dosyaya yazılır, sonra atomik olarak yerine taşınır (okuyucular yarım dosya görmez).
+            fd, gecici = tempfile.mkstemp(dir=self.disk_dizini, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(govde)
+            os.replace(gecici, self._dosya_yolu(anahtar))
+        except OSError as e:
+            self.sayaclar['disk_hata'] += 1
+            logger.warning(f"Yanıt önbelleği diske yazılamadı: {e}")
+            return
+        with self._kilit:
+            self._disk_yazilan += len(govde)
+            temizle = self._disk_yazilan > self.disk_azami_bayt // 10
+            if temizle:
+                self._disk_yazilan = 0
+        if temizle:
+            self._disk_temizle()
+
+    def _disk_temizle(self):
+        """ Disk katmanı sınırı aşıldıysa en uzun süredir kullanılmayan dosyaları siler. """
+        dosyalar = []
+        toplam = 0
+        try:
+            with os.scandir(self.disk_dizini) as girdiler:
+                for girdi in girdiler:
+                    if girdi.name.endswith('.json'):
+                        bilgi = girdi.stat()
+                        dosyalar.append((bilgi.st_mtime, bilgi.st_size, girdi.path))
+                        toplam += bilgi.st_size
+        except OSError as e:
+            logger.warning(f"Yanıt önbelleği dizini okunamadı: {e}")
+            return
+        if toplam <= self.disk_azami_bayt:
+            return
+        dosyalar.sort()
+        for _, boyut, yol in dosyalar:
+            if toplam <= self.disk_azami_bayt * 0.9:
+                break
+            try:
+                os.remove(yol)
+            except OSError:
+                continue  # başka bir worker silmiş olabilir
+            toplam -= boyut
+            self.sayaclar['disk_tahliye'] += 1
+
+    def istatistikler(self):
+        with self._kilit:
+            return dict(self.sayaclar, kayit_sayisi=len(self._kayitlar), bellek_bayt=self._bayt)
+
+
+def onbellek_anahtari(firma_id, uc, parametreler, surum, yol_parametreleri=None):
+    """ (firma_id, uç, yol ve sıralı sorgu parametreleri, veri sürümü) -> sabit uzunlukta anahtar. """
+    ham = json.dumps([firma_id, uc, yol_parametreleri or {}, sorted(parametreler.items(multi=True)), surum],
+                     ensure_ascii=False, default=str)
+    return hashlib.sha256(ham.encode('utf-8')).hexdigest()
+
+
+def onbellekli(uc):
+    """
+    firma_id alan bir GET görünümünün 200 JSON yanıtlarını sürümlü önbellekten sunan dekoratör.
+    Sürüm görünüm çalışmadan önce okunur; hesaplama sırasında veri değişirse sonuç eski
+    sürümün anahtarına yazılır ve bir daha okunmaz.
+    """
+    def dekorator(gorunum):
+        @wraps(gorunum)
+        def sarmalayici(firma_id, *args, **kwargs):
+            onbellek = current_app.extensions.get('yanit_onbellegi')
+            surum = veri_surumu(firma_id) if onbellek is not None else None
+            if surum is None:
+                return gorunum(firma_id, *args, **kwargs)
+            anahtar = onbellek_anahtari(firma_id, uc, request.args, surum, kwargs)
+            govde = onbellek.al(anahtar)
+            if govde is not None:
+                return current_app.response_class(govde, status=200, mimetype='application/json',
+                                                  headers={'X-Onbellek': 'HIT'})
+            yanit = current_app.make_response(gorunum(firma_id, *args, **kwargs))
+            if yanit.status_code == 200 and yanit.mimetype == 'application/json':
+                onbellek.koy(anahtar, yanit.get_data())
+                yanit.headers['X-Onbellek'] = 'MISS'
+            return yanit
+        return sarmalayici
+    return dekorator
+
+
+# === KOŞULLU GET ===
+
+def _firma_surumu(firma_id, **_):
+    return veri_surumu(firma_id)
+
+
+def kosullu_get(uc, surum=_firma_surumu):
+    """
+    Görünüme sürümden türetilen güçlü bir ETag ekleyen dekoratör. `surum`, görünüm
+    argümanlarıyla çağrılır ve sürüm değerini (kaynak yoksa None) döndürür. İstekteki
+    If-None-Match eşleşirse görünüm çalıştırılmadan 304 döner. Yalnızca 200 yanıtlar etiketlenir.
+    """
+    def dekorator(gorunum):
+        @wraps(gorunum)
+        def sarmalayici(*args, **kwargs):
+            deger = surum(*args, **kwargs)
+            if deger is None:
+                return gorunum(*args, **kwargs)
+            ham = json.dumps([uc, kwargs, deger, sorted(request.args.items(multi=True))], ensure_ascii=False, default=str)
+            etag = hashlib.sha256(ham.encode('utf-8')).hexdigest()[:32]
+            if request.if_none_match.contains(etag):
+                yanit = current_app.response_class(status=304)
+            else:
+                yanit = current_app.make_response(gorunum(*args, **kwargs))
+                if yanit.status_code != 200:
+                    return yanit
+            yanit.set_etag(etag)
+            # İstemci her kullanımda doğrulasın; yanıt kullanıcıya özel (Authorization) kabul edilir.
+            yanit.headers['Cache-Control'] = 'private, no-cache'
+            yanit.vary.add('Authorization')
+            return yanit
+        return sarmalayici
+    return dekorator
+
+
+def init_app(app):
+    app.config.setdefault('YANIT_ONBELLEK_BAYT', int(os.environ.get('YANIT_ONBELLEK_BAYT', VARSAYILAN_BELLEK_BAYT)))
+    app.config.setdefault('YANIT_ONBELLEK_DIZINI', os.environ.get('YANIT_ONBELLEK_DIZINI'))
+    app.config.setdefault('YANIT_ONBELLEK_DISK_BAYT', int(os.environ.get('YANIT_ONBELLEK_DISK_BAYT', VARSAYILAN_DISK_BAYT)))
+    if app.config['YANIT_ONBELLEK_BAYT'] <= 0:
+        return  # önbellek kapalı
+    app.extensions['yanit_onbellegi'] = YanitOnbellegi(
+        app.config['YANIT_ONBELLEK_BAYT'], app.config['YANIT_ONBELLEK_DIZINI'], app.config['YANIT_ONBELLEK_DISK_BAYT']
+    )
+
+
+def metrikler():
+    """ /metrics için (ad, tür, açıklama, değer) listesi. """
+    onbellek = current_app.extensions.get('yanit_onbellegi')
+    if onbellek is None:
+        return []
+    s = onbellek.istatistikler()
+    return [
+        ('yanit_onbellegi_bellek_isabet_toplam', 'counter', "Bellek katmanından sunulan yanıt sayısı", s['bellek_isabet']),
+        ('yanit_onbellegi_disk_isabet_toplam', 'counter', "Disk katmanından sunulan yanıt sayısı", s['disk_isabet']),
+        ('yanit_onbellegi_iskalama_toplam', 'counter', "Önbellekte bulunamayan istek sayısı", s['iskalama']),
+        ('yanit_onbellegi_tahliye_toplam', 'counter', "Boyut sınırı nedeniyle bellekten atılan kayıt sayısı", s['tahliye']),
+        ('yanit_onbellegi_disk_tahliye_toplam', 'counter', "Disk sınırı nedeniyle silinen dosya sayısı", s['disk_tahliye']),
+        ('yanit_onbellegi_disk_hata_toplam', 'counter', "Disk katmanı okuma/yazma hatası sayısı", s['disk_hata']),
+        ('yanit_onbellegi_kayit_sayisi', 'gauge', "Bellekteki kayıt sayısı", s['kayit_sayisi']),
+        ('yanit_onbellegi_bellek_bayt', 'gauge', "Bellekteki yanıt gövdelerinin toplam boyutu", s['bellek_bayt']),
+    ]
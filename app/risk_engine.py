@@ -0,0 +1,231 @@
+# app/risk_engine.py
+# Vektörel risk oranı / skor motoru. FinansalVeri alanları firma-dönem satırları boyunca
+# NumPy sütun dizilerine (float64) dönüştürülür; boş (None) değerler NaN olur. Kayıtlı her
+# model tüm satırları tek seferde dizi işlemleriyle hesaplar. Sıfır veya boş paydalar
+# maskelenir ve sonuç NaN olur (API'de None). Satır başına Python çağrısı veya try/except yoktur.
+#
+# Yeni model eklemek için:
+#
+#   @risk_modeli('model_adi', aciklama="...")
+#   def model_adi(v):
+#       return 1.2 * bol(v['donen_varliklar'], v['aktif_toplami']) + ...
+#
+# `v`, alan adı -> dizi sözlüğüdür. Model NaN içeren bir dizi döndürebilir.
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Motorun okuduğu FinansalVeri alanları
+GIRDI_ALANLARI = (
+    'donen_varliklar', 'duran_varliklar', 'aktif_toplami',
+    'kisa_vadeli_yukumlulukler', 'uzun_vadeli_yukumlulukler', 'toplam_yukumlulukler', 'oz_kaynaklar',
+    'net_satislar', 'satilan_malin_maliyeti', 'brut_kar_zarar', 'faaliyet_giderleri',
+    'esas_faaliyet_kari_zarari', 'finansman_giderleri', 'vergi_oncesi_kar_zarar',
+    'donem_net_kari_zarari', 'dagitilmamis_karlar',
+)
+
+# model adı -> {'fonksiyon', 'aciklama', 'ondalik'}
+MODELLER = {}
+
+
+def risk_modeli(ad, aciklama=None, ondalik=4):
+    """ Bir skor fonksiyonunu `ad` ile kayıt defterine ekleyen dekoratör. """
+    def kaydet(fonksiyon):
+        if ad in MODELLER:
+            raise ValueError(f"'{ad}' adlı risk modeli zaten kayıtlı.")
+        MODELLER[ad] = {'fonksiyon': fonksiyon, 'aciklama': aciklama or (fonksiyon.__doc__ or '').strip(), 'ondalik': ondalik}
+        return fonksiyon
+    return kaydet
+
+
+def bol(pay, payda):
+    """ Eleman bazında pay/payda; payda sıfır ya da herhangi bir taraf NaN ise NaN. """
+    sonuc = np.full(np.broadcast(pay, payda).shape, np.nan)
+    np.divide(pay, payda, out=sonuc, where=(payda != 0) & ~np.isnan(payda) & ~np.isnan(pay))
+    return sonuc
+
+
+def _sifirsa_nan(*diziler):
+    """ Verilen dizilerden herhangi biri sıfır olan satırlar için NaN maskesi (çarpılacak 1/NaN dizisi). """
+    maske = np.zeros(diziler[0].shape, dtype=bool)
+    for dizi in diziler:
+        maske |= (dizi == 0)
+    return np.where(maske, np.nan, 1.0)
+
+
+def sutunlara_donustur(kayitlar, alanlar=GIRDI_ALANLARI):
+    """
+    FinansalVeri nesnelerini, sözlükleri veya satır tuple'larını (alan sırasıyla) sütun
+    dizilerine dönüştürür: {alan: np.ndarray(float64)}. None -> NaN.
+    """
+    kayitlar = list(kayitlar)
+    if not kayitlar:
+        return {alan: np.empty(0) for alan in alanlar}
+    ilk = kayitlar[0]
+    if isinstance(ilk, dict):
+        satirlar = [[k.get(alan) for alan in alanlar] for k in kayitlar]
+    elif isinstance(ilk, (tuple, list)) or hasattr(ilk, '_mapping'):
+        satirlar = kayitlar
+    else:
+        satirlar = [[getattr(k, alan) for alan in alanlar] for k in kayitlar]
+    nan = np.nan
+    # float(Decimal) satır başına en pahalı adımdır; büyük kümelerde finansal_veri_sutunlari
+    # değerleri veritabanında float'a çevirerek okur.
+    return {
+        alan: np.fromiter(
+            (nan if deger is None else float(deger) for deger in sutun), dtype=np.float64, count=len(kayitlar)
+        )
+        for alan, sutun in zip(alanlar, zip(*satirlar))
+    }
+
+
+def float_sutunlari(tablo, alanlar=GIRDI_ALANLARI):
+    """ Select listesi için tutar sütunlarının float'a çevrilmiş halleri (GIRDI_ALANLARI sırasıyla). """
+    from sqlalchemy import cast, Float
+    return [cast(tablo.c[alan], Float).label(alan) for alan in alanlar]
+
+
+def finansal_veri_sutunlari(*kosullar):
+    """
+    FinansalVeri tablosunu (isteğe bağlı filtre koşullarıyla) sütun dizileri olarak okur.
+    Tutarlar sorguda float'a çevrilir; satır başına Decimal nesnesi oluşturulmaz.
+    (firma_idleri, donemler, sutunlar) döndürür. Sorgu sütunları için bkz. float_sutunlari.
+    """
+    from app import db
+    from app.models import FinansalVeri
+    from sqlalchemy import select
+
+    tablo = FinansalVeri.__table__
+    sorgu = select(
+        tablo.c.firma_id, tablo.c.donem, *float_sutunlari(tablo)
+    ).where(*kosullar).order_by(tablo.c.firma_id, tablo.c.donem)
+    satirlar = db.session.execute(sorgu).all()
+    return (np.array([s[0] for s in satirlar], dtype=np.int64), [s[1] for s in satirlar],
+            float_satirlarindan_sutunlar(satirlar, bas=2))
+
+
+def float_satirlarindan_sutunlar(satirlar, bas=0, alanlar=GIRDI_ALANLARI):
+    """
+    Alanları `bas` indeksinden itibaren GIRDI_ALANLARI sırasıyla ve float/None olarak içeren
+    sorgu satırlarını sütun dizilerine çevirir.
+    """
+    if not satirlar:
+        return {alan: np.empty(0) for alan in alanlar}
+    sutunlar = list(zip(*satirlar))[bas:bas + len(alanlar)]
+    return {alan: np.array(sutun, dtype=np.float64) for alan, sutun in zip(alanlar, sutunlar)}  # None -> nan
+
+
+def skorla(sutunlar, modeller=None):
+    """
+    Kayıtlı modelleri (veya `modeller` listesindekileri) sütun dizileri üzerinde çalıştırır.
+    {model_adi: np.ndarray} döndürür; hesaplanamayan satırlar NaN'dır.
+    """
+    secilen = MODELLER if modeller is None else {ad: MODELLER[ad] for ad in modeller}
+    sonuclar = {}
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        for ad, model in secilen.items():
+            deger = np.asarray(model['fonksiyon'](sutunlar), dtype=np.float64)
+            deger[~np.isfinite(deger)] = np.nan
+            sonuclar[ad] = np.round(deger, model['ondalik']) if model['ondalik'] is not None else deger
+    return sonuclar
+
+
+def satir_sonuclari(sonuclar):
+    """ {model: dizi} sonucunu satır başına {model: float | None} sözlüklerine çevirir (JSON için). """
+    adlar = list(sonuclar)
+    if not adlar:
+        return []
+    sutunlar = [
+        [None if deger != deger else deger for deger in sonuclar[ad].tolist()]  # NaN -> None
+        for ad in adlar
+    ]
+    return [dict(zip(adlar, satir)) for satir in zip(*sutunlar)]
+
+
+# === ORANLAR ===
+
+@risk_modeli('cari_oran', aciklama="Dönen varlıklar / kısa vadeli yükümlülükler")
+def cari_oran(v):
+    return bol(v['donen_varliklar'], v['kisa_vadeli_yukumlulukler'])
+
+
+@risk_modeli('borc_ozkaynak_orani', aciklama="Toplam yükümlülükler / özkaynaklar")
+def borc_ozkaynak_orani(v):
+    return bol(v['toplam_yukumlulukler'], v['oz_kaynaklar'])
+
+
+# === ALTMAN ===
+
+def _altman_oranlari(v):
+    aktif = v['aktif_toplami']
+    x1 = bol(v['donen_varliklar'] - v['kisa_vadeli_yukumlulukler'], aktif)
+    x2 = bol(v['dagitilmamis_karlar'], aktif)
+    x3 = bol(v['vergi_oncesi_kar_zarar'], aktif)
+    x4 = bol(v['oz_kaynaklar'], v['toplam_yukumlulukler'])
+    x5 = bol(v['net_satislar'], aktif)
+    return x1, x2, x3, x4, x5
+
+
+@risk_modeli('altman_z_skoru', aciklama="Altman Z' (halka açık olmayan şirketler); services.calculate_altman_z_score_updated ile aynı")
+def altman_z_skoru(v):
+    x1, x2, x3, x4, x5 = _altman_oranlari(v)
+    # Skaler sürüm gibi özkaynak sıfırsa da hesaplanmaz
+    return ((0.717 * x1) + (0.847 * x2) + (3.107 * x3) + (0.420 * x4) + (0.998 * x5)) * _sifirsa_nan(v['oz_kaynaklar'])
+
+
+@risk_modeli('altman_z_orijinal', aciklama="Altman Z (1968, üretim); X4 piyasa değeri yerine defter değeri özkaynak")
+def altman_z_orijinal(v):
+    x1, x2, x3, x4, x5 = _altman_oranlari(v)
+    return 1.2 * x1 + 1.4 * x2 + 3.3 * x3 + 0.6 * x4 + 1.0 * x5
+
+
+@risk_modeli('altman_z_uretim_disi', aciklama="Altman Z'' (üretim dışı / hizmet şirketleri, satış oranı yok)")
+def altman_z_uretim_disi(v):
+    x1, x2, x3, x4, _ = _altman_oranlari(v)
+    return 6.56 * x1 + 3.26 * x2 + 6.72 * x3 + 1.05 * x4
+
+
+@risk_modeli('altman_z_gelismekte_olan', aciklama="Altman EMS (gelişmekte olan piyasalar): Z'' + 3.25")
+def altman_z_gelismekte_olan(v):
+    return altman_z_uretim_disi(v) + 3.25
+
+
+# === SPRINGATE ===
+
+@risk_modeli('springate_s_skoru', aciklama="Springate (1978): S < 0.862 başarısızlık sinyali")
+def springate_s_skoru(v):
+    aktif = v['aktif_toplami']
+    favok = v['vergi_oncesi_kar_zarar'] + np.nan_to_num(v['finansman_giderleri'])  # faiz ve vergi öncesi kâr
+    a = bol(v['donen_varliklar'] - v['kisa_vadeli_yukumlulukler'], aktif)
+    b = bol(favok, aktif)
+    c = bol(v['vergi_oncesi_kar_zarar'], v['kisa_vadeli_yukumlulukler'])
+    d = bol(v['net_satislar'], aktif)
+    return 1.03 * a + 3.07 * b + 0.66 * c + 0.4 * d
+
+
+# === ZMIJEWSKI ===
+
+@risk_modeli('zmijewski_x_skoru', aciklama="Zmijewski (1984) probit skoru; pozitif değerler yüksek risk")
+def zmijewski_x_skoru(v):
+    aktif = v['aktif_toplami']
+    return (
+        -4.336
+        - 4.513 * bol(v['donem_net_kari_zarari'], aktif)
+        + 5.679 * bol(v['toplam_yukumlulukler'], aktif)
+        + 0.004 * bol(v['donen_varliklar'], v['kisa_vadeli_yukumlulukler'])
+    )
+
+
+def _normal_dagilim(x):
+    """ Standart normal birikimli dağılım; erf için Abramowitz-Stegun 7.1.26 (hata < 1.5e-7). """
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    erf = 1.0 - t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429)))) * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+@risk_modeli('zmijewski_olasilik', aciklama="Zmijewski skorundan iflas olasılığı (probit: Φ(X))")
+def zmijewski_olasilik(v):
+    return _normal_dagilim(zmijewski_x_skoru(v))
@@ -1,12 +1,36 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, url_for, Response, stream_with_context
 from app import db
-from app.models import User, Firma, FinansalVeri
+from app.models import User, Firma, FinansalVeri, IceAktarmaIsi, ParcaliYukleme, IceAktarmaKaydi
 from app.services import calculate_cari_oran, calculate_borc_ozkaynak_orani, calculate_altman_z_score_updated
-from app.financial_statement_service import get_donem_sonu_bakiyeleri, get_donem_ici_hareketler, generate_bilanco_v3, generate_gelir_tablosu_v3
+from app.financial_statement_service import (
+    get_donem_sonu_bakiyeleri, get_donem_ici_hareketler, get_donem_bakiyeleri_ve_hareketleri,
+    generate_bilanco_v3, generate_gelir_tablosu_v3,
+)
+from app.statement_engine import generate_bilanco, generate_gelir_tablosu
+from app.comparative_statement_service import karsilastirma_donemleri, get_karsilastirmali_tablolar, KarsilastirmaHatasi
+from app import account_resolver, response_cache
+from app.response_cache import onbellekli, kosullu_get, veri_surumunu_artir, genel_surumu_artir, genel_surum
+from app.risk_engine import MODELLER
+from app.portfolio_service import iter_portfolio_scores, VARSAYILAN_PARCA
+from app.trend_service import get_firma_trendi, iter_portfolio_trends, VARSAYILAN_PENCERE, AZAMI_PENCERE
+from app.jobs import enqueue_job, retry_job, spool_upload, serialize_job
+from app.edefter_service import delete_ice_aktarma
+from app.muhasebe_kayitlari_service import import_muhasebe_kayitlari
+from app import journal_export_service
+from app.ledger_service import muavin_sayfasi
+from app.trial_balance_service import get_mizan, TUTAR_ALANLARI
+from app.pagination import (
+    SayfalamaHatasi, alan_secimi, limit_parametresi, imlec_coz, imlec_kodla, keyset_kosulu, sayfa_yaniti,
+    sonraki_sayfa_basliklari,
+)
+from app.uploads import create_upload, append_chunk, complete_upload, cancel_upload, serialize_upload, YuklemeHatasi
 
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-import pandas as pd
-import io
+from sqlalchemy import select
+from datetime import datetime
+import json
+import os
+import zipfile
 
 bp = Blueprint('main', __name__)
 
@@ -58,6 +82,10 @@ def get_me():
     return jsonify({"id": user.id, "username": user.username}), 200
 
 # === FİRMA İŞLEMLERİ ===
+
+# /firmalar?fields=... ile istenebilecek alanlar
+FIRMA_LISTE_ALANLARI = ('id', 'adi', 'vkn', 'user_id', 'firma_tipi', 'kurulus_tarihi', 'faaliyet_alani')
+
 @bp.route('/firmalar', methods=['POST'])
 @jwt_required()
 def create_firma():
@@ -76,22 +104,48 @@ def create_firma():
 
     firma = Firma(adi=data['adi'], vkn=vkn_str, user_id=current_user_id)
     db.session.add(firma)
+    genel_surumu_artir('firmalar')
     db.session.commit()
     current_app.logger.info(f"Kullanıcı {current_user_id} yeni firma ekledi: {firma.adi} (ID: {firma.id})")
     return jsonify({"id": firma.id, "adi": firma.adi, "vkn": firma.vkn, "user_id": firma.user_id}), 201
 
 @bp.route('/firmalar', methods=['GET'])
 @jwt_required()
+@kosullu_get('firmalar', surum=lambda: genel_surum('firmalar'))
 def get_firmalar():
+    """
+    Firmaları (adi, id) sırasıyla sayfalı listeler: ?limit=, ?imlec= (X-Sonraki-Imlec başlığından),
+    ?fields=id,adi,... ile alan seçimi ve ?user_id= / ?firma_tipi= filtreleri.
+    """
     current_user_id = int(get_jwt_identity())
     # Prototip: Şimdilik tüm firmaları listeleyelim, yetkilendirme eklenebilir.
     # firmalar_query = Firma.query.filter_by(user_id=current_user_id).all() 
-    firmalar_query = Firma.query.order_by(Firma.adi).all()
-    firmalar_list = [{"id": f.id, "adi": f.adi, "vkn": f.vkn, "user_id": f.user_id} for f in firmalar_query]
-    return jsonify(firmalar_list), 200
+    tablo = Firma.__table__
+    try:
+        alanlar = alan_secimi(FIRMA_LISTE_ALANLARI, ('id', 'adi', 'vkn', 'user_id'))
+        limit = limit_parametresi()
+        imlec = request.args.get('imlec')
+        anahtar = imlec_coz(imlec, 2) if imlec else None
+        kullanici_filtresi = request.args.get('user_id')
+        if kullanici_filtresi is not None and not kullanici_filtresi.isdigit():
+            raise SayfalamaHatasi("'user_id' bir tam sayı olmalıdır.")
+    except SayfalamaHatasi as e:
+        return jsonify({"msg": str(e)}), 400
+
+    # Yalnızca istenen sütunlar (ve imleç için adi, id) seçilir; (adi, id) bileşik indeksleriyle okunur.
+    sorgu = select(*(tablo.c[alan] for alan in dict.fromkeys(alanlar + ['adi', 'id'])))
+    if kullanici_filtresi is not None:
+        sorgu = sorgu.where(tablo.c.user_id == int(kullanici_filtresi))
+    if request.args.get('firma_tipi'):
+        sorgu = sorgu.where(tablo.c.firma_tipi == request.args['firma_tipi'])
+    if anahtar is not None:
+        sorgu = sorgu.where(keyset_kosulu([tablo.c.adi, tablo.c.id], anahtar))
+    satirlar = db.session.execute(sorgu.order_by(tablo.c.adi, tablo.c.id).limit(limit + 1)).all()
+    return sayfa_yaniti(satirlar, alanlar, limit, ('adi', 'id')), 200
 
 @bp.route('/firmalar/<int:firma_id>', methods=['GET'])
 @jwt_required()
+@kosullu_get('firma_detay')
 def get_firma_detay(firma_id):
     current_user_id = int(get_jwt_identity())
     firma = Firma.query.get_or_404(firma_id)
@@ -123,6 +177,8 @@ def update_firma(firma_id):
     elif 'vkn' in data and not str(data['vkn']).strip(): # VKN silinmek isteniyorsa (model zorunlu yaptığı için bu senaryo engellenmeli)
          return jsonify({"msg": "VKN boş bırakılamaz."}), 400
     
+    veri_surumunu_artir(firma.id)
+    genel_surumu_artir('firmalar')
     db.session.commit()
     current_app.logger.info(f"Kullanıcı {current_user_id} firma güncelledi: {firma.adi} (ID: {firma.id})")
     return jsonify({"id": firma.id, "adi": firma.adi, "vkn": firma.vkn}), 200
@@ -137,6 +193,7 @@ def delete_firma(firma_id):
     
     firma_adi_log = firma.adi # Silmeden önce adını alalım
     db.session.delete(firma)
+    genel_surumu_artir('firmalar')
     db.session.commit()
     current_app.logger.info(f"Kullanıcı {current_user_id} firma sildi: {firma_adi_log} (ID: {firma_id})")
     return jsonify({"msg": f"'{firma_adi_log}' adlı firma başarıyla silindi"}), 200
@@ -158,56 +215,12 @@ def upload_financials(firma_id):
     
     if file and file.filename.endswith('.csv'):
         try:
-            df = pd.read_csv(io.StringIO(file.read().decode('utf-8-sig')))
-            if df.empty: return jsonify({"msg": "CSV dosyası boş"}), 400
-            
-            processed_count = 0
-            for index, data_row in df.iterrows():
-                donem = data_row.get('Donem')
-                if not donem or pd.isna(donem):
-                    current_app.logger.warning(f"Firma {firma_id}, Satır {index+1}: 'Donem' bilgisi eksik, atlanıyor.")
-                    continue
-
-                FinansalVeri.query.filter_by(firma_id=firma.id, donem=str(donem)).delete()
-                
-                veri_dict = {'firma_id': firma.id, 'donem': str(donem)}
-                model_columns = [column.key for column in FinansalVeri.__table__.columns]
-
-                for csv_col_name in df.columns:
-                    # CSV sütun adlarını modeldeki alan adlarına (snake_case) dönüştürmeye çalışalım
-                    # Örnek: 'AktifToplami' -> 'aktif_toplami'
-                    # Basit bir dönüşüm, daha karmaşık eşlemeler gerekebilir.
-                    model_field_candidate = csv_col_name.lower() # Basitçe küçük harfe çevirelim
-                    # Veya CSV'deki sütun adlarının modeldekiyle (snake_case) birebir aynı olduğunu varsayalım.
-                    # Bu örnekte CSV'deki sütun adlarının modeldekiyle aynı olduğunu varsayıyorum (örn: aktif_toplami)
-                    
-                    if csv_col_name.lower() in model_columns: # Modelde böyle bir alan var mı? (küçük harf karşılaştırması)
-                        try:
-                            value = data_row.get(csv_col_name)
-                            if pd.isna(value):
-                                veri_dict[csv_col_name.lower()] = None
-                            else:
-                                veri_dict[csv_col_name.lower()] = float(value)
-                        except ValueError:
-                            current_app.logger.warning(f"Firma {firma_id}, Dönem {str(donem)}, Sütun {csv_col_name}: Geçersiz sayısal değer '{data_row.get(csv_col_name)}'. None olarak ayarlandı.")
-                            veri_dict[csv_col_name.lower()] = None
-                    elif csv_col_name != 'Donem':
-                        current_app.logger.warning(f"Firma {firma_id}, CSV Sütunu '{csv_col_name}' modelde bulunamadı.")
-                
-                veri = FinansalVeri(**{k: v for k, v in veri_dict.items() if k in model_columns}) # Sadece modelde olanları ata
-                db.session.add(veri)
-                processed_count += 1
-            
-            if processed_count > 0:
-                db.session.commit()
-                current_app.logger.info(f"Kullanıcı {current_user_id}, Firma {firma_id} için {processed_count} döneme ait finansal veri yükledi/güncelledi.")
-                return jsonify({"msg": f"{firma.adi} için {processed_count} döneme ait finansal veriler işlendi."}), 201
-            else:
-                return jsonify({"msg": "CSV'den işlenecek geçerli veri satırı bulunamadı."}), 400
-        except pd.errors.EmptyDataError:
-            return jsonify({"msg": "CSV dosyası veri içermiyor veya formatı bozuk."}), 400
+            # Dosya diske alınır ve arka plan işine devredilir; parse/yazma istek thread'inde yapılmaz.
+            dosya_yolu = spool_upload(file)
+            is_kaydi = enqueue_job(firma.id, 'finansal_csv', dosya_yolu, orjinal_dosya_adi=file.filename, user_id=current_user_id)
+            current_app.logger.info(f"Kullanıcı {current_user_id}, Firma {firma_id} için finansal veri CSV'si '{file.filename}' kuyruğa alındı (İş: {is_kaydi.id}).")
+            return _is_kabul_yaniti(is_kaydi, f"{firma.adi} için finansal veri dosyası işlenmek üzere kuyruğa alındı.")
         except Exception as e:
-            db.session.rollback()
             current_app.logger.error(f"Finansal veri yükleme hatası (Firma ID: {firma_id}): {e}", exc_info=True)
             return jsonify({"msg": "Dosya işlenirken beklenmedik bir hata oluştu.", "error": str(e)}), 500
     else:
@@ -215,27 +228,42 @@ def upload_financials(firma_id):
 
 @bp.route('/firmalar/<int:firma_id>/finansal_veriler', methods=['GET'])
 @jwt_required()
+@kosullu_get('finansal_veriler')
 def get_finansal_veriler(firma_id):
+    """ Firmanın dönem verilerini yeniden eskiye sayfalı listeler (?limit=, ?imlec=, ?fields=, ?donem=). """
     current_user_id = int(get_jwt_identity())
     firma = Firma.query.get_or_404(firma_id)
     # if firma.user_id != current_user_id: 
     #      return jsonify({"msg": "Bu firmanın verilerini görüntüleme yetkiniz yok"}), 403
 
+    tablo = FinansalVeri.__table__
+    try:
+        alanlar = alan_secimi(tablo.columns.keys(), tablo.columns.keys())
+        limit = limit_parametresi()
+        imlec = request.args.get('imlec')
+        anahtar = imlec_coz(imlec, 1) if imlec else None
+    except SayfalamaHatasi as e:
+        return jsonify({"msg": str(e)}), 400
+
+    # Dönemler yeniden eskiye; (firma_id, donem) unique indeksi üzerinde keyset ile okunur.
     donem_param = request.args.get('donem')
-    query = FinansalVeri.query.filter_by(firma_id=firma.id)
+    sorgu = select(*(tablo.c[alan] for alan in dict.fromkeys(alanlar + ['donem']))).where(tablo.c.firma_id == firma.id)
     if donem_param:
-        query = query.filter_by(donem=donem_param)
-    veriler = query.order_by(FinansalVeri.donem.desc()).all()
+        sorgu = sorgu.where(tablo.c.donem == donem_param)
+    if anahtar is not None:
+        sorgu = sorgu.where(keyset_kosulu([tablo.c.donem], anahtar, azalan=True))
+    satirlar = db.session.execute(sorgu.order_by(tablo.c.donem.desc()).limit(limit + 1)).all()
     
-    if not veriler:
+    if not satirlar and anahtar is None:
         return jsonify({"msg": "Belirtilen kriterlere uygun finansal veri bulunamadı."}), 404
         
-    result = [{col.name: getattr(v, col.name) for col in v.__table__.columns} for v in veriler]
-    return jsonify(result), 200
+    return sayfa_yaniti(satirlar, alanlar, limit, ('donem',)), 200
 
 # === FİNANSAL ANALİZ İŞLEMLERİ ===
 @bp.route('/firmalar/<int:firma_id>/finansal_analiz', methods=['GET'])
 @jwt_required()
+@kosullu_get('finansal_analiz')
+@onbellekli('finansal_analiz')
 def get_finansal_analiz(firma_id):
     current_user_id = int(get_jwt_identity())
     firma = Firma.query.get_or_404(firma_id)
@@ -251,18 +279,21 @@ def get_finansal_analiz(firma_id):
         fin_veri = fin_veri_query.order_by(FinansalVeri.donem.desc()).first()
         if not fin_veri: return jsonify({"msg": "Firma için analiz edilecek finansal veri bulunamadı."}), 404
 
-    cari_oran_val = calculate_cari_oran(fin_veri.donen_varliklar, fin_veri.kisa_vadeli_yukumlulukler)
-    borc_ozkaynak_orani_val = calculate_borc_ozkaynak_orani(fin_veri.toplam_yukumlulukler, fin_veri.oz_kaynaklar)
-    altman_z_skoru_val = calculate_altman_z_score_updated(
-        fin_veri.donen_varliklar, fin_veri.aktif_toplami, fin_veri.kisa_vadeli_yukumlulukler,
-        fin_veri.dagitilmamis_karlar, fin_veri.vergi_oncesi_kar_zarar, fin_veri.oz_kaynaklar,
-        fin_veri.toplam_yukumlulukler, fin_veri.net_satislar
-    )
-
-    fin_veri.cari_oran = cari_oran_val
-    fin_veri.borc_ozkaynak_orani = borc_ozkaynak_orani_val
-    fin_veri.altman_z_skoru = altman_z_skoru_val
-    db.session.commit()
+    # Oranlar yazma sırasında hesaplanıp saklanır (bkz. financial_data_service); bu uç yalnızca okur.
+    # Henüz yeniden hesaplanmamış eski satırlar için değerler bellekte hesaplanır, yazılmaz.
+    cari_oran_val = fin_veri.cari_oran
+    if cari_oran_val is None:
+        cari_oran_val = calculate_cari_oran(fin_veri.donen_varliklar, fin_veri.kisa_vadeli_yukumlulukler)
+    borc_ozkaynak_orani_val = fin_veri.borc_ozkaynak_orani
+    if borc_ozkaynak_orani_val is None:
+        borc_ozkaynak_orani_val = calculate_borc_ozkaynak_orani(fin_veri.toplam_yukumlulukler, fin_veri.oz_kaynaklar)
+    altman_z_skoru_val = fin_veri.altman_z_skoru
+    if altman_z_skoru_val is None:
+        altman_z_skoru_val = calculate_altman_z_score_updated(
+            fin_veri.donen_varliklar, fin_veri.aktif_toplami, fin_veri.kisa_vadeli_yukumlulukler,
+            fin_veri.dagitilmamis_karlar, fin_veri.vergi_oncesi_kar_zarar, fin_veri.oz_kaynaklar,
+            fin_veri.toplam_yukumlulukler, fin_veri.net_satislar
+        )
     
     altman_yorum = "Hesaplanamadı veya Veri Yetersiz"
     if altman_z_skoru_val is not None:
@@ -282,9 +313,176 @@ def get_finansal_analiz(firma_id):
             "altman_z_skoru_yorum": altman_yorum
         }
     }), 200
-# app/routes.py dosyasının sonlarına doğru, diğer route'lardan sonra eklenebilir
-import xml.etree.ElementTree as ET # XML işleme için Python'un standart kütüphanesi
-# Daha gelişmiş XML işlemleri için lxml kütüphanesi de değerlendirilebilir: pip install lxml
+
+def _pencere_parametresi():
+    try:
+        pencere = int(request.args.get('pencere', VARSAYILAN_PENCERE))
+    except ValueError:
+        raise ValueError("'pencere' bir tam sayı olmalıdır.")
+    if not 1 <= pencere <= AZAMI_PENCERE:
+        raise ValueError(f"'pencere' 1 ile {AZAMI_PENCERE} arasında olmalıdır.")
+    return pencere
+
+
+@bp.route('/firmalar/<int:firma_id>/finansal_trend', methods=['GET'])
+@jwt_required()
+@kosullu_get('finansal_trend')
+@onbellekli('finansal_trend')
+def get_finansal_trend(firma_id):
+    """
+    Firmanın tüm dönemleri boyunca büyüme oranları, oranların ?pencere=N dönemlik hareketli
+    ortalamaları ve Altman Z' değişimi (varsayılan pencere: 3).
+    """
+    firma = Firma.query.get_or_404(firma_id)
+    try:
+        pencere = _pencere_parametresi()
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    trend = get_firma_trendi(firma.id, pencere)
+    if trend is None:
+        return jsonify({"msg": "Firma için analiz edilecek finansal veri bulunamadı."}), 404
+    return jsonify({"firma_adi": firma.adi, "pencere": pencere, **trend}), 200
+
+
+@bp.route('/portfoy/risk_skorlari', methods=['GET'])
+@jwt_required()
+def get_portfoy_risk_skorlari():
+    """
+    Tüm firmaları (veya ?firma_id=1,2,3 ile seçilenleri) ?donem=... ya da en son dönem için
+    skorlar; sonuçlar NDJSON (satır başına bir firma) olarak akış halinde döner.
+    ?modeller=altman_z_skoru,cari_oran ile model seçilebilir (varsayılan: tümü).
+    """
+    donem_param = request.args.get('donem') or None
+    try:
+        firma_idleri = [int(i) for i in request.args['firma_id'].split(',') if i.strip()] if request.args.get('firma_id') else None
+        parca = min(max(int(request.args.get('parca', VARSAYILAN_PARCA)), 1), 10000)
+    except ValueError:
+        return jsonify({"msg": "firma_id ve parca tamsayı olmalıdır."}), 400
+    modeller = [m.strip() for m in request.args['modeller'].split(',') if m.strip()] if request.args.get('modeller') else None
+    if modeller:
+        bilinmeyen = [m for m in modeller if m not in MODELLER]
+        if bilinmeyen:
+            return jsonify({"msg": f"Bilinmeyen model(ler): {', '.join(bilinmeyen)}", "modeller": sorted(MODELLER)}), 400
+
+    def uret():
+        try:
+            for kayit in iter_portfolio_scores(donem_param, firma_idleri, modeller, parca):
+                yield json.dumps(kayit, ensure_ascii=False) + '\n'
+        except Exception as e:
+            current_app.logger.error(f"Portföy skorlama hatası: {e}", exc_info=True)
+            yield json.dumps({"hata": "Skorlama sırasında sunucu içi bir hata oluştu."}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(uret()), mimetype='application/x-ndjson')
+
+
+@bp.route('/portfoy/finansal_trend', methods=['GET'])
+@jwt_required()
+def get_portfoy_finansal_trend():
+    """
+    Tüm firmalar (veya ?firma_id=1,2,3) için trend analizi; NDJSON akışı. Varsayılan olarak
+    firma başına en son dönem satırı, ?tum_donemler=1 ile tüm dönemler. ?pencere=N hareketli ortalama penceresidir.
+    """
+    try:
+        firma_idleri = [int(i) for i in request.args['firma_id'].split(',') if i.strip()] if request.args.get('firma_id') else None
+        parca = min(max(int(request.args.get('parca', VARSAYILAN_PARCA)), 1), 10000)
+    except ValueError:
+        return jsonify({"msg": "firma_id ve parca tamsayı olmalıdır."}), 400
+    try:
+        pencere = _pencere_parametresi()
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    tum_donemler = request.args.get('tum_donemler', '').lower() in ('1', 'true', 'evet')
+
+    def uret():
+        try:
+            for kayit in iter_portfolio_trends(firma_idleri, pencere, tum_donemler, parca):
+                yield json.dumps(kayit, ensure_ascii=False) + '\n'
+        except Exception as e:
+            current_app.logger.error(f"Portföy trend analizi hatası: {e}", exc_info=True)
+            yield json.dumps({"hata": "Trend analizi sırasında sunucu içi bir hata oluştu."}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(uret()), mimetype='application/x-ndjson')
+
+# === E-DEFTER İŞLEMLERİ ===
+@bp.route('/firmalar/<int:firma_id>/muavin/<hesap_kodu>', methods=['GET'])
+@jwt_required()
+@kosullu_get('muavin')
+def get_muavin(firma_id, hesap_kodu):
+    """
+    Hesabın yevmiye satırlarını yürüyen bakiyeyle (borç - alacak) tarih sırasıyla sayfalı listeler.
+    ?baslangic= / ?bitis= (YYYY-AA-GG), ?limit=, ?imlec= (yanıttaki sonraki_imlec)
+    """
+    firma = Firma.query.get_or_404(firma_id)
+    try:
+        baslangic = datetime.strptime(request.args['baslangic'], '%Y-%m-%d').date() if request.args.get('baslangic') else None
+        bitis = datetime.strptime(request.args['bitis'], '%Y-%m-%d').date() if request.args.get('bitis') else None
+    except ValueError:
+        return jsonify({"msg": "Tarih formatı geçersiz. Lütfen YYYY-AA-GG formatını kullanın."}), 400
+    try:
+        limit = limit_parametresi()
+        imlec = None
+        if request.args.get('imlec'):
+            imlec_tarihi, imlec_id = imlec_coz(request.args['imlec'], 2)
+            try:
+                imlec = (datetime.strptime(imlec_tarihi, '%Y-%m-%d').date(), int(imlec_id))
+            except (TypeError, ValueError):
+                raise SayfalamaHatasi("Geçersiz imleç.")
+    except SayfalamaHatasi as e:
+        return jsonify({"msg": str(e)}), 400
+
+    acilis, satirlar, sonraki = muavin_sayfasi(firma.id, hesap_kodu, baslangic, bitis, imlec, limit)
+    for satir in satirlar:
+        for alan in ('borc_tutari', 'alacak_tutari', 'bakiye'):
+            satir[alan] = f"{satir[alan]:.2f}"
+        for alan in ('muhasebe_kayit_tarihi', 'belge_tarihi'):
+            satir[alan] = satir[alan].isoformat() if satir[alan] else None
+    sonraki_imlec = imlec_kodla([sonraki[0].isoformat(), sonraki[1]]) if sonraki else None
+    yanit = jsonify({
+        "firma_adi": firma.adi,
+        "hesap_kodu": hesap_kodu,
+        "acilis_bakiyesi": f"{acilis:.2f}",
+        "kapanis_bakiyesi": satirlar[-1]['bakiye'] if satirlar else f"{acilis:.2f}",
+        "satirlar": satirlar,
+        "sonraki_imlec": sonraki_imlec,
+    })
+    if sonraki_imlec:
+        sonraki_sayfa_basliklari(yanit, sonraki_imlec)
+    return yanit, 200
+
+@bp.route('/firmalar/<int:firma_id>/yevmiye', methods=['GET'])
+@jwt_required()
+def export_yevmiye(firma_id):
+    """
+    Firmanın yevmiye satırlarını başlık bilgileriyle birlikte akış halinde dışa aktarır.
+    ?format=ndjson (varsayılan) | csv, ?baslangic= / ?bitis= (YYYY-AA-GG), ?hesap_kodu= (önek), ?belge_no=
+    """
+    firma = Firma.query.get_or_404(firma_id)
+    bicim = request.args.get('format', 'ndjson').lower()
+    if bicim not in journal_export_service.FORMATLAR:
+        return jsonify({"msg": f"Desteklenmeyen format: {bicim}. Geçerli formatlar: {', '.join(journal_export_service.FORMATLAR)}"}), 400
+    try:
+        baslangic = datetime.strptime(request.args['baslangic'], '%Y-%m-%d').date() if request.args.get('baslangic') else None
+        bitis = datetime.strptime(request.args['bitis'], '%Y-%m-%d').date() if request.args.get('bitis') else None
+    except ValueError:
+        return jsonify({"msg": "Tarih formatı geçersiz. Lütfen YYYY-AA-GG formatını kullanın."}), 400
+
+    sorgu = journal_export_service.yevmiye_sorgusu(
+        firma.id, baslangic, bitis, request.args.get('hesap_kodu'), request.args.get('belge_no')
+    )
+    uretici, mimetype = journal_export_service.FORMATLAR[bicim]
+
+    def uret():
+        try:
+            yield from uretici(sorgu)
+        except Exception as e:
+            # Başlıklar gönderildiği için durum kodu değiştirilemez; akış yarıda kesilir.
+            current_app.logger.error(f"Yevmiye dışa aktarım hatası (Firma {firma_id}): {e}", exc_info=True)
+            raise
+
+    dosya_adi = f"yevmiye_{firma_id}_{baslangic or 'baslangic'}_{bitis or 'son'}.{bicim}"
+    return Response(stream_with_context(uret()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{dosya_adi}"'})
 
 @bp.route('/firmalar/<int:firma_id>/upload_edefter_xml', methods=['POST'])
 @jwt_required()
@@ -304,72 +502,230 @@ def upload_edefter_xml(firma_id):
 
     if xml_file and xml_file.filename.endswith('.xml'):
         try:
-            # Dosyayı güvenli bir şekilde oku (içeriği doğrudan parse etmeden önce)
-            xml_content_bytes = xml_file.read()
-            xml_content_str = xml_content_bytes.decode('utf-8') # Genellikle UTF-8 olur
-
-            # --------------------------------------------------------------------
-            # XML PARSE ETME VE VERİ ÇIKARMA MANTIĞI BURAYA GELECEK
-            # Bu kısım e-defterin yapısına göre çok detaylı olacaktır.
-            # Aşağıda basit bir örnek verilecek.
-            # --------------------------------------------------------------------
-
-            # Örnek: XML'den basit bir veri çekme ve loglama
-            # root = ET.fromstring(xml_content_str)
-            # ornegin_bir_deger = root.findtext('.//OrnekBirAlan') # XPath ile bir alan bulma
-            # current_app.logger.info(f"E-defterden okunan örnek değer: {ornegin_bir_deger}")
-
-            # --------------------------------------------------------------------
-            # ÇIKARILAN VERİLERİ FinansalVeri MODELİNE İŞLEME MANTIĞI
-            # --------------------------------------------------------------------
-            # Bu aşamada, parse edilen XML'den aldığınız toplamları,
-            # FinansalVeri modelindeki alanlara (aktif_toplami, net_satislar vb.)
-            # uygun bir dönem için kaydetmeniz gerekecek.
-            # Bu, ciddi bir muhasebe ve veri eşleştirme mantığı gerektirir.
-            # 
-            # Örnek:
-            # donem_bilgisi = "2024-YILSONU" # XML'den çıkarılmalı
-            # aktif_toplami_xml = ... # XML'den hesaplanmalı
-            # net_satislar_xml = ... # XML'den hesaplanmalı
-            #
-            # FinansalVeri.query.filter_by(firma_id=firma.id, donem=donem_bilgisi).delete() # Eski veriyi sil
-            # yeni_veri = FinansalVeri(
-            #     firma_id=firma.id,
-            #     donem=donem_bilgisi,
-            #     aktif_toplami=aktif_toplami_xml,
-            #     net_satislar=net_satislar_xml,
-            #     # ... diğer alanlar ...
-            # )
-            # db.session.add(yeni_veri)
-            # db.session.commit()
-            # --------------------------------------------------------------------
-
-            current_app.logger.info(f"Kullanıcı {current_user_id}, Firma {firma_id} için e-defter dosyası '{xml_file.filename}' yüklendi ve işlenmeye çalışıldı.")
-            return jsonify({"msg": f"E-defter dosyası '{xml_file.filename}' alındı. İşleme mantığı henüz tam olarak geliştirilmedi."}), 200
-
-        except ET.ParseError as pe:
-            current_app.logger.error(f"E-defter XML parse hatası (Firma ID: {firma_id}): {pe}", exc_info=True)
-            return jsonify({"msg": "XML dosyası ayrıştırılırken hata oluştu. Lütfen dosya formatını kontrol edin.", "error": str(pe)}), 400
-        except UnicodeDecodeError as ude:
-            current_app.logger.error(f"E-defter dosya kodlama hatası (Firma ID: {firma_id}): {ude}", exc_info=True)
-            return jsonify({"msg": "Dosya karakter kodlaması hatası. Dosyanın UTF-8 olduğundan emin olun.", "error": str(ude)}), 400
+            # Dosya belleğe okunmadan diske alınır; streaming parse arka plan işinde yapılır.
+            dosya_yolu = spool_upload(xml_file)
+            is_kaydi = enqueue_job(firma.id, 'edefter_xml', dosya_yolu, orjinal_dosya_adi=xml_file.filename, user_id=current_user_id)
+            current_app.logger.info(f"Kullanıcı {current_user_id}, Firma {firma_id} için e-defter dosyası '{xml_file.filename}' kuyruğa alındı (İş: {is_kaydi.id}).")
+            return _is_kabul_yaniti(is_kaydi, f"E-defter dosyası '{xml_file.filename}' işlenmek üzere kuyruğa alındı.")
         except Exception as e:
             current_app.logger.error(f"E-defter yükleme sırasında beklenmedik hata (Firma ID: {firma_id}): {e}", exc_info=True)
             return jsonify({"msg": "E-defter yüklenirken beklenmedik bir hata oluştu.", "error": str(e)}), 500
     else:
         return jsonify({"msg": "Geçersiz dosya formatı. Lütfen .xml uzantılı bir e-defter dosyası yükleyin."}), 400
-# app/routes.py içine eklenecek
-# from app.financial_statement_service import get_hesap_bakiyeleri, generate_bilanco_from_hesap_bakiyeleri, generate_gelir_tablosu_from_hesap_bakiyeleri # Eğer ayrı bir dosyaya taşıdıysanız
-# Veya services.py içindeyse oradan import edin. Şimdilik aynı dosyada olduğunu varsayalım.
+
+@bp.route('/firmalar/<int:firma_id>/upload_edefter_zip', methods=['POST'])
+@jwt_required()
+def upload_edefter_zip(firma_id):
+    current_user_id = int(get_jwt_identity())
+    firma = Firma.query.get_or_404(firma_id)
+
+    if 'file' not in request.files:
+        return jsonify({"msg": "Dosya bulunamadı"}), 400
+    zip_file = request.files['file']
+    if zip_file.filename == '':
+        return jsonify({"msg": "Dosya seçilmedi"}), 400
+    if not zip_file.filename.lower().endswith('.zip'):
+        return jsonify({"msg": "Geçersiz dosya formatı. Lütfen aylık e-defter XML'lerini içeren bir .zip arşivi yükleyin."}), 400
+
+    try:
+        dosya_yolu = spool_upload(zip_file)
+        if not zipfile.is_zipfile(dosya_yolu):
+            os.remove(dosya_yolu)
+            return jsonify({"msg": "Dosya geçerli bir ZIP arşivi değil."}), 400
+        is_kaydi = enqueue_job(firma.id, 'edefter_zip', dosya_yolu, orjinal_dosya_adi=zip_file.filename, user_id=current_user_id)
+        current_app.logger.info(f"Kullanıcı {current_user_id}, Firma {firma_id} için e-defter arşivi '{zip_file.filename}' kuyruğa alındı (İş: {is_kaydi.id}).")
+        return _is_kabul_yaniti(is_kaydi, f"E-defter arşivi '{zip_file.filename}' işlenmek üzere kuyruğa alındı.")
+    except Exception as e:
+        current_app.logger.error(f"E-defter arşivi yükleme hatası (Firma ID: {firma_id}): {e}", exc_info=True)
+        return jsonify({"msg": "E-defter arşivi yüklenirken beklenmedik bir hata oluştu.", "error": str(e)}), 500
+
+@bp.route('/firmalar/<int:firma_id>/upload_muhasebe_kayitlari', methods=['POST'])
+@jwt_required()
+def upload_muhasebe_kayitlari(firma_id):
+    current_user_id = int(get_jwt_identity())
+    firma = Firma.query.get_or_404(firma_id)
+
+    if 'file' not in request.files:
+        return jsonify({"msg": "Dosya bulunamadı"}), 400
+    xml_file = request.files['file']
+    if xml_file.filename == '':
+        return jsonify({"msg": "Dosya seçilmedi"}), 400
+    if not xml_file.filename.lower().endswith('.xml'):
+        return jsonify({"msg": "Geçersiz dosya formatı. Lütfen MuhasebeKayitlari biçiminde bir .xml dosyası yükleyin."}), 400
+
+    try:
+        # Bakiye dosyaları küçüktür; yevmiye yolunun aksine istek içinde, akış halinde işlenir.
+        sonuc = import_muhasebe_kayitlari(firma.id, xml_file.stream, donem=request.form.get('donem'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Muhasebe kayıtları yükleme hatası (Firma ID: {firma_id}): {e}", exc_info=True)
+        return jsonify({"msg": "Bakiye dosyası işlenirken beklenmedik bir hata oluştu.", "error": str(e)}), 500
+
+    current_app.logger.info(f"Kullanıcı {current_user_id}, Firma {firma_id} için '{xml_file.filename}' bakiye dosyasından {sonuc['donem']} dönemi yüklendi.")
+    return jsonify({"msg": f"{firma.adi} için {sonuc['donem']} dönemi finansal verisi oluşturuldu/güncellendi.", **sonuc}), 201
+
+def _ice_aktarma_kaydi_sozlugu(kayit):
+    return {
+        "id": kayit.id,
+        "orjinal_dosya_adi": kayit.orjinal_dosya_adi,
+        "dosya_ozeti": kayit.dosya_ozeti,
+        "dosya_boyutu": kayit.dosya_boyutu,
+        "madde_sayisi": kayit.madde_sayisi,
+        "satir_sayisi": kayit.satir_sayisi,
+        "atlanan_madde_sayisi": kayit.atlanan_madde_sayisi,
+        "tamamlandi": kayit.tamamlandi,
+        "yuklenme_tarihi": kayit.yuklenme_tarihi.isoformat() if kayit.yuklenme_tarihi else None,
+    }
+
+@bp.route('/firmalar/<int:firma_id>/ice_aktarmalar', methods=['GET'])
+@jwt_required()
+def get_ice_aktarmalar(firma_id):
+    firma = Firma.query.get_or_404(firma_id)
+    kayitlar = firma.ice_aktarma_kayitlari.order_by(IceAktarmaKaydi.yuklenme_tarihi.desc()).all()
+    return jsonify([_ice_aktarma_kaydi_sozlugu(k) for k in kayitlar]), 200
+
+@bp.route('/firmalar/<int:firma_id>/ice_aktarmalar/<int:kayit_id>', methods=['DELETE'])
+@jwt_required()
+def delete_ice_aktarma_kaydi(firma_id, kayit_id):
+    current_user_id = int(get_jwt_identity())
+    kayit = IceAktarmaKaydi.query.filter_by(id=kayit_id, firma_id=firma_id).first_or_404()
+    dosya_adi = kayit.orjinal_dosya_adi
+    try:
+        silinen = delete_ice_aktarma(kayit)
+    except Exception as e:
+        current_app.logger.error(f"İçe aktarma kaydı silme hatası (Firma ID: {firma_id}, Kayıt: {kayit_id}): {e}", exc_info=True)
+        return jsonify({"msg": "İçe aktarma kaydı silinirken beklenmedik bir hata oluştu.", "error": str(e)}), 500
+    current_app.logger.info(f"Kullanıcı {current_user_id}, Firma {firma_id}: '{dosya_adi}' içe aktarması silindi ({silinen} madde).")
+    return jsonify({"msg": f"'{dosya_adi}' dosyasıyla yüklenen {silinen} yevmiye maddesi silindi."}), 200
+
+# === ARKA PLAN İŞLERİ ===
+def _is_kabul_yaniti(is_kaydi, mesaj):
+    """ Kuyruğa alınan iş için 202 Accepted yanıtı (Location: /jobs/<id>). """
+    durum_url = url_for('main.get_job', job_id=is_kaydi.id)
+    yanit = jsonify({"msg": mesaj, "job_id": is_kaydi.id, "durum": is_kaydi.durum, "durum_url": durum_url})
+    return yanit, 202, {"Location": durum_url}
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    is_kaydi = db.session.get(IceAktarmaIsi, job_id)
+    if is_kaydi is None:
+        return jsonify({"msg": "İş bulunamadı."}), 404
+    return jsonify(serialize_job(is_kaydi)), 200
+
+@bp.route('/jobs/<job_id>/yeniden_dene', methods=['POST'])
+@jwt_required()
+def retry_ice_aktarma_isi(job_id):
+    try:
+        is_kaydi = retry_job(job_id)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 409
+    if is_kaydi is None:
+        return jsonify({"msg": "İş bulunamadı."}), 404
+    current_app.logger.info(f"Kullanıcı {get_jwt_identity()}: içe aktarma işi {job_id} yeniden kuyruğa alındı.")
+    return _is_kabul_yaniti(is_kaydi, "İş yeniden kuyruğa alındı.")
+
+# === PARÇALI (RESUMABLE) YÜKLEME ===
+def _yukleme_yaniti(yukleme, durum_kodu=200):
+    return jsonify(serialize_upload(yukleme)), durum_kodu, {"Upload-Offset": str(yukleme.alinan_boyut)}
+
+@bp.route('/firmalar/<int:firma_id>/yuklemeler', methods=['POST'])
+@jwt_required()
+def create_parcali_yukleme(firma_id):
+    current_user_id = int(get_jwt_identity())
+    firma = Firma.query.get_or_404(firma_id)
+    data = request.get_json() or {}
+    if not data.get('dosya_adi'):
+        return jsonify({"msg": "'dosya_adi' zorunludur."}), 400
+    try:
+        toplam_boyut = int(data['toplam_boyut']) if data.get('toplam_boyut') is not None else None
+        yukleme = create_upload(firma.id, data['dosya_adi'], toplam_boyut=toplam_boyut, tur=data.get('tur'), user_id=current_user_id)
+    except (TypeError, ValueError):
+        return jsonify({"msg": "'toplam_boyut' bir tam sayı olmalıdır."}), 400
+    except YuklemeHatasi as ye:
+        return jsonify({"msg": str(ye)}), ye.durum_kodu
+    current_app.logger.info(f"Kullanıcı {current_user_id}, Firma {firma_id} için parçalı yükleme başlattı: {yukleme.id} ('{yukleme.orjinal_dosya_adi}')")
+    yanit, kod, basliklar = _yukleme_yaniti(yukleme, 201)
+    basliklar["Location"] = url_for('main.get_parcali_yukleme', upload_id=yukleme.id)
+    return yanit, kod, basliklar
+
+@bp.route('/yuklemeler/<upload_id>', methods=['GET', 'HEAD'])
+@jwt_required()
+def get_parcali_yukleme(upload_id):
+    yukleme = db.session.get(ParcaliYukleme, upload_id)
+    if yukleme is None:
+        return jsonify({"msg": "Yükleme bulunamadı."}), 404
+    return _yukleme_yaniti(yukleme)
+
+@bp.route('/yuklemeler/<upload_id>', methods=['PATCH', 'PUT'])
+@jwt_required()
+def append_parcali_yukleme(upload_id):
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({"msg": "Geçerli bir 'Upload-Offset' başlığı zorunludur."}), 400
+    try:
+        # Gövde request.stream'den bloklar halinde okunur; request.data kullanılmaz.
+        yeni_offset = append_chunk(upload_id, offset, request.stream)
+    except YuklemeHatasi as ye:
+        mevcut = db.session.get(ParcaliYukleme, upload_id)
+        basliklar = {"Upload-Offset": str(mevcut.alinan_boyut)} if mevcut else {}
+        return jsonify({"msg": str(ye)}), ye.durum_kodu, basliklar
+    return jsonify({"upload_id": upload_id, "offset": yeni_offset}), 200, {"Upload-Offset": str(yeni_offset)}
+
+@bp.route('/yuklemeler/<upload_id>/tamamla', methods=['POST'])
+@jwt_required()
+def complete_parcali_yukleme(upload_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        yukleme, is_kaydi = complete_upload(upload_id, sha256=data.get('sha256'))
+    except YuklemeHatasi as ye:
+        return jsonify({"msg": str(ye)}), ye.durum_kodu
+    return _is_kabul_yaniti(is_kaydi, f"'{yukleme.orjinal_dosya_adi}' yüklemesi tamamlandı, işlenmek üzere kuyruğa alındı.")
+
+@bp.route('/yuklemeler/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def cancel_parcali_yukleme(upload_id):
+    try:
+        yukleme = cancel_upload(upload_id)
+    except YuklemeHatasi as ye:
+        return jsonify({"msg": str(ye)}), ye.durum_kodu
+    return jsonify({"msg": "Yükleme iptal edildi.", "upload_id": yukleme.id}), 200
+
+# === MALİ TABLOLAR ===
+
+def _karsilastirmali_mali_tablolar(firma):
+    """ /mali_tablolar karşılaştırmalı modu: ?donemler=... veya ?karsilastirma=yillik|aylik&donem_bitis=... """
+    try:
+        donemler = karsilastirma_donemleri(request.args)
+    except KarsilastirmaHatasi as e:
+        return jsonify({"msg": str(e)}), 400
+
+    try:
+        sonuc = get_karsilastirmali_tablolar(firma.id, donemler)
+    except Exception as e:
+        current_app.logger.error(f"Karşılaştırmalı mali tablo hatası (Firma ID: {firma.id}, {len(donemler)} dönem): {e}", exc_info=True)
+        return jsonify({"msg": "Karşılaştırmalı mali tablolar alınırken sunucu içi bir hata oluştu."}), 500
+    if sonuc is None:
+        return jsonify({"msg": "Belirtilen dönemler için işlenmiş yevmiye verisi veya hesap özeti bulunamadı."}), 404
+
+    return jsonify({"firma_id": firma.id, **sonuc}), 200
+
 
 @bp.route('/firmalar/<int:firma_id>/mali_tablolar', methods=['GET'])
 @jwt_required()
+@kosullu_get('mali_tablolar')
+@onbellekli('mali_tablolar')
 def get_mali_tablolar(firma_id):
     current_app.logger.debug(f"/mali_tablolar endpoint'i çağrıldı. Firma ID: {firma_id}")
     # current_user_id = int(get_jwt_identity()) # Yetkilendirme için kullanılabilir
     firma = Firma.query.get_or_404(firma_id)
     # Yetkilendirme kontrolü eklenebilir
 
+    if 'donemler' in request.args or 'karsilastirma' in request.args:
+        return _karsilastirmali_mali_tablolar(firma)
+
     donem_baslangic_str = request.args.get('donem_baslangic') # YYYY-AA-GG
     donem_bitis_str = request.args.get('donem_bitis')       # YYYY-AA-GG
 
@@ -386,17 +742,20 @@ def get_mali_tablolar(firma_id):
 
     try:
         current_app.logger.info(f"Firma {firma_id} için {donem_baslangic_str} - {donem_bitis_str} dönemi hesap bakiyeleri çekiliyor...")
-        hesap_bakiyeleri_donem = get_hesap_bakiyeleri_for_period(firma_id, donem_baslangic_date, donem_bitis_date)
+        # Dönem sonu bakiyeleri ve dönem içi hareketler tek sorguda
+        donem_sonu_bakiyeleri, donem_ici_hareketler = get_donem_bakiyeleri_ve_hareketleri(
+            firma_id, donem_baslangic_date, donem_bitis_date
+        )
         
-        if not hesap_bakiyeleri_donem:
+        if not donem_sonu_bakiyeleri:
             current_app.logger.warning(f"Firma {firma_id}, Dönem {donem_baslangic_str}-{donem_bitis_str} için hesap özeti bulunamadı.")
             return jsonify({"msg": f"Belirtilen dönem için işlenmiş yevmiye verisi veya hesap özeti bulunamadı."}), 404
 
         current_app.logger.info(f"Firma {firma_id} için Bilanço oluşturuluyor...")
-        bilanco = generate_bilanco(hesap_bakiyeleri_donem)
+        bilanco = generate_bilanco(donem_sonu_bakiyeleri)
         
         current_app.logger.info(f"Firma {firma_id} için Gelir Tablosu oluşturuluyor...")
-        gelir_tablosu = generate_gelir_tablosu(hesap_bakiyeleri_donem)
+        gelir_tablosu = generate_gelir_tablosu(donem_ici_hareketler)
         
         # İsteğe bağlı: Bu türetilmiş özetleri FinansalVeri tablosuna kaydetme mantığı
         # (Bir önceki yanıtta bahsedilmişti, buraya eklenebilir)
@@ -431,3 +790,55 @@ def get_mali_tablolar(firma_id):
         "gelir_tablosu": gelir_tablosu,
         # "debug_hesap_bakiyeleri": hesap_bakiyeleri_donem # Debug için
     }), 200
+
+
+@bp.route('/firmalar/<int:firma_id>/mizan', methods=['GET'])
+@jwt_required()
+@kosullu_get('mizan')
+@onbellekli('mizan')
+def get_mizan_tablosu(firma_id):
+    """
+    Sınıf, grup, ana hesap ve alt hesap seviyelerinde mizan (?donem_baslangic=, ?donem_bitis= YYYY-AA-GG).
+    Açılış: dönem başından önceki hareketler; kapanış: açılış + dönem.
+    """
+    firma = Firma.query.get_or_404(firma_id)
+    donem_baslangic_str = request.args.get('donem_baslangic')
+    donem_bitis_str = request.args.get('donem_bitis')
+    if not donem_baslangic_str or not donem_bitis_str:
+        return jsonify({"msg": "Lütfen 'donem_baslangic' ve 'donem_bitis' parametrelerini YYYY-AA-GG formatında sağlayın."}), 400
+    try:
+        donem_baslangic_date = datetime.strptime(donem_baslangic_str, '%Y-%m-%d').date()
+        donem_bitis_date = datetime.strptime(donem_bitis_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"msg": "Tarih formatı geçersiz. Lütfen YYYY-AA-GG formatını kullanın."}), 400
+    if donem_baslangic_date > donem_bitis_date:
+        return jsonify({"msg": "Başlangıç tarihi bitiş tarihinden sonra olamaz."}), 400
+
+    mizan = get_mizan(firma.id, donem_baslangic_date, donem_bitis_date)
+    tutar_alanlari = TUTAR_ALANLARI + ('kapanis_borc', 'kapanis_alacak', 'borc_bakiye', 'alacak_bakiye')
+    for kayit in mizan:
+        for alan in tutar_alanlari:
+            kayit[alan] = f"{kayit[alan]:.2f}"
+    genel_toplam = mizan[-1] if mizan else None
+    return jsonify({
+        "firma_adi": firma.adi,
+        "donem_baslangic": donem_baslangic_str,
+        "donem_bitis": donem_bitis_str,
+        "mizan": mizan,
+        # Borç ve alacak toplamları eşit olmalıdır (çift taraflı kayıt)
+        "denk": genel_toplam is None or genel_toplam['kapanis_borc'] == genel_toplam['kapanis_alacak'],
+    }), 200
+
+
+# === İZLEME ===
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """ Prometheus metin biçiminde uygulama sayaçları. """
+    satirlar = []
+    for ad, tur, aciklama, deger in account_resolver.metrikler() + response_cache.metrikler():
+        satirlar.append(f"# HELP {ad} {aciklama}")
+        satirlar.append(f"# TYPE {ad} {tur}")
+        satirlar.append(f"{ad} {deger}")
+    return '\n'.join(satirlar) + '\n', 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
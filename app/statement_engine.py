@@ -0,0 +1,291 @@
+# app/statement_engine.py
+# Derlenmiş mali tablo motoru. BILANCO_YAPISI / GELIR_TABLOSU_YAPISI bir kez düz dizilere
+# derlenir: her düğümün (taraf / grup / alt grup / kalem) ebeveyn indeksi ve her hesap
+# kodunun bağlı olduğu yaprak düğüm ile işareti (+1 / -1, düzenleyici hesaplar için -1).
+# Bir tablo, hesap verileri üzerinde tek doğrusal geçişle yapraklara toplanır; ara toplamlar
+# düğümler ters sırada dolaşılarak aşağıdan yukarı ebeveynlere aktarılır.
+#
+# Yapıda açıkça listelenmemiş kodlar account_resolver kurallarıyla (en uzun önek, '12x',
+# '100-108' ...) çözülür; financial_statement_service ile aynı kuralları kullanır.
+#
+# Çıktı biçimi generate_bilanco_v3 / generate_gelir_tablosu_v3 ile aynıdır; tutarlar ağaç
+# kurulurken metne çevrilir (ayrı bir rekürsif dönüştürme geçişi yapılmaz).
+
+from app.financial_statement_service import HESAP_DETAYLARI, BILANCO_YAPISI, GELIR_TABLOSU_YAPISI
+from app.account_resolver import varsayilan_cozucu, bilinmeyen_kod_bildir
+from decimal import Decimal
+from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SIFIR = Decimal(0)
+
+
+def _metin(tutar):
+    return f"{tutar:.2f}" # İki ondalık basamakla string'e çevir
+
+
+def _detay_metni(detay):
+    return {k: f"{v:.2f}" for k, v in detay.items()}
+
+
+class _CozumluMotor:
+    """ Hesap kodlarını hedef düğümlere bağlama: yapıdaki açık kodlar, yoksa çözücünün kuralı. """
+
+    baglam = None
+
+    def _cozucu_kur(self, cozucu, hesap_detaylari):
+        self.cozucu = cozucu
+        # Çözücünün döndürdüğü detay nesnesi -> o detaya sahip hesabın hedefi
+        self._detay_hedefleri = {id(d): self.hesaplar[k] for k, d in hesap_detaylari.items() if k in self.hesaplar}
+        self._kural_sayisi = cozucu.kural_sayisi if cozucu is not None else None
+        self._cozumlenmis = {}
+        self._yerlesmeyen = set()  # çözülen ama tabloda yeri olmayan kodlar
+
+    def _guncelle(self):
+        # Çözücüye sonradan kural eklendiyse önceki çözümler geçersizdir
+        if self.cozucu is not None and self._kural_sayisi != self.cozucu.kural_sayisi:
+            self._kural_sayisi = self.cozucu.kural_sayisi
+            self._cozumlenmis.clear()
+            self._yerlesmeyen.clear()
+
+    def hedef(self, kod):
+        """ Hesap kodunun (düğüm, işaret) hedefi; alt hesaplar (örn. 120.01) ana hesaba bağlanır. """
+        try:
+            return self._cozumlenmis[kod]
+        except KeyError:
+            pass
+        sonuc = self.hesaplar.get(kod)
+        detay = None
+        if sonuc is None and self.cozucu is not None:
+            detay = self.cozucu.coz(kod)
+            if detay is not None:
+                sonuc = self._detay_hedefleri.get(id(detay)) or self._detaydan_hedef(detay)
+        if sonuc is None:
+            # Yapıda listelenip HESAP_DETAYLARI'nda olmayan ana hesapların alt hesapları
+            sonuc = self.hesaplar.get(kod[:3])
+        if sonuc is None and detay is not None and self._tabloya_ait(detay):
+            self._yerlesmeyen.add(kod)
+        self._cozumlenmis[kod] = sonuc
+        return sonuc
+
+    def _atlanan(self, kod):
+        # Bu tabloya ait olduğu halde yerleştirilemeyen kodlar bilinmeyen kod olarak bildirilir
+        if kod in self._yerlesmeyen:
+            bilinmeyen_kod_bildir(kod, self.baglam)
+
+
+class DerlenmisBilanco(_CozumluMotor):
+    """ BILANCO_YAPISI'nın düz dizi gösterimi. """
+
+    baglam = 'bilanço yapısında yeri yok'
+    _TARAFLAR = {'BILANCO_AKTIF': 'AKTIFLER', 'BILANCO_PASIF': 'PASIFLER'}
+
+    TARAF, GRUP, ALT_GRUP = 0, 1, 2
+
+    def __init__(self, yapi, hesap_detaylari, cozucu=None):
+        self.adlar = []       # düğüm adı
+        self.ebeveyn = []     # ebeveyn düğüm indeksi (taraflar için -1)
+        self.turler = []      # TARAF / GRUP / ALT_GRUP
+        self.hesaplar = {}    # hesap_kodu -> (yaprak indeksi, işaret)
+        self._yollar = yollar = {}  # (taraf, grup, alt grup) -> yaprak indeksi
+
+        # Ön-sıralı (pre-order) dolaşım: her düğüm ebeveyninden sonra gelir.
+        def ekle(ad, ebeveyn, tur):
+            self.adlar.append(ad)
+            self.ebeveyn.append(ebeveyn)
+            self.turler.append(tur)
+            return len(self.adlar) - 1
+
+        def dolas(seviye, ebeveyn, yol):
+            for ad, alt in seviye.items():
+                if isinstance(alt, dict):
+                    dolas(alt, ekle(ad, ebeveyn, self.GRUP), yol + (ad,))
+                elif isinstance(alt, list):
+                    yaprak = ekle(ad, ebeveyn, self.ALT_GRUP)
+                    yollar[yol + (ad,)] = yaprak
+                    for kod in alt:
+                        self.hesaplar.setdefault(kod, (yaprak, self._isaret(hesap_detaylari.get(kod))))
+
+        self.taraflar = {}
+        for taraf, seviye in yapi.items():
+            self.taraflar[taraf] = ekle(taraf, -1, self.TARAF)
+            dolas(seviye, self.taraflar[taraf], (taraf,))
+
+        # Yapıda listelenmemiş ama HESAP_DETAYLARI'nda grubu tanımlı hesaplar
+        for kod, detay in hesap_detaylari.items():
+            if kod not in self.hesaplar:
+                h = self._detaydan_hedef(detay)
+                if h is not None:
+                    self.hesaplar[kod] = h
+
+        self._cozucu_kur(cozucu, hesap_detaylari)
+
+    def _tabloya_ait(self, detay):
+        return detay.get('fs_section') in self._TARAFLAR
+
+    def _detaydan_hedef(self, detay):
+        if not self._tabloya_ait(detay):
+            return None
+        yaprak = self._yollar.get((self._TARAFLAR[detay['fs_section']], detay.get('fs_group'), detay.get('fs_sub_group')))
+        return None if yaprak is None else (yaprak, self._isaret(detay))
+
+    @staticmethod
+    def _isaret(detay):
+        if not detay:
+            return 1
+        if 'fs_impact_bilanco' in detay:
+            return detay['fs_impact_bilanco']
+        return -1 if detay.get('type', '').startswith('REG_') else 1
+
+    def hesapla(self, hesap_verileri, bakiye_alani='dönem_sonu_bakiye'):
+        """ Düğüm toplamları listesi ve yaprak bazında detay sözlükleri döndürür. """
+        self._guncelle()
+        toplamlar = [_SIFIR] * len(self.adlar)
+        detaylar = {}
+        hedef = self.hedef
+        for kod in hesap_verileri:
+            h = hedef(kod)
+            if h is None:
+                self._atlanan(kod)
+                continue
+            yaprak, isaret = h
+            veri = hesap_verileri[kod]
+            tutar = veri[bakiye_alani] * isaret
+            toplamlar[yaprak] += tutar
+            detaylar.setdefault(yaprak, {})[f"{kod} {veri.get('adi', '')}"] = tutar
+        ebeveyn = self.ebeveyn
+        for i in range(len(toplamlar) - 1, -1, -1):
+            if ebeveyn[i] >= 0:
+                toplamlar[ebeveyn[i]] += toplamlar[i]
+        return toplamlar, detaylar
+
+    def olustur(self, hesap_verileri):
+        """ Tutarları metne çevrilmiş sonuç ağacını ve düğüm toplamlarını döndürür. """
+        toplamlar, detaylar = self.hesapla(hesap_verileri)
+        sonuc = {}
+        kaplar = []
+        for i, ad in enumerate(self.adlar):
+            ust = sonuc if self.ebeveyn[i] < 0 else kaplar[self.ebeveyn[i]]
+            if self.turler[i] == self.ALT_GRUP:
+                ust[ad] = {"detay": _detay_metni(detaylar.get(i, {})), "ALT_GRUP_TOPLAMI": _metin(toplamlar[i])}
+            else:
+                ust[ad] = {}
+            kaplar.append(ust[ad])
+        # Toplam anahtarları alt düğümlerden sonra gelsin (v3 çıktısıyla aynı sıra)
+        for i, tur in enumerate(self.turler):
+            if tur == self.GRUP:
+                kaplar[i]['GRUP_TOPLAMI'] = _metin(toplamlar[i])
+            elif tur == self.TARAF:
+                kaplar[i]['GENEL_TOPLAM'] = _metin(toplamlar[i])
+        return sonuc, toplamlar
+
+
+class DerlenmisGelirTablosu(_CozumluMotor):
+    """ GELIR_TABLOSU_YAPISI'nın düz dizi gösterimi; ara toplamlar yapı sırasıyla hesaplanır. """
+
+    baglam = 'gelir tablosu yapısında yeri yok'
+
+    def __init__(self, yapi, hesap_detaylari, cozucu=None):
+        self.adlar = [item['kalem_adi'] for item in yapi]
+        self.hesaplamalar = [item.get('hesaplama') for item in yapi]
+        self.hesaplar = {}
+
+        self._grup_kalemleri = {}
+        for i, item in enumerate(yapi):
+            if 'hesap_gruplari' in item:
+                self._grup_kalemleri[item['kalem_adi']] = i
+                for grup in item['hesap_gruplari']:
+                    self._grup_kalemleri[grup] = i
+        for kod, detay in hesap_detaylari.items():
+            h = self._detaydan_hedef(detay)
+            if h is not None:
+                self.hesaplar[kod] = h
+        self._cozucu_kur(cozucu, hesap_detaylari)
+
+    def _tabloya_ait(self, detay):
+        return detay.get('fs_section') == 'GELIR_TABLOSU'
+
+    def _detaydan_hedef(self, detay):
+        if not self._tabloya_ait(detay):
+            return None
+        kalem = self._grup_kalemleri.get(detay.get('gelir_tablosu_grup'), self._grup_kalemleri.get(detay.get('fs_group')))
+        if kalem is None:
+            return None
+        if 'fs_impact_gelir_tablosu' in detay:
+            isaret = detay['fs_impact_gelir_tablosu']
+        else:
+            isaret = 1 if detay.get('type') == 'GELIR' else -1  # gider, maliyet ve indirimler düşülür
+        return kalem, isaret
+
+    def hesapla(self, hesap_verileri, hareket_alani='net_donem_hareketi'):
+        """ Kalem tutarları (ara toplamlar dahil) listesi ve kalem bazında detay sözlükleri döndürür. """
+        self._guncelle()
+        tutarlar = [_SIFIR] * len(self.adlar)
+        detaylar = {}
+        hedef = self.hedef
+        for kod in hesap_verileri:
+            h = hedef(kod)
+            if h is None:
+                self._atlanan(kod)
+                continue
+            kalem, isaret = h
+            veri = hesap_verileri[kod]
+            tutar = veri[hareket_alani] * isaret
+            tutarlar[kalem] += tutar
+            detaylar.setdefault(kalem, {})[f"{kod} {veri.get('adi', '')}"] = tutar
+
+        ara_toplamlar = {}
+        for i, ad in enumerate(self.adlar):
+            hesaplama = self.hesaplamalar[i]
+            if hesaplama is not None:
+                tutarlar[i] = hesaplama(ara_toplamlar)
+            ara_toplamlar[ad] = tutarlar[i]
+        return tutarlar, detaylar
+
+    def olustur(self, hesap_verileri, hareket_alani='net_donem_hareketi'):
+        """ Tutarları metne çevrilmiş gelir tablosunu ve kalem tutarlarını döndürür. """
+        tutarlar, detaylar = self.hesapla(hesap_verileri, hareket_alani)
+        sonuc = {}
+        for i, ad in enumerate(self.adlar):
+            sonuc[ad] = {"TUTAR": _metin(tutarlar[i]), "DETAY": _detay_metni(detaylar[i])} if i in detaylar else _metin(tutarlar[i])
+        return sonuc, tutarlar
+
+
+@lru_cache(maxsize=None)
+def bilanco_motoru():
+    return DerlenmisBilanco(BILANCO_YAPISI, HESAP_DETAYLARI, varsayilan_cozucu())
+
+
+@lru_cache(maxsize=None)
+def gelir_tablosu_motoru():
+    return DerlenmisGelirTablosu(GELIR_TABLOSU_YAPISI, HESAP_DETAYLARI, varsayilan_cozucu())
+
+
+def generate_bilanco(donem_sonu_bakiyeleri):
+    """ get_donem_sonu_bakiyeleri çıktısından bilanço üretir (generate_bilanco_v3 ile aynı biçim). """
+    return bilanco_ve_toplamlar(donem_sonu_bakiyeleri)[0]
+
+
+def bilanco_ve_toplamlar(donem_sonu_bakiyeleri):
+    """ generate_bilanco ile aynı; ayrıca bilanco_motoru() düğüm sırasıyla Decimal toplamları döndürür. """
+    motor = bilanco_motoru()
+    bilanco, toplamlar = motor.olustur(donem_sonu_bakiyeleri)
+    aktif_toplami = toplamlar[motor.taraflar["AKTIFLER"]]
+    pasif_toplami = toplamlar[motor.taraflar["PASIFLER"]]
+    if abs(aktif_toplami - pasif_toplami) > Decimal('0.01'): # Tolerans
+        denklik_farki = aktif_toplami - pasif_toplami
+        logger.warning(f"BİLANÇO DENKLİĞİ SAĞLANAMADI! Fark: {denklik_farki:.2f} (Aktif: {aktif_toplami}, Pasif: {pasif_toplami})")
+        bilanco["DENKLIK_SORUNU"] = f"Fark: {denklik_farki:.2f} (Aktif: {aktif_toplami}, Pasif: {pasif_toplami})"
+    return bilanco, toplamlar
+
+
+def generate_gelir_tablosu(donem_ici_hareketler):
+    """ get_donem_ici_hareketler çıktısından gelir tablosu üretir (generate_gelir_tablosu_v3 ile aynı biçim). """
+    return gelir_tablosu_motoru().olustur(donem_ici_hareketler)[0]
+
+
+def gelir_tablosu_ve_tutarlar(donem_ici_hareketler):
+    """ generate_gelir_tablosu ile aynı; ayrıca gelir_tablosu_motoru() kalem sırasıyla Decimal tutarları döndürür. """
+    return gelir_tablosu_motoru().olustur(donem_ici_hareketler)
@@ -0,0 +1,154 @@
+# app/trend_service.py
+# Firma ve portföy bazında dönemler boyunca oran/tutar trendleri: büyüme oranları, hareketli
+# ortalamalar ve Altman Z' değişimi. FinansalVeri tek sorguda (firma_id, donem) sırasıyla
+# sütun dizileri olarak okunur (risk_engine.finansal_veri_sutunlari), oranlar risk_engine ile
+# vektörel hesaplanır; büyüme ve farklar pandas groupby('firma_id') kaydırmalarıyla, hareketli
+# ortalamalar firma sınırında kırpılan önek toplamı pencereleriyle tüm firmalar için aynı anda hesaplanır.
+# Portföy görünümü firmaları firma_id sırasıyla parçalar halinde işler; bellek parça boyutuyla sınırlıdır.
+
+from app import db
+from app.models import Firma, FinansalVeri
+from app.risk_engine import finansal_veri_sutunlari, skorla, bol
+from app.portfolio_service import altman_yorumlari, VARSAYILAN_PARCA
+from sqlalchemy import select
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+VARSAYILAN_PENCERE = 3
+AZAMI_PENCERE = 24
+
+# Büyüme oranı hesaplanan tutarlar ve hareketli ortalaması alınan oranlar (risk_engine model adları)
+TREND_TUTARLARI = ('net_satislar', 'aktif_toplami', 'oz_kaynaklar', 'donem_net_kari_zarari')
+TREND_ORANLARI = ('cari_oran', 'borc_ozkaynak_orani', 'altman_z_skoru')
+
+
+def gruplu_hareketli_ortalama(degerler, sira, pencere):
+    """
+    Grup (firma) içinde sıralı ve gruplara göre ardışık satırlar için son `pencere` satırın
+    NaN'ları yok sayan ortalaması (rolling(pencere, min_periods=1).mean() ile aynı).
+    `degerler` satır × sütun dizisi, `sira` satırın grubundaki sırasıdır (cumcount). Pencere
+    toplamları önek toplamlarının farkıdır; pencerenin başı grup başında kırpılır.
+    """
+    dolu = ~np.isnan(degerler)
+    toplam = np.vstack([np.zeros((1, degerler.shape[1])), np.cumsum(np.where(dolu, degerler, 0.0), axis=0)])
+    adet = np.vstack([np.zeros((1, degerler.shape[1])), np.cumsum(dolu, axis=0)])
+    son = np.arange(1, len(degerler) + 1)
+    bas = son - np.minimum(sira + 1, pencere)
+    return bol(toplam[son] - toplam[bas], adet[son] - adet[bas])
+
+
+def trend_cercevesi(firma_idleri, donemler, sutunlar, pencere=VARSAYILAN_PENCERE):
+    """
+    finansal_veri_sutunlari çıktısından (firma_id, donem sıralı) trend tablosu. Her satırda
+    tutarlar, oranlar, `<tutar>_buyume_yuzde` (önceki döneme göre; negatif tabanlarda payda
+    mutlak değerdir), `<oran>_hareketli_ort` (firmanın son `pencere` dönemi) ve
+    altman_z_skoru_degisim bulunur. Firma sınırları aşılmaz; ilk dönemin büyümesi NaN'dır.
+    """
+    df = pd.DataFrame({'firma_id': firma_idleri, 'donem': donemler})
+    for alan in TREND_TUTARLARI:
+        df[alan] = sutunlar[alan]
+    oranlar = skorla(sutunlar, TREND_ORANLARI)
+    for ad in TREND_ORANLARI:
+        df[ad] = oranlar[ad]
+
+    gruplar = df.groupby('firma_id', sort=False)
+    tutarlar = list(TREND_TUTARLARI)
+    onceki = gruplar[tutarlar].shift(1).to_numpy()
+    buyume = bol(df[tutarlar].to_numpy() - onceki, np.abs(onceki)) * 100.0
+    for i, alan in enumerate(tutarlar):
+        df[f'{alan}_buyume_yuzde'] = buyume[:, i]
+
+    # groupby().rolling() pencere sınırlarını grup başına Python'da hesaplar; burada tek geçişte.
+    ortalamalar = gruplu_hareketli_ortalama(
+        df[list(TREND_ORANLARI)].to_numpy(), gruplar.cumcount().to_numpy(), pencere
+    )
+    for i, ad in enumerate(TREND_ORANLARI):
+        df[f'{ad}_hareketli_ort'] = ortalamalar[:, i]
+    df['altman_z_skoru_degisim'] = gruplar['altman_z_skoru'].diff()
+    df['altman_z_skoru_yorum'] = altman_yorumlari(df['altman_z_skoru'].to_numpy())
+    return df
+
+
+def kayitlar(df):
+    """ Trend tablosu satırlarını JSON'a uygun sözlüklere çevirir (4 ondalık, NaN -> None). """
+    sayisal = df.select_dtypes('float').columns
+    df = df.assign(**{ad: df[ad].round(4) for ad in sayisal})
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _ortalama_buyume(seri):
+    """ İlk ve son pozitif değer arasındaki dönem başına bileşik büyüme (%); hesaplanamazsa None. """
+    seri = seri.dropna()
+    if len(seri) < 2 or seri.iloc[0] <= 0 or seri.iloc[-1] <= 0:
+        return None
+    return round(((seri.iloc[-1] / seri.iloc[0]) ** (1.0 / (len(seri) - 1)) - 1) * 100.0, 4)
+
+
+def get_firma_trendi(firma_id, pencere=VARSAYILAN_PENCERE):
+    """
+    Firmanın tüm dönemleri için trend satırları ve özet: {'donemler': [...], 'ozet': {...}}.
+    Firmanın finansal verisi yoksa None döner.
+    """
+    firma_idleri, donemler, sutunlar = finansal_veri_sutunlari(FinansalVeri.__table__.c.firma_id == firma_id)
+    if not donemler:
+        return None
+    df = trend_cercevesi(firma_idleri, donemler, sutunlar, pencere)
+
+    z = df['altman_z_skoru'].dropna()
+    ozet = {
+        'donem_sayisi': len(df),
+        'ilk_donem': donemler[0],
+        'son_donem': donemler[-1],
+        'altman_z_skoru': None if z.empty else {
+            'ilk': round(float(z.iloc[0]), 4), 'son': round(float(z.iloc[-1]), 4),
+            'degisim': round(float(z.iloc[-1] - z.iloc[0]), 4),
+            'en_dusuk': round(float(z.min()), 4), 'en_yuksek': round(float(z.max()), 4),
+        },
+        'ortalama_buyume_yuzde': {alan: _ortalama_buyume(df[alan]) for alan in TREND_TUTARLARI},
+    }
+    return {'donemler': kayitlar(df.drop(columns='firma_id')), 'ozet': ozet}
+
+
+def iter_portfolio_trends(firma_idleri=None, pencere=VARSAYILAN_PENCERE, tum_donemler=False, parca=VARSAYILAN_PARCA):
+    """
+    Portföydeki firmaların trend satırlarını firma_id sırasıyla üretir: varsayılan olarak firma
+    başına en son dönem (hareketli ortalamalar ve son büyüme ile), `tum_donemler` ile tüm
+    dönemler. Her parçada `parca` firmanın tüm dönemleri tek sorguda okunur. Veritabanına yazılmaz.
+    """
+    fv = FinansalVeri.__table__
+    firma = Firma.__table__
+    son_firma_id = 0
+    toplam = 0
+    while True:
+        kosullar = [fv.c.firma_id > son_firma_id]
+        if firma_idleri is not None:
+            kosullar.append(fv.c.firma_id.in_(firma_idleri))
+        # Parçanın son firması; bir firmanın dönemleri parçalara bölünmez
+        sinir = db.session.execute(
+            select(fv.c.firma_id).where(*kosullar).distinct().order_by(fv.c.firma_id).offset(parca - 1).limit(1)
+        ).scalar()
+        if sinir is not None:
+            kosullar.append(fv.c.firma_id <= sinir)
+        ids, donemler, sutunlar = finansal_veri_sutunlari(*kosullar)
+        if not donemler:
+            break
+
+        df = trend_cercevesi(ids, donemler, sutunlar, pencere)
+        if not tum_donemler:
+            df = df.groupby('firma_id', sort=False).tail(1)
+        adlar = dict(db.session.execute(
+            select(firma.c.id, firma.c.adi).where(firma.c.id.in_(np.unique(ids).tolist()))
+        ).all())
+        df.insert(1, 'firma_adi', df['firma_id'].map(adlar))
+        for kayit in kayitlar(df):
+            yield kayit
+        toplam += len(df)
+        son_firma_id = int(ids[-1])
+        # Parça arasında bağlantı/oturum kaynakları serbest bırakılır
+        db.session.rollback()
+        if sinir is None:
+            break
+    logger.info(f"Portföy trend analizi tamamlandı: {toplam} satır (pencere: {pencere}).")
@@ -0,0 +1,169 @@
+# app/trial_balance_service.py
+# Mizan: TDHP sınıf (1), grup (10), ana hesap (100) ve alt hesap (100.01) seviyelerinde
+# açılış, dönem ve kapanış borç/alacak toplamları. Tüm seviyeler ve tüm sütunlar yevmiye
+# satırları üzerinde tek bir taramadan gelir:
+#   - açılış / dönem ayrımı SUM(CASE WHEN muhasebe_kayit_tarihi < :baslangic ...) ile,
+#   - kapanış = açılış + dönem,
+#   - PostgreSQL'de seviyeler GROUP BY ROLLUP(sinif, grup, hesap_kodu, alt_hesap_kodu) ile
+#     aynı sorguda üretilir (GROUPING() seviyeyi belirtir);
+#   - diğer veritabanlarında (SQLite) sorgu (hesap_kodu, alt_hesap_kodu) bazında gruplanır ve
+#     üst seviyeler bu (küçük) sonuç üzerinde Python'da toplanır.
+
+from app import db
+from app.models import YevmiyeFisiSatiri
+from sqlalchemy import select, func, case, literal_column, type_coerce
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SIFIR = Decimal('0.00')
+_satir = YevmiyeFisiSatiri.__table__
+
+SEVIYELER = ('sinif', 'grup', 'hesap', 'alt_hesap', 'toplam')
+
+# Tek Düzen Hesap Planı hesap sınıfları
+TDHP_SINIFLARI = {
+    '1': 'DÖNEN VARLIKLAR',
+    '2': 'DURAN VARLIKLAR',
+    '3': 'KISA VADELİ YABANCI KAYNAKLAR',
+    '4': 'UZUN VADELİ YABANCI KAYNAKLAR',
+    '5': 'ÖZKAYNAKLAR',
+    '6': 'GELİR TABLOSU HESAPLARI',
+    '7': 'MALİYET HESAPLARI',
+    '8': 'SERBEST',
+    '9': 'NAZIM HESAPLAR',
+}
+
+TUTAR_ALANLARI = ('acilis_borc', 'acilis_alacak', 'donem_borc', 'donem_alacak')
+
+
+def _onek(sutun, uzunluk):
+    # Sabit uzunluk SELECT ve GROUP BY'da aynı ifade olarak derlensin diye bind parametresi kullanılmaz.
+    return func.substr(sutun, literal_column('1'), literal_column(str(uzunluk)))
+
+
+def _tutar_sutunlari(baslangic):
+    acilis = _satir.c.muhasebe_kayit_tarihi < baslangic
+    return [
+        type_coerce(func.sum(case((acilis, _satir.c.borc_tutari), else_=0)), db.Numeric(18, 2)).label('acilis_borc'),
+        type_coerce(func.sum(case((acilis, _satir.c.alacak_tutari), else_=0)), db.Numeric(18, 2)).label('acilis_alacak'),
+        type_coerce(func.sum(case((acilis, 0), else_=_satir.c.borc_tutari)), db.Numeric(18, 2)).label('donem_borc'),
+        type_coerce(func.sum(case((acilis, 0), else_=_satir.c.alacak_tutari)), db.Numeric(18, 2)).label('donem_alacak'),
+    ]
+
+
+def _kayit(seviye, kod, adi, tutarlar):
+    kayit = {'seviye': seviye, 'kod': kod, 'adi': adi}
+    kayit.update(tutarlar)
+    kayit['kapanis_borc'] = kayit['acilis_borc'] + kayit['donem_borc']
+    kayit['kapanis_alacak'] = kayit['acilis_alacak'] + kayit['donem_alacak']
+    fark = kayit['kapanis_borc'] - kayit['kapanis_alacak']
+    kayit['borc_bakiye'] = fark if fark > 0 else _SIFIR
+    kayit['alacak_bakiye'] = -fark if fark < 0 else _SIFIR
+    return kayit
+
+
+def mizan_sorgusu_rollup(firma_id, baslangic, bitis):
+    """ PostgreSQL: tüm seviyeler tek GROUP BY ROLLUP sorgusunda. """
+    sinif = _onek(_satir.c.hesap_kodu, 1)
+    grup = _onek(_satir.c.hesap_kodu, 2)
+    return (
+        select(
+            sinif.label('sinif'), grup.label('grup'), _satir.c.hesap_kodu, _satir.c.alt_hesap_kodu,
+            func.grouping(sinif, grup, _satir.c.hesap_kodu, _satir.c.alt_hesap_kodu).label('gruplama'),
+            func.max(_satir.c.hesap_adi).label('hesap_adi'), func.max(_satir.c.alt_hesap_adi).label('alt_hesap_adi'),
+            *_tutar_sutunlari(baslangic),
+        )
+        .where(_satir.c.firma_id == firma_id, _satir.c.muhasebe_kayit_tarihi <= bitis)
+        .group_by(func.rollup(sinif, grup, _satir.c.hesap_kodu, _satir.c.alt_hesap_kodu))
+    )
+
+
+def mizan_sorgusu_hesap(firma_id, baslangic, bitis):
+    """ Diğer veritabanları: (hesap_kodu, alt_hesap_kodu) bazında tek tarama. """
+    return (
+        select(
+            _satir.c.hesap_kodu, _satir.c.alt_hesap_kodu,
+            func.max(_satir.c.hesap_adi).label('hesap_adi'), func.max(_satir.c.alt_hesap_adi).label('alt_hesap_adi'),
+            *_tutar_sutunlari(baslangic),
+        )
+        .where(_satir.c.firma_id == firma_id, _satir.c.muhasebe_kayit_tarihi <= bitis)
+        .group_by(_satir.c.hesap_kodu, _satir.c.alt_hesap_kodu)
+    )
+
+
+# GROUPING(sinif, grup, hesap_kodu, alt_hesap_kodu) bit maskesi -> seviye
+_GRUPLAMA_SEVIYELERI = {0b0000: 'alt_hesap', 0b0001: 'hesap', 0b0011: 'grup', 0b0111: 'sinif', 0b1111: 'toplam'}
+
+
+def _rollup_kayitlari(satirlar):
+    for satir in satirlar:
+        seviye = _GRUPLAMA_SEVIYELERI[satir.gruplama]
+        tutarlar = {alan: Decimal(getattr(satir, alan) or 0) for alan in TUTAR_ALANLARI}
+        if seviye == 'alt_hesap':
+            if satir.alt_hesap_kodu is None:
+                continue  # alt hesabı olmayan satırlar yalnızca ana hesapta gösterilir
+            yield (satir.hesap_kodu, satir.alt_hesap_kodu), _kayit(seviye, satir.alt_hesap_kodu, satir.alt_hesap_adi, tutarlar)
+        elif seviye == 'hesap':
+            yield (satir.hesap_kodu,), _kayit(seviye, satir.hesap_kodu, satir.hesap_adi, tutarlar)
+        elif seviye == 'grup':
+            yield (satir.grup,), _kayit(seviye, satir.grup, None, tutarlar)
+        elif seviye == 'sinif':
+            yield (satir.sinif,), _kayit(seviye, satir.sinif, TDHP_SINIFLARI.get(satir.sinif), tutarlar)
+        else:
+            yield None, _kayit(seviye, None, 'GENEL TOPLAM', tutarlar)
+
+
+def _python_rollup(satirlar):
+    """ (hesap_kodu, alt_hesap_kodu) toplamlarından üst seviyeleri tek geçişte üretir. """
+    seviyeler = {seviye: {} for seviye in SEVIYELER}
+    adlar = {}
+    for satir in satirlar:
+        tutarlar = [Decimal(getattr(satir, alan) or 0) for alan in TUTAR_ALANLARI]
+        kod = satir.hesap_kodu
+        hedefler = [('sinif', kod[:1]), ('grup', kod[:2]), ('hesap', kod), ('toplam', None)]
+        if satir.alt_hesap_kodu is not None:
+            hedefler.append(('alt_hesap', (kod, satir.alt_hesap_kodu)))
+            adlar[('alt_hesap', (kod, satir.alt_hesap_kodu))] = satir.alt_hesap_adi
+        if satir.hesap_adi and not adlar.get(('hesap', kod)):
+            adlar[('hesap', kod)] = satir.hesap_adi
+        for seviye, anahtar in hedefler:
+            toplam = seviyeler[seviye].setdefault(anahtar, [_SIFIR] * len(TUTAR_ALANLARI))
+            for i, tutar in enumerate(tutarlar):
+                toplam[i] += tutar
+    for seviye, gruplar in seviyeler.items():
+        for anahtar, toplam in gruplar.items():
+            tutarlar = dict(zip(TUTAR_ALANLARI, toplam))
+            if seviye == 'alt_hesap':
+                yield anahtar, _kayit(seviye, anahtar[1], adlar.get((seviye, anahtar)), tutarlar)
+            elif seviye == 'toplam':
+                yield None, _kayit(seviye, None, 'GENEL TOPLAM', tutarlar)
+            else:
+                adi = TDHP_SINIFLARI.get(anahtar) if seviye == 'sinif' else adlar.get((seviye, anahtar))
+                yield (anahtar,), _kayit(seviye, anahtar, adi, tutarlar)
+
+
+def _siralama_anahtari(oge):
+    # Üst seviye alt seviyelerinden önce: 1, 10, 100, 100.01, 101, ..., 11, ...; genel toplam en sonda.
+    anahtar, kayit = oge
+    if kayit['seviye'] == 'toplam':
+        return (1,)
+    hesap_kodu = anahtar[0]
+    alt = anahtar[1] if len(anahtar) > 1 else ''
+    return (0, hesap_kodu[:1], hesap_kodu[:2] if len(hesap_kodu) > 1 else '', hesap_kodu, alt)
+
+
+def get_mizan(firma_id, baslangic, bitis):
+    """
+    Firmanın `baslangic`-`bitis` dönemi mizanı: seviye sırasıyla kayıt listesi. Her kayıt
+    {'seviye', 'kod', 'adi', açılış/dönem/kapanış borç ve alacak, borc_bakiye, alacak_bakiye}
+    içerir; tutarlar Decimal'dir. Açılış, `baslangic` öncesindeki tüm hareketlerdir.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        kayitlar = _rollup_kayitlari(db.session.execute(mizan_sorgusu_rollup(firma_id, baslangic, bitis)))
+    else:
+        kayitlar = _python_rollup(db.session.execute(mizan_sorgusu_hesap(firma_id, baslangic, bitis)))
+    sonuc = [kayit for _, kayit in sorted(kayitlar, key=_siralama_anahtari)]
+    logger.info(f"Firma {firma_id}, Dönem {baslangic}-{bitis} için mizan: {len(sonuc)} satır.")
+    return sonuc
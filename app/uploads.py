@@ -0,0 +1,164 @@
+# app/uploads.py
+# Parçalı ve kaldığı yerden devam ettirilebilir (resumable) yükleme protokolü.
+#
+#   1. POST   /firmalar/<id>/yuklemeler          -> upload-id oluşturulur (offset 0)
+#   2. PATCH  /yuklemeler/<upload_id>            -> Upload-Offset başlığı ile parça eklenir
+#      HEAD/GET /yuklemeler/<upload_id>          -> bağlantı koparsa güncel offset sorgulanır
+#   3. POST   /yuklemeler/<upload_id>/tamamla    -> dosya doğrulanır ve içe aktarma işi kuyruğa alınır
+#
+# Parçalar istek gövdesinden sabit boyutlu bloklarla okunup doğrudan spool dosyasına
+# eklenir; hiçbir aşamada dosyanın tamamı belleğe alınmaz.
+
+from app import db
+from app.models import ParcaliYukleme
+from app.jobs import JOB_HANDLERS, create_job, job_queue
+from app.edefter_service import dosya_ozeti
+from flask import current_app
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# İstek gövdesinden tek seferde okunacak blok boyutu
+KOPYALAMA_BLOK_BOYUTU = 1024 * 1024
+
+# Dosya uzantısı -> iş türü (tür açıkça verilmezse)
+UZANTI_IS_TURLERI = {
+    '.xml': 'edefter_xml',
+    '.csv': 'finansal_csv',
+    '.zip': 'edefter_zip',
+}
+
+
+class YuklemeHatasi(Exception):
+    """ Protokol hatası; `durum_kodu` HTTP yanıt koduna karşılık gelir. """
+
+    def __init__(self, mesaj, durum_kodu=400):
+        super().__init__(mesaj)
+        self.durum_kodu = durum_kodu
+
+
+def create_upload(firma_id, dosya_adi, toplam_boyut=None, tur=None, user_id=None):
+    """ Yeni bir parçalı yükleme başlatır ve boş spool dosyasını oluşturur. """
+    uzanti = os.path.splitext(dosya_adi or '')[1].lower()
+    tur = tur or UZANTI_IS_TURLERI.get(uzanti)
+    if tur not in JOB_HANDLERS:
+        raise YuklemeHatasi(f"Desteklenmeyen dosya/iş türü: {tur or uzanti or '-'}")
+    if toplam_boyut is not None and toplam_boyut < 0:
+        raise YuklemeHatasi("toplam_boyut negatif olamaz.")
+
+    yukleme_id = uuid.uuid4().hex
+    dosya_yolu = os.path.join(current_app.config['INGEST_SPOOL_DIR'], f"{yukleme_id}{uzanti}.part")
+    open(dosya_yolu, 'wb').close()
+    yukleme = ParcaliYukleme(
+        id=yukleme_id, firma_id=firma_id, user_id=user_id, tur=tur, durum='aktif',
+        dosya_yolu=dosya_yolu, orjinal_dosya_adi=dosya_adi, toplam_boyut=toplam_boyut, alinan_boyut=0,
+    )
+    db.session.add(yukleme)
+    db.session.commit()
+    return yukleme
+
+
+def get_active_upload(yukleme_id, kilitle=False):
+    sorgu = db.session.query(ParcaliYukleme).filter_by(id=yukleme_id)
+    if kilitle:
+        sorgu = sorgu.with_for_update()
+    yukleme = sorgu.first()
+    if yukleme is None:
+        raise YuklemeHatasi("Yükleme bulunamadı.", 404)
+    if yukleme.durum != 'aktif':
+        raise YuklemeHatasi(f"Yükleme artık aktif değil (durum: {yukleme.durum}).", 409)
+    return yukleme
+
+
+def append_chunk(yukleme_id, offset, akis):
+    """
+    `akis`tan okunan parçayı spool dosyasına `offset`ten itibaren yazar.
+    Offset sunucudaki alınan boyutla eşleşmezse 409 döner; istemci HEAD ile güncel
+    offset'i alıp oradan devam eder. Yeni offset'i döndürür.
+    """
+    yukleme = get_active_upload(yukleme_id, kilitle=True)
+    if offset != yukleme.alinan_boyut:
+        raise YuklemeHatasi(f"Offset uyuşmazlığı: beklenen {yukleme.alinan_boyut}, gelen {offset}.", 409)
+
+    yazilan = 0
+    with open(yukleme.dosya_yolu, 'r+b') as f:
+        # Önceki yarım kalmış bir parçanın artıkları kayıtlı offset'ten sonra silinir.
+        f.truncate(offset)
+        f.seek(offset)
+        while True:
+            blok = akis.read(KOPYALAMA_BLOK_BOYUTU)
+            if not blok:
+                break
+            yazilan += len(blok)
+            if yukleme.toplam_boyut is not None and offset + yazilan > yukleme.toplam_boyut:
+                f.truncate(offset)
+                db.session.rollback()
+                raise YuklemeHatasi("Parça, bildirilen toplam_boyut değerini aşıyor.", 413)
+            f.write(blok)
+        f.flush()
+        os.fsync(f.fileno())
+
+    yukleme.alinan_boyut = offset + yazilan
+    db.session.commit()
+    return yukleme.alinan_boyut
+
+
+def complete_upload(yukleme_id, sha256=None):
+    """ Boyutu (ve verildiyse SHA-256 özetini) doğrular, içe aktarma işini kuyruğa alır. """
+    yukleme = get_active_upload(yukleme_id, kilitle=True)
+    if yukleme.toplam_boyut is not None and yukleme.alinan_boyut != yukleme.toplam_boyut:
+        raise YuklemeHatasi(
+            f"Yükleme eksik: {yukleme.alinan_boyut}/{yukleme.toplam_boyut} bayt alındı.", 409
+        )
+    if yukleme.alinan_boyut == 0:
+        raise YuklemeHatasi("Boş dosya tamamlanamaz.")
+    if sha256 and dosya_ozeti(yukleme.dosya_yolu, KOPYALAMA_BLOK_BOYUTU) != sha256.lower():
+        raise YuklemeHatasi("SHA-256 özeti uyuşmuyor; dosya bozulmuş olabilir.", 422)
+
+    # '.part' uzantısı kaldırılır; iş bittiğinde dosya iş tarafından silinir. Yükleme ve iş
+    # kaydı tek commit'te yazılır; commit olmazsa dosya eski adına döndürülür (yükleme aktif kalır).
+    parca_yolu = yukleme.dosya_yolu
+    son_yol = parca_yolu[:-len('.part')] if parca_yolu.endswith('.part') else parca_yolu
+    os.replace(parca_yolu, son_yol)
+    try:
+        is_kaydi = create_job(
+            yukleme.firma_id, yukleme.tur, son_yol,
+            orjinal_dosya_adi=yukleme.orjinal_dosya_adi, user_id=yukleme.user_id,
+        )
+        yukleme.dosya_yolu = son_yol
+        yukleme.durum = 'tamamlandi'
+        yukleme.ice_aktarma_isi_id = is_kaydi.id
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        os.replace(son_yol, parca_yolu)
+        raise
+    job_queue.submit(is_kaydi.id)
+    logger.info(f"Parçalı yükleme {yukleme.id} tamamlandı ({yukleme.alinan_boyut} bayt), iş {is_kaydi.id} kuyruğa alındı.")
+    return yukleme, is_kaydi
+
+
+def cancel_upload(yukleme_id):
+    yukleme = get_active_upload(yukleme_id, kilitle=True)
+    yukleme.durum = 'iptal'
+    db.session.commit()
+    try:
+        os.remove(yukleme.dosya_yolu)
+    except OSError:
+        pass
+    return yukleme
+
+
+def serialize_upload(yukleme):
+    return {
+        "upload_id": yukleme.id,
+        "firma_id": yukleme.firma_id,
+        "tur": yukleme.tur,
+        "durum": yukleme.durum,
+        "orjinal_dosya_adi": yukleme.orjinal_dosya_adi,
+        "offset": yukleme.alinan_boyut,
+        "toplam_boyut": yukleme.toplam_boyut,
+        "job_id": yukleme.ice_aktarma_isi_id,
+    }
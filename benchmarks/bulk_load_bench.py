@@ -0,0 +1,118 @@
+# benchmarks/bulk_load_bench.py
+# YevmiyeFisiSatiri için üç yazma yolunu karşılaştırır:
+#   1. ORM        : satır başına db.session.add(YevmiyeFisiSatiri(...))
+#   2. mappings   : db.session.bulk_insert_mappings(YevmiyeFisiSatiri, ...)
+#   3. bulk_load  : app.bulk_load.bulk_insert (PostgreSQL'de COPY FROM STDIN, diğerlerinde executemany)
+#
+# Kullanım:
+#   python benchmarks/bulk_load_bench.py --satir 200000
+#   DATABASE_URL=postgresql://... python benchmarks/bulk_load_bench.py --satir 1000000
+#
+# Her yöntem aynı sentetik satırları ayrı bir başlık altına yazar ve commit eder; ölçümler
+# arasında eklenen satırlar silinir.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HESAPLAR = ['100', '102', '120', '153', '191', '320', '391', '600', '621', '632', '770']
+
+
+def sentetik_satirlar(adet, baslangic=date(2024, 1, 1)):
+    rnd = random.Random(42)
+    satirlar = []
+    for i in range(adet):
+        tutar = Decimal(f"{rnd.randint(1, 100000)}.{rnd.randint(0, 99):02d}")
+        borc = i % 2 == 0
+        tarih = baslangic + timedelta(days=i % 365)
+        satirlar.append({
+            'muhasebe_kayit_tarihi': tarih,
+            'hesap_kodu': rnd.choice(HESAPLAR),
+            'hesap_adi': 'HESAP',
+            'alt_hesap_kodu': None,
+            'alt_hesap_adi': None,
+            'borc_tutari': tutar if borc else Decimal('0.00'),
+            'alacak_tutari': Decimal('0.00') if borc else tutar,
+            'aciklama_satir': f"Satır açıklaması {i}\tsekme",
+            'belge_tipi': 'invoice',
+            'belge_tipi_aciklama': None,
+            'belge_no': f"BLG{i // 4}",
+            'belge_tarihi': tarih,
+            'belge_referansi': None,
+            'odeme_yontemi': None,
+        })
+    return satirlar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--satir', type=int, default=200_000)
+    parser.add_argument('--orm-satir', type=int, default=None,
+                        help="ORM yolu çok yavaş olduğundan daha az satırla ölçülebilir (varsayılan: --satir)")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bulk_load_bench_')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tmpdir, 'bench.db'))
+    os.environ.setdefault('FLASK_DEBUG', '1')
+
+    from app import create_app, db
+    from app.models import User, Firma, YevmiyeMaddesiBasligi, YevmiyeFisiSatiri
+    from app.bulk_load import bulk_insert, copy_destekleniyor
+    from app.edefter_service import delete_yevmiye_maddeleri
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username=f'bench{time.time_ns()}')
+        user.set_password('x')
+        db.session.add(user)
+        db.session.flush()
+        firma = Firma(adi='Bench A.Ş.', vkn=str(time.time_ns())[-10:], firma_tipi='Anonim Şirket', user_id=user.id)
+        db.session.add(firma)
+        db.session.commit()
+
+        def yeni_baslik():
+            baslik = YevmiyeMaddesiBasligi(firma_id=firma.id, toplam_borc=0, toplam_alacak=0)
+            db.session.add(baslik)
+            db.session.commit()
+            return baslik.id
+
+        def orm(satirlar, baslik_id):
+            for satir in satirlar:
+                db.session.add(YevmiyeFisiSatiri(yevmiye_maddesi_id=baslik_id, **satir))
+
+        def mappings(satirlar, baslik_id):
+            db.session.bulk_insert_mappings(
+                YevmiyeFisiSatiri, [dict(satir, yevmiye_maddesi_id=baslik_id) for satir in satirlar]
+            )
+
+        def bulk_load(satirlar, baslik_id):
+            bulk_insert(YevmiyeFisiSatiri.__table__, [dict(satir, yevmiye_maddesi_id=baslik_id) for satir in satirlar])
+
+        satirlar = sentetik_satirlar(args.satir)
+        yontemler = [
+            ('ORM add', orm, satirlar[:args.orm_satir] if args.orm_satir else satirlar),
+            ('bulk_insert_mappings', mappings, satirlar),
+            ('COPY' if copy_destekleniyor() else 'executemany', bulk_load, satirlar),
+        ]
+        print(f"Veritabanı: {db.engine.dialect.name} ({db.engine.dialect.driver})")
+        for ad, yontem, veri in yontemler:
+            baslik_id = yeni_baslik()
+            t0 = time.perf_counter()
+            yontem(veri, baslik_id)
+            db.session.commit()
+            sure = time.perf_counter() - t0
+            print(f"{ad:22s}: {len(veri):>9} satır, {sure:7.2f} sn, {len(veri) / sure:>10,.0f} satır/sn")
+            delete_yevmiye_maddeleri([baslik_id])
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
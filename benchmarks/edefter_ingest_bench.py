@@ -0,0 +1,77 @@
+# benchmarks/edefter_ingest_bench.py
+# Sentetik bir e-defter (yevmiye) dosyası üretip akış halinde içe aktarma hızını ölçer.
+#
+# Kullanım:
+#   python benchmarks/edefter_ingest_bench.py --satir 1000000
+#   DATABASE_URL=postgresql://... python benchmarks/edefter_ingest_bench.py --satir 1000000
+#
+# Çıktı: parse-only ve parse+yazma için satır/sn ile işlem sonu tepe bellek (max RSS).
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.helpers import sentetik_edefter_yaz
+
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--satir', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=None)
+    parser.add_argument('--sadece-parse', action='store_true')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='edefter_bench_')
+    xml_yolu = os.path.join(tmpdir, 'yevmiye.xml')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tmpdir, 'bench.db'))
+    os.environ.setdefault('FLASK_DEBUG', '1')
+
+    t0 = time.perf_counter()
+    toplam = sentetik_edefter_yaz(xml_yolu, args.satir)
+    boyut_mb = os.path.getsize(xml_yolu) / (1024 * 1024)
+    print(f"Sentetik dosya: {toplam} satır, {boyut_mb:.1f} MB ({time.perf_counter() - t0:.1f} sn)")
+
+    from app import create_app, db
+    from app.models import User, Firma
+    from app.edefter_service import parse_edefter_batches, ingest_edefter_xml, DEFAULT_BATCH_SIZE
+    batch_size = args.batch or DEFAULT_BATCH_SIZE
+
+    rss_once = _max_rss_mb()
+    t0 = time.perf_counter()
+    sayac = 0
+    for maddeler in parse_edefter_batches(xml_yolu, batch_size=batch_size):
+        sayac += sum(len(satirlar) for _, satirlar in maddeler)
+    sure = time.perf_counter() - t0
+    print(f"Parse-only : {sayac} satır, {sure:.2f} sn, {sayac / sure:,.0f} satır/sn, max RSS {_max_rss_mb():.0f} MB (önce {rss_once:.0f} MB)")
+    if args.sadece_parse:
+        return
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username=f'bench{time.time_ns()}')
+        user.set_password('x')
+        db.session.add(user)
+        db.session.flush()
+        firma = Firma(adi='Bench A.Ş.', vkn=str(time.time_ns())[-10:], firma_tipi='Anonim Şirket', user_id=user.id)
+        db.session.add(firma)
+        db.session.commit()
+
+        t0 = time.perf_counter()
+        sonuc = ingest_edefter_xml(firma.id, xml_yolu, dosya_adi='yevmiye.xml', batch_size=batch_size)
+        sure = time.perf_counter() - t0
+        print(f"Parse+yazma: {sonuc['satir_sayisi']} satır, {sure:.2f} sn, {sonuc['satir_sayisi'] / sure:,.0f} satır/sn, "
+              f"max RSS {_max_rss_mb():.0f} MB [{db.engine.dialect.name}, batch={batch_size}]")
+
+
+if __name__ == '__main__':
+    main()
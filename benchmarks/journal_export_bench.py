@@ -0,0 +1,92 @@
+# benchmarks/journal_export_bench.py
+# /firmalar/<id>/yevmiye dışa aktarımının (app.journal_export_service) ilk parçaya kadar geçen
+# süresini, toplam süresini ve Python tarafındaki en yüksek bellek kullanımını (tracemalloc) ölçer.
+# Bellek kullanımı satır sayısıyla değil, parça boyutuyla (yield_per) orantılı kalmalıdır.
+#
+# Kullanım:
+#   python benchmarks/journal_export_bench.py --satir 1000000 --format ndjson
+#   DATABASE_URL=postgresql://... python benchmarks/journal_export_bench.py --satir 10000000
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bulk_load_bench import sentetik_satirlar
+
+SATIR_PARCA = 200_000
+MADDE_BASINA_SATIR = 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--satir', type=int, default=1_000_000)
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    parser.add_argument('--parca', type=int, default=5000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='journal_export_bench_')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tmpdir, 'bench.db'))
+    os.environ.setdefault('FLASK_DEBUG', '1')
+
+    from app import create_app, db
+    from app.models import User, Firma, YevmiyeMaddesiBasligi, YevmiyeFisiSatiri
+    from app.bulk_load import bulk_insert, bulk_insert_returning_ids
+    from app.journal_export_service import yevmiye_sorgusu, FORMATLAR
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username=f'bench{time.time_ns()}')
+        user.set_password('x')
+        db.session.add(user)
+        db.session.flush()
+        firma = Firma(adi='Bench', vkn=f"{time.time_ns() % 10**10:010d}", firma_tipi='Anonim Şirket', user_id=user.id)
+        db.session.add(firma)
+        db.session.commit()
+
+        t0 = time.perf_counter()
+        yazilan = 0
+        while yazilan < args.satir:
+            adet = min(SATIR_PARCA, args.satir - yazilan)
+            satirlar = sentetik_satirlar(adet)
+            baslik_ids = bulk_insert_returning_ids(
+                YevmiyeMaddesiBasligi.__table__,
+                [{'firma_id': firma.id, 'toplam_borc': 0, 'toplam_alacak': 0}
+                 for _ in range((adet + MADDE_BASINA_SATIR - 1) // MADDE_BASINA_SATIR)],
+            )
+            for j, satir in enumerate(satirlar):
+                satir['yevmiye_maddesi_id'] = baslik_ids[j // MADDE_BASINA_SATIR]
+                satir['firma_id'] = firma.id
+            bulk_insert(YevmiyeFisiSatiri.__table__, satirlar)
+            db.session.commit()
+            yazilan += adet
+        print(f"Veritabanı: {db.engine.dialect.name}; {yazilan} satır {time.perf_counter() - t0:.1f} sn'de yüklendi.")
+
+        uretici, _ = FORMATLAR[args.format]
+        # tracemalloc satır başına küçük nesnelerde ölçümü yavaşlattığından süre ve bellek ayrı geçişlerde ölçülür.
+        t0 = time.perf_counter()
+        ilk_parca = None
+        bayt = 0
+        for parca in uretici(yevmiye_sorgusu(firma.id), args.parca):
+            if ilk_parca is None:
+                ilk_parca = time.perf_counter() - t0
+            bayt += len(parca.encode('utf-8'))
+        sure = time.perf_counter() - t0
+        print(f"{args.format}: ilk parça {ilk_parca * 1000:.1f} ms, toplam {sure:.1f} sn "
+              f"({yazilan / sure:,.0f} satır/sn, {bayt / 1e6:.1f} MB)")
+
+        tracemalloc.start()
+        for parca in uretici(yevmiye_sorgusu(firma.id), args.parca):
+            pass
+        _, tepe = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{args.format}: en yüksek Python belleği {tepe / 1e6:.1f} MB (parça: {args.parca} satır)")
+
+
+if __name__ == '__main__':
+    main()
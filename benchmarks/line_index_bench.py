@@ -0,0 +1,120 @@
+# benchmarks/line_index_bench.py
+# Firma bazlı yevmiye satırı toplamalarının eski (başlık tablosuna join) ve yeni
+# (satırdaki firma_id + kapsayan composite indeks) hallerini karşılaştırır.
+# Her iki sorgu için sorgu planı ve ortalama süre yazdırılır.
+#
+# Kullanım:
+#   python benchmarks/line_index_bench.py --satir 1000000
+#   DATABASE_URL=postgresql://... python benchmarks/line_index_bench.py --satir 10000000 --firma 20
+#
+# Satırlar --firma sayıda firmaya eşit dağıtılır; sorgular tek bir firmanın bir yıllık
+# dönemini hesap bazında toplar (get_donem_ici_hareketler'in satır tablosu üzerindeki karşılığı).
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bulk_load_bench import sentetik_satirlar
+
+SATIR_PARCA = 200_000
+MADDE_BASINA_SATIR = 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--satir', type=int, default=1_000_000)
+    parser.add_argument('--firma', type=int, default=10)
+    parser.add_argument('--tekrar', type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='line_index_bench_')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tmpdir, 'bench.db'))
+    os.environ.setdefault('FLASK_DEBUG', '1')
+
+    from app import create_app, db
+    from app.models import User, Firma, YevmiyeMaddesiBasligi, YevmiyeFisiSatiri
+    from app.bulk_load import bulk_insert, bulk_insert_returning_ids
+    from sqlalchemy import select, func, text
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username=f'bench{time.time_ns()}')
+        user.set_password('x')
+        db.session.add(user)
+        db.session.flush()
+        firmalar = []
+        for i in range(args.firma):
+            firma = Firma(adi=f'Bench {i}', vkn=f"{time.time_ns() % 10**9:09d}{i}", firma_tipi='Anonim Şirket', user_id=user.id)
+            db.session.add(firma)
+            db.session.flush()
+            firmalar.append(firma.id)
+        db.session.commit()
+
+        print(f"Veritabanı: {db.engine.dialect.name} ({db.engine.dialect.driver})")
+        t0 = time.perf_counter()
+        baslik_tablo = YevmiyeMaddesiBasligi.__table__
+        satir_tablo = YevmiyeFisiSatiri.__table__
+        yazilan = 0
+        while yazilan < args.satir:
+            adet = min(SATIR_PARCA, args.satir - yazilan)
+            satirlar = sentetik_satirlar(adet)
+            firma_id = firmalar[(yazilan // SATIR_PARCA) % len(firmalar)]
+            madde_sayisi = (adet + MADDE_BASINA_SATIR - 1) // MADDE_BASINA_SATIR
+            baslik_ids = bulk_insert_returning_ids(
+                baslik_tablo,
+                [{'firma_id': firma_id, 'toplam_borc': 0, 'toplam_alacak': 0} for _ in range(madde_sayisi)],
+            )
+            for j, satir in enumerate(satirlar):
+                satir['yevmiye_maddesi_id'] = baslik_ids[j // MADDE_BASINA_SATIR]
+                satir['firma_id'] = firma_id
+            bulk_insert(satir_tablo, satirlar)
+            db.session.commit()
+            yazilan += adet
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text(f"VACUUM ANALYZE {satir_tablo.name}").execution_options(isolation_level='AUTOCOMMIT'))
+        else:
+            db.session.execute(text("ANALYZE"))
+        db.session.commit()
+        print(f"{yazilan} satır {time.perf_counter() - t0:.1f} sn'de yüklendi.")
+
+        firma_id = firmalar[0]
+        baslangic, bitis = date(2024, 1, 1), date(2024, 12, 31)
+        toplamlar = (
+            satir_tablo.c.hesap_kodu,
+            func.sum(satir_tablo.c.borc_tutari), func.sum(satir_tablo.c.alacak_tutari),
+        )
+        sorgular = {
+            'join (eski)': select(*toplamlar)
+            .select_from(satir_tablo.join(baslik_tablo, satir_tablo.c.yevmiye_maddesi_id == baslik_tablo.c.id))
+            .where(baslik_tablo.c.firma_id == firma_id,
+                   satir_tablo.c.muhasebe_kayit_tarihi.between(baslangic, bitis))
+            .group_by(satir_tablo.c.hesap_kodu),
+            'firma_id (yeni)': select(*toplamlar)
+            .where(satir_tablo.c.firma_id == firma_id,
+                   satir_tablo.c.muhasebe_kayit_tarihi.between(baslangic, bitis))
+            .group_by(satir_tablo.c.hesap_kodu),
+        }
+
+        aciklama = 'EXPLAIN (ANALYZE, BUFFERS)' if db.engine.dialect.name == 'postgresql' else 'EXPLAIN QUERY PLAN'
+        for ad, sorgu in sorgular.items():
+            derlenmis = sorgu.compile(db.engine, compile_kwargs={'literal_binds': True})
+            plan = db.session.execute(text(f"{aciklama} {derlenmis}")).all()
+            print(f"\n--- {ad} ---")
+            for satir in plan:
+                print('  ' + ' | '.join(str(s) for s in satir))
+            sureler = []
+            for _ in range(args.tekrar):
+                t0 = time.perf_counter()
+                db.session.execute(sorgu).all()
+                sureler.append(time.perf_counter() - t0)
+            print(f"  ortalama {sum(sureler) / len(sureler) * 1000:.1f} ms, en iyi {min(sureler) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
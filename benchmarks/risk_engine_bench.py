@@ -0,0 +1,85 @@
+# benchmarks/risk_engine_bench.py
+# app.risk_engine (vektörel) ile app.services içindeki satır başına skaler fonksiyonları
+# karşılaştırır ve ortak oranlarda sonuçların aynı olduğunu doğrular.
+#
+# Kullanım:
+#   python benchmarks/risk_engine_bench.py --satir 500000 --skaler-satir 50000
+
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.risk_engine import GIRDI_ALANLARI, MODELLER, skorla, sutunlara_donustur
+from app.services import calculate_cari_oran, calculate_borc_ozkaynak_orani, calculate_altman_z_score_updated
+
+
+def sentetik_sutunlar(adet, bos_orani=0.01, sifir_orani=0.01):
+    rnd = np.random.default_rng(42)
+    sutunlar = {alan: np.round(rnd.uniform(-1e6, 5e7, adet), 2) for alan in GIRDI_ALANLARI}
+    for alan in ('aktif_toplami', 'kisa_vadeli_yukumlulukler', 'toplam_yukumlulukler', 'oz_kaynaklar'):
+        sutunlar[alan][rnd.random(adet) < sifir_orani] = 0.0
+    for alan in GIRDI_ALANLARI:
+        sutunlar[alan][rnd.random(adet) < bos_orani] = np.nan
+    return sutunlar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--satir', type=int, default=500_000)
+    parser.add_argument('--skaler-satir', type=int, default=50_000)
+    args = parser.parse_args()
+
+    sutunlar = sentetik_sutunlar(args.satir)
+    skorla(sutunlar)  # ısınma
+
+    t0 = time.perf_counter()
+    skorla(sutunlar)
+    sure = time.perf_counter() - t0
+    print(f"Vektörel : {len(MODELLER)} model, {args.satir} firma-dönem, {sure * 1000:.1f} ms "
+          f"({args.satir / sure:,.0f} firma-dönem/sn)")
+
+    # Skaler yol Decimal/None girdilerle (FinansalVeri'deki gibi) ölçülür
+    n = min(args.skaler_satir, args.satir)
+    satirlar = [
+        {alan: (None if np.isnan(sutunlar[alan][i]) else Decimal(f"{sutunlar[alan][i]:.2f}")) for alan in GIRDI_ALANLARI}
+        for i in range(n)
+    ]
+    t0 = time.perf_counter()
+    skaler = []
+    for s in satirlar:
+        skaler.append((
+            calculate_cari_oran(s['donen_varliklar'], s['kisa_vadeli_yukumlulukler']),
+            calculate_borc_ozkaynak_orani(s['toplam_yukumlulukler'], s['oz_kaynaklar']),
+            calculate_altman_z_score_updated(
+                s['donen_varliklar'], s['aktif_toplami'], s['kisa_vadeli_yukumlulukler'],
+                s['dagitilmamis_karlar'], s['vergi_oncesi_kar_zarar'], s['oz_kaynaklar'],
+                s['toplam_yukumlulukler'], s['net_satislar'],
+            ),
+        ))
+    sure = time.perf_counter() - t0
+    print(f"Skaler   : 3 oran, {n} firma-dönem, {sure * 1000:.1f} ms ({n / sure:,.0f} firma-dönem/sn)")
+
+    t0 = time.perf_counter()
+    donusturulmus = sutunlara_donustur(satirlar)
+    print(f"Sütunlara dönüştürme (Decimal/None -> float64): {(time.perf_counter() - t0) * 1000:.1f} ms")
+    kontrol = skorla(donusturulmus, ['cari_oran', 'borc_ozkaynak_orani', 'altman_z_skoru'])
+
+    farkli = 0
+    for i, (cari, borc_oz, altman) in enumerate(skaler):
+        for beklenen, ad in ((cari, 'cari_oran'), (borc_oz, 'borc_ozkaynak_orani'), (altman, 'altman_z_skoru')):
+            deger = kontrol[ad][i]
+            if beklenen is None:
+                farkli += not np.isnan(deger)
+            elif np.isnan(deger) or abs(deger - beklenen) > 1e-4 + 1e-9 * abs(beklenen):
+                farkli += 1
+    print(f"Skaler ile uyuşmayan değer: {farkli}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/statement_engine_bench.py
+# Derlenmiş mali tablo motorunu (app.statement_engine) rekürsif dolaşımla
+# (financial_statement_service.generate_bilanco_v3 / generate_gelir_tablosu_v3) karşılaştırır.
+#
+# Kullanım:
+#   python benchmarks/statement_engine_bench.py --alt-hesap 0 --tekrar 20000
+#   python benchmarks/statement_engine_bench.py --alt-hesap 50
+#
+# --alt-hesap 0 iken yalnızca üç haneli ana hesaplar kullanılır ve iki yolun toplamlarının
+# aynı olduğu doğrulanır. Alt hesaplar (120.0001 gibi) rekürsif dolaşımda ana hesaba
+# bağlanamaz, yok sayılır; o durumda rekürsif yolun süresi yapılan işi yansıtmaz.
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('FLASK_DEBUG', '1')
+
+from app.financial_statement_service import HESAP_DETAYLARI, generate_bilanco_v3, generate_gelir_tablosu_v3
+from app.statement_engine import bilanco_motoru, gelir_tablosu_motoru, generate_bilanco, generate_gelir_tablosu
+
+
+def sentetik_veriler(alt_hesap_sayisi):
+    rnd = random.Random(7)
+    bilanco_motor = bilanco_motoru()
+    gelir_motor = gelir_tablosu_motoru()
+    bakiyeler, hareketler = {}, {}
+    for kod, detay in HESAP_DETAYLARI.items():
+        kodlar = [kod] if not alt_hesap_sayisi else [f"{kod}.{i:04d}" for i in range(alt_hesap_sayisi)]
+        for alt_kod in kodlar:
+            tutar = Decimal(rnd.randint(1, 10_000_000)) / 100
+            if detay.get('fs_section', '').startswith('BILANCO'):
+                hedef = bilanco_motor.hedef(alt_kod)
+                bakiyeler[alt_kod] = {
+                    'adi': detay['adi'], 'dönem_sonu_bakiye': tutar,
+                    # v3 işareti kayıttan okur; karşılaştırma için motorun işareti verilir
+                    'fs_impact_bilanco': hedef[1] if hedef else 0,
+                }
+            elif detay.get('fs_section') == 'GELIR_TABLOSU':
+                hedef = gelir_motor.hedef(alt_kod)
+                hareketler[alt_kod] = {
+                    'adi': detay['adi'], 'net_donem_hareketi': tutar,
+                    'fs_impact_gelir_tablosu': hedef[1] if hedef else 0,
+                }
+    return bakiyeler, hareketler
+
+
+def olc(ad, fonksiyon, veri, tekrar):
+    fonksiyon(veri)
+    t0 = time.perf_counter()
+    for _ in range(tekrar):
+        sonuc = fonksiyon(veri)
+    sure = (time.perf_counter() - t0) / tekrar
+    print(f"  {ad:28s}: {sure * 1e6:9.1f} µs/tablo")
+    return sonuc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--alt-hesap', type=int, default=0, help="Ana hesap başına alt hesap sayısı (0: yalnızca ana hesaplar)")
+    parser.add_argument('--tekrar', type=int, default=5000)
+    args = parser.parse_args()
+
+    # Her çağrıdaki bilgi/denklik logları ölçümü bozmasın
+    for ad in ('app.financial_statement_service', 'app.statement_engine'):
+        logging.getLogger(ad).setLevel(logging.ERROR)
+
+    bakiyeler, hareketler = sentetik_veriler(args.alt_hesap)
+    print(f"{len(bakiyeler)} bilanço hesabı, {len(hareketler)} gelir tablosu hesabı, {args.tekrar} tekrar")
+    if args.alt_hesap:
+        print("Not: rekürsif yol alt hesapları eşleştiremez; süresi yalnızca yapı dolaşımını ölçer.")
+
+    print("Bilanço")
+    eski = olc('rekürsif (v3)', generate_bilanco_v3, bakiyeler, args.tekrar)
+    yeni = olc('derlenmiş motor', generate_bilanco, bakiyeler, args.tekrar)
+    olc('derlenmiş motor (çekirdek)', bilanco_motoru().hesapla, bakiyeler, args.tekrar)
+    if not args.alt_hesap:
+        for taraf in ('AKTIFLER', 'PASIFLER'):
+            assert eski[taraf]['GENEL_TOPLAM'] == yeni[taraf]['GENEL_TOPLAM'], taraf
+
+    print("Gelir tablosu")
+    olc('rekürsif (v3)', generate_gelir_tablosu_v3, hareketler, args.tekrar)
+    olc('derlenmiş motor', generate_gelir_tablosu, hareketler, args.tekrar)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import pytest
+
+from app import create_app, db
+from app.models import Firma, User
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setenv('FLASK_DEBUG', '1')
+    monkeypatch.setenv('INGEST_SPOOL_DIR', str(tmp_path / 'spool'))
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def istemci(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def firma(app):
+    kullanici = User(username='test')
+    kullanici.set_password('test')
+    firma = Firma(adi='Test A.Ş.', vkn='1234567890', firma_tipi='Anonim Şirket', sahibi_ref=kullanici)
+    db.session.add_all([kullanici, firma])
+    db.session.commit()
+    return firma
+
+
+@pytest.fixture
+def yetki(istemci, firma):
+    yanit = istemci.post('/login', json={'username': 'test', 'password': 'test'})
+    return {'Authorization': f"Bearer {yanit.get_json()['access_token']}"}
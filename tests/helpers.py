@@ -0,0 +1,52 @@
+# tests/helpers.py
+# Testlerde (ve benchmarks/edefter_ingest_bench.py'de) kullanılan sentetik e-defter üreticisi.
+
+from datetime import date, timedelta
+import random
+
+HESAPLAR = ['100', '102', '120', '153', '191', '320', '391', '600', '621', '632', '770']
+
+_BASLIK = """<?xml version="1.0" encoding="UTF-8"?>
+<edefter:defter xmlns:edefter="http://www.edefter.gov.tr" xmlns:xbrli="http://www.xbrl.org/2003/instance"
+ xmlns:gl-cor="http://www.xbrl.org/int/gl/cor/2006-10-25" xmlns:gl-bus="http://www.xbrl.org/int/gl/bus/2006-10-25">
+<xbrli:xbrl><gl-cor:accountingEntries>
+<gl-cor:documentInfo><gl-cor:entriesType>journal</gl-cor:entriesType>
+<gl-bus:periodCoveredStart>{baslangic}</gl-bus:periodCoveredStart><gl-bus:periodCoveredEnd>{bitis}</gl-bus:periodCoveredEnd>
+</gl-cor:documentInfo>
+"""
+
+_SATIR = """<gl-cor:entryDetail><gl-cor:lineNumber>{no}</gl-cor:lineNumber>
+<gl-cor:account><gl-cor:accountMainID>{hesap}</gl-cor:accountMainID><gl-cor:accountMainDescription>HESAP {hesap}</gl-cor:accountMainDescription>
+<gl-cor:accountSub><gl-cor:accountSubID>{hesap}.01</gl-cor:accountSubID><gl-cor:accountSubDescription>ALT HESAP</gl-cor:accountSubDescription></gl-cor:accountSub></gl-cor:account>
+<gl-cor:amount>{tutar}</gl-cor:amount><gl-cor:debitCreditCode>{dc}</gl-cor:debitCreditCode>
+<gl-cor:postingDate>{tarih}</gl-cor:postingDate><gl-cor:documentType>invoice</gl-cor:documentType>
+<gl-cor:documentNumber>BLG{madde}</gl-cor:documentNumber><gl-cor:documentDate>{tarih}</gl-cor:documentDate>
+<gl-cor:detailComment>Satır açıklaması {no}</gl-cor:detailComment></gl-cor:entryDetail>
+"""
+
+
+def sentetik_edefter_yaz(yol, satir_sayisi, madde_basina_satir=4, baslangic=date(2024, 1, 1), gun_sayisi=31,
+                         tohum=42):
+    """
+    Yaklaşık `satir_sayisi` satırlık, her maddesi borç=alacak dengeli sentetik bir yevmiye yazar.
+    Madde numaraları ve tarihleri tohumdan bağımsızdır; aynı tohumla üretilen dosyaların ortak
+    maddeleri aynı içeriklidir, farklı tohumla aynı numaralı maddelerin tutar/hesapları farklıdır.
+    """
+    rnd = random.Random(tohum)
+    madde_sayisi = max(1, satir_sayisi // madde_basina_satir)
+    with open(yol, 'w', encoding='utf-8') as f:
+        f.write(_BASLIK.format(baslangic=baslangic, bitis=baslangic + timedelta(days=gun_sayisi - 1)))
+        for madde in range(1, madde_sayisi + 1):
+            tarih = baslangic + timedelta(days=madde % gun_sayisi)
+            tutar = f"{rnd.randint(1, 100000)}.{rnd.randint(0, 99):02d}"
+            toplam = f"{float(tutar) * madde_basina_satir / 2:.2f}"
+            f.write(f"<gl-cor:entryHeader><gl-cor:enteredDate>{tarih}</gl-cor:enteredDate>"
+                    f"<gl-cor:entryNumber>FIS{madde}</gl-cor:entryNumber><gl-cor:entryComment>Madde {madde}</gl-cor:entryComment>"
+                    f"<gl-bus:totalDebit>{toplam}</gl-bus:totalDebit><gl-bus:totalCredit>{toplam}</gl-bus:totalCredit>"
+                    f"<gl-cor:entryNumberCounter>{madde}</gl-cor:entryNumberCounter>\n")
+            for no in range(1, madde_basina_satir + 1):
+                f.write(_SATIR.format(no=no, hesap=rnd.choice(HESAPLAR), tutar=tutar,
+                                      dc='D' if no % 2 else 'C', tarih=tarih, madde=madde))
+            f.write("</gl-cor:entryHeader>\n")
+        f.write("</gl-cor:accountingEntries></xbrli:xbrl></edefter:defter>\n")
+    return madde_sayisi * madde_basina_satir
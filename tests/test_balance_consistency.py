@@ -0,0 +1,107 @@
+# Artımlı güncellenen günlük bakiyeler ve aylık anlık görüntüler; içe aktarma ve silme
+# sonrasında hem yevmiye satırlarının ham toplamlarına hem de baştan oluşturulan tablolara eşit olmalıdır.
+
+from app import db
+from app.models import GunlukHesapBakiyesi, AylikHesapBakiyesi, IceAktarmaKaydi, YevmiyeFisiSatiri
+from app.account_balance_service import rebuild_daily_balances, rebuild_monthly_snapshots
+from app.edefter_service import ingest_edefter_xml, delete_ice_aktarma
+from tests.helpers import sentetik_edefter_yaz
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import select, func
+import pytest
+
+
+def _tutar(deger):
+    return Decimal(str(deger or 0)).quantize(Decimal('0.01'))
+
+
+def _gunluk_bakiyeler(firma_id):
+    tablo = GunlukHesapBakiyesi.__table__
+    return sorted(
+        (hesap_kodu, gun, _tutar(borc), _tutar(alacak), adet)
+        for hesap_kodu, gun, borc, alacak, adet in db.session.execute(
+            select(tablo.c.hesap_kodu, tablo.c.gun, tablo.c.borc_toplami, tablo.c.alacak_toplami, tablo.c.satir_sayisi)
+            .where(tablo.c.firma_id == firma_id)
+        )
+    )
+
+
+def _aylik_bakiyeler(firma_id):
+    tablo = AylikHesapBakiyesi.__table__
+    return sorted(
+        (hesap_kodu, ay, _tutar(borc), _tutar(alacak))
+        for hesap_kodu, ay, borc, alacak in db.session.execute(
+            select(tablo.c.hesap_kodu, tablo.c.ay, tablo.c.kumulatif_borc, tablo.c.kumulatif_alacak)
+            .where(tablo.c.firma_id == firma_id)
+        )
+    )
+
+
+def _satir_toplamlari(firma_id):
+    """ Yevmiye satırlarından doğrudan (firma, hesap, gün) toplamları. """
+    satir = YevmiyeFisiSatiri.__table__
+    return sorted(
+        (hesap_kodu, gun, _tutar(borc), _tutar(alacak), adet)
+        for hesap_kodu, gun, borc, alacak, adet in db.session.execute(
+            select(
+                satir.c.hesap_kodu, satir.c.muhasebe_kayit_tarihi,
+                func.sum(satir.c.borc_tutari), func.sum(satir.c.alacak_tutari), func.count(),
+            )
+            .where(satir.c.firma_id == firma_id)
+            .group_by(satir.c.hesap_kodu, satir.c.muhasebe_kayit_tarihi)
+        )
+    )
+
+
+def _sonraki_ay(ay):
+    return date(ay.year + ay.month // 12, ay.month % 12 + 1, 1)
+
+
+def _satirlardan_aylik(gunluk):
+    """ Her hesabın ilk hareket ayından firmanın son hareket ayına kadar ay sonu kümülatif toplamları. """
+    aylik = defaultdict(lambda: defaultdict(lambda: [Decimal('0.00'), Decimal('0.00')]))
+    for hesap_kodu, gun, borc, alacak, _ in gunluk:
+        toplam = aylik[hesap_kodu][gun.replace(day=1)]
+        toplam[0] += borc
+        toplam[1] += alacak
+    son_ay = max(gun for _, gun, *_ in gunluk).replace(day=1)
+
+    sonuc = []
+    for hesap_kodu, aylar in aylik.items():
+        ay, borc, alacak = min(aylar), Decimal('0.00'), Decimal('0.00')
+        while ay <= son_ay:
+            ay_borc, ay_alacak = aylar.get(ay, (0, 0))
+            borc, alacak = borc + ay_borc, alacak + ay_alacak
+            sonuc.append((hesap_kodu, ay, borc, alacak))
+            ay = _sonraki_ay(ay)
+    return sorted(sonuc)
+
+
+@pytest.mark.parametrize('silinen', [0, 1])
+def test_artimli_bakiyeler_yeniden_olusturma_ile_ayni(firma, tmp_path, silinen):
+    dosyalar = [
+        (tmp_path / 'ocak.xml', dict(satir_sayisi=200, baslangic=date(2024, 1, 1), gun_sayisi=31)),
+        (tmp_path / 'subat_mart.xml', dict(satir_sayisi=300, madde_basina_satir=6,
+                                           baslangic=date(2024, 2, 10), gun_sayisi=40)),
+    ]
+    kayit_idleri = []
+    for yol, parametreler in dosyalar:
+        sentetik_edefter_yaz(str(yol), **parametreler)
+        sonuc = ingest_edefter_xml(firma.id, str(yol), dosya_adi=yol.name)
+        assert sonuc['satir_sayisi'] > 0
+        kayit_idleri.append(sonuc['ice_aktarma_kaydi_id'])
+
+    assert delete_ice_aktarma(db.session.get(IceAktarmaKaydi, kayit_idleri[silinen])) > 0
+
+    gunluk, aylik = _gunluk_bakiyeler(firma.id), _aylik_bakiyeler(firma.id)
+    satirlar = _satir_toplamlari(firma.id)
+    assert satirlar
+    assert gunluk == satirlar
+    assert aylik == _satirlardan_aylik(satirlar)
+
+    rebuild_daily_balances(firma.id)
+    rebuild_monthly_snapshots(firma.id)
+    assert _gunluk_bakiyeler(firma.id) == gunluk
+    assert _aylik_bakiyeler(firma.id) == aylik
@@ -0,0 +1,50 @@
+# Karşılaştırmalı mali tablolar: her dönem sütunu, aynı tarihler için tek dönemlik
+# /mali_tablolar yanıtıyla aynı olmalıdır; ardışık dönemler ay sonlarını doğru bulmalıdır.
+
+from app.comparative_statement_service import ardisik_donemler
+from app.edefter_service import ingest_edefter_xml
+from tests.helpers import sentetik_edefter_yaz
+from datetime import date
+import pytest
+
+
+def test_ardisik_donemler_ay_sonlari():
+    assert ardisik_donemler('aylik', 3, date(2024, 2, 29)) == [
+        (date(2023, 12, 1), date(2023, 12, 31)),
+        (date(2024, 1, 1), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+    ]
+    assert ardisik_donemler('aylik', 2, date(2024, 3, 5)) == [
+        (date(2024, 1, 6), date(2024, 2, 5)),
+        (date(2024, 2, 6), date(2024, 3, 5)),
+    ]
+    assert ardisik_donemler('yillik', 2, date(2024, 2, 29)) == [
+        (date(2022, 3, 1), date(2023, 2, 28)),
+        (date(2023, 3, 1), date(2024, 2, 29)),
+    ]
+
+
+@pytest.mark.parametrize('parametreler', [
+    'karsilastirma=aylik&donem_bitis=2024-02-29&donem_sayisi=4',
+    'karsilastirma=aylik&donem_bitis=2024-03-05&donem_sayisi=3',
+    'donemler=2023-11-20:2023-12-05,2024-01-10:2024-02-29,2024-03-01:2024-03-09',
+])
+def test_karsilastirmali_sutunlar_tek_donemle_ayni(firma, istemci, yetki, tmp_path, parametreler):
+    yol = str(tmp_path / 'yevmiye.xml')
+    sentetik_edefter_yaz(yol, 1200, baslangic=date(2023, 11, 15), gun_sayisi=116)  # 2023-11-15 .. 2024-03-09
+    ingest_edefter_xml(firma.id, yol, dosya_adi='yevmiye.xml')
+
+    yanit = istemci.get(f"/firmalar/{firma.id}/mali_tablolar?{parametreler}", headers=yetki)
+    assert yanit.status_code == 200
+    donemler = yanit.get_json()['donemler']
+    assert len(donemler) > 1
+
+    for donem in donemler:
+        tek = istemci.get(
+            f"/firmalar/{firma.id}/mali_tablolar?donem_baslangic={donem['donem_baslangic']}&donem_bitis={donem['donem_bitis']}",
+            headers=yetki,
+        )
+        assert tek.status_code == 200
+        tek = tek.get_json()
+        assert donem['bilanco'] == tek['bilanco'], donem['donem_bitis']
+        assert donem['gelir_tablosu'] == tek['gelir_tablosu'], donem['donem_bitis']
@@ -0,0 +1,90 @@
+# E-defter içe aktarmalarında mükerrer dosya/madde kontrolü ve yarıda kalan yüklemelerin geri alınması.
+
+from app import db
+from app.models import IceAktarmaKaydi, YevmiyeMaddesiBasligi, YevmiyeFisiSatiri
+from app.edefter_service import ingest_edefter_xml
+from tests.helpers import sentetik_edefter_yaz
+from datetime import datetime, timedelta
+import pytest
+
+
+def _satir_sayisi(firma_id):
+    return YevmiyeFisiSatiri.query.filter_by(firma_id=firma_id).count()
+
+
+def test_yarida_kalan_yukleme_ayni_dosyayi_engellemez(firma, tmp_path):
+    yol = str(tmp_path / 'ocak.xml')
+    toplam = sentetik_edefter_yaz(yol, 200)
+
+    def cokme(okunan_satir, eklenen_satir):
+        # İlk batch commit edildikten sonra süreç ölür: except bloğu (telafi) çalışmaz.
+        if okunan_satir > 100:
+            raise SystemExit(1)
+
+    with pytest.raises(SystemExit):
+        ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml', batch_size=100, ilerleme=cokme)
+    db.session.rollback()
+
+    kayit = IceAktarmaKaydi.query.filter_by(firma_id=firma.id).one()
+    assert not kayit.tamamlandi
+    assert 0 < _satir_sayisi(firma.id) < toplam
+
+    # Kayıt yakın zamanda güncellendiyse yükleme hâlâ sürüyor sayılır.
+    with pytest.raises(ValueError):
+        ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml')
+
+    kayit.guncellenme_tarihi = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+    sonuc = ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml')
+    assert not sonuc.get('mukerrer_dosya')
+    assert sonuc['satir_sayisi'] == toplam
+    assert _satir_sayisi(firma.id) == toplam
+    assert IceAktarmaKaydi.query.filter_by(firma_id=firma.id).one().tamamlandi
+
+
+def test_ayni_dosya_manifest_ile_atlanir(firma, tmp_path):
+    yol = str(tmp_path / 'ocak.xml')
+    toplam = sentetik_edefter_yaz(yol, 200)
+    ilk = ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml')
+    assert ilk['satir_sayisi'] == toplam
+
+    tekrar = ingest_edefter_xml(firma.id, yol, dosya_adi='ocak_kopya.xml')
+    assert tekrar['mukerrer_dosya']
+    assert tekrar['ice_aktarma_kaydi_id'] == ilk['ice_aktarma_kaydi_id']
+    assert tekrar['madde_sayisi'] == tekrar['satir_sayisi'] == 0
+    assert _satir_sayisi(firma.id) == toplam
+    assert IceAktarmaKaydi.query.filter_by(firma_id=firma.id).count() == 1
+
+
+def test_ortusen_dosya_yalnizca_yeni_maddeleri_ekler(firma, tmp_path):
+    ilk_yol, genis_yol, farkli_yol = (str(tmp_path / ad) for ad in ('ilk.xml', 'genis.xml', 'farkli.xml'))
+    sentetik_edefter_yaz(ilk_yol, 200)              # 50 madde
+    sentetik_edefter_yaz(genis_yol, 300)            # aynı 50 madde + 25 yeni
+    sentetik_edefter_yaz(farkli_yol, 400, tohum=7)  # aynı numaralı 75 madde farklı içerikle + 25 yeni
+
+    ingest_edefter_xml(firma.id, ilk_yol, dosya_adi='ilk.xml')
+    genis = ingest_edefter_xml(firma.id, genis_yol, dosya_adi='genis.xml')
+    assert not genis.get('mukerrer_dosya')
+    assert (genis['madde_sayisi'], genis['atlanan_madde_sayisi'], genis['farkli_icerikli_madde_sayisi']) == (25, 50, 0)
+    assert _satir_sayisi(firma.id) == 75 * 4
+
+    farkli = ingest_edefter_xml(firma.id, farkli_yol, dosya_adi='farkli.xml')
+    assert (farkli['madde_sayisi'], farkli['atlanan_madde_sayisi'], farkli['farkli_icerikli_madde_sayisi']) == (25, 75, 75)
+    assert _satir_sayisi(firma.id) == 100 * 4
+    assert YevmiyeMaddesiBasligi.query.filter_by(firma_id=firma.id).count() == 100
+
+
+def test_silinen_ice_aktarma_ayni_dosyayi_yeniden_yuklenebilir_kilar(firma, istemci, yetki, tmp_path):
+    yol = str(tmp_path / 'ocak.xml')
+    toplam = sentetik_edefter_yaz(yol, 200)
+    ilk = ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml')
+
+    yanit = istemci.delete(f"/firmalar/{firma.id}/ice_aktarmalar/{ilk['ice_aktarma_kaydi_id']}", headers=yetki)
+    assert yanit.status_code == 200
+    assert _satir_sayisi(firma.id) == 0
+    assert IceAktarmaKaydi.query.filter_by(firma_id=firma.id).count() == 0
+
+    tekrar = ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml')
+    assert not tekrar.get('mukerrer_dosya')
+    assert (tekrar['madde_sayisi'], tekrar['satir_sayisi'], tekrar['atlanan_madde_sayisi']) == (ilk['madde_sayisi'], toplam, 0)
+    assert _satir_sayisi(firma.id) == toplam
@@ -0,0 +1,93 @@
+# Arka plan içe aktarma işleri: süreci ölmüş işlerin kurtarılması, bekleyen işlerin devamı ve yeniden deneme.
+
+from app import db
+from app.models import IceAktarmaIsi, IceAktarmaKaydi, YevmiyeFisiSatiri
+from app.edefter_service import ingest_edefter_xml
+from app.jobs import enqueue_job, recover_stale_jobs, retry_job
+from tests.helpers import sentetik_edefter_yaz
+from datetime import datetime, timedelta
+import os
+import time
+import pytest
+
+ZAMAN_ASIMI = timedelta(minutes=15)
+
+
+def _is_kaydi(firma, yol, durum, guncellenme_tarihi=None):
+    is_kaydi = IceAktarmaIsi(
+        id=os.urandom(16).hex(), firma_id=firma.id, tur='edefter_xml', durum=durum,
+        dosya_yolu=yol, orjinal_dosya_adi=os.path.basename(yol), guncellenme_tarihi=guncellenme_tarihi,
+    )
+    db.session.add(is_kaydi)
+    db.session.commit()
+    return is_kaydi
+
+
+def _bekle(is_id, saniye=30):
+    bitis = time.monotonic() + saniye
+    while time.monotonic() < bitis:
+        db.session.expire_all()
+        is_kaydi = db.session.get(IceAktarmaIsi, is_id)
+        if is_kaydi.durum in ('tamamlandi', 'hata'):
+            return is_kaydi
+        time.sleep(0.05)
+    pytest.fail(f"İş {is_id} zamanında bitmedi.")
+
+
+def test_olmus_is_hata_olur_ve_kismi_ice_aktarma_geri_alinir(firma, tmp_path):
+    yol = str(tmp_path / 'ocak.xml')
+    sentetik_edefter_yaz(yol, 200)
+    eski = datetime.utcnow() - timedelta(hours=1)
+    is_kaydi = _is_kaydi(firma, yol, 'calisiyor', guncellenme_tarihi=eski)
+    canli = _is_kaydi(firma, yol, 'calisiyor', guncellenme_tarihi=datetime.utcnow())
+
+    def cokme(okunan_satir, eklenen_satir):
+        if okunan_satir > 100:
+            raise SystemExit(1)
+
+    with pytest.raises(SystemExit):
+        ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml', batch_size=100, ilerleme=cokme)
+    db.session.rollback()
+    IceAktarmaKaydi.query.filter_by(firma_id=firma.id).update({'guncellenme_tarihi': eski})
+    db.session.commit()
+    assert YevmiyeFisiSatiri.query.filter_by(firma_id=firma.id).count() > 0
+
+    assert recover_stale_jobs(ZAMAN_ASIMI) == 1
+    db.session.expire_all()
+    assert db.session.get(IceAktarmaIsi, is_kaydi.id).durum == 'hata'
+    assert db.session.get(IceAktarmaIsi, canli.id).durum == 'calisiyor'
+    assert IceAktarmaKaydi.query.filter_by(firma_id=firma.id).count() == 0
+    assert YevmiyeFisiSatiri.query.filter_by(firma_id=firma.id).count() == 0
+    assert os.path.exists(yol)
+
+
+def test_bekleyen_isler_ilk_istekte_kuyruga_alinir(app, istemci, firma, tmp_path):
+    yol = str(tmp_path / 'ocak.xml')
+    toplam = sentetik_edefter_yaz(yol, 200)
+    is_kaydi = _is_kaydi(firma, yol, 'beklemede')
+
+    assert istemci.get('/').status_code == 200
+    is_kaydi = _bekle(is_kaydi.id)
+    assert is_kaydi.durum == 'tamamlandi', is_kaydi.hata_mesaji
+    assert is_kaydi.sonuc['satir_sayisi'] == toplam
+    assert not os.path.exists(yol)
+
+
+def test_hatali_is_dosyasini_korur_ve_yeniden_denenebilir(app, firma, tmp_path):
+    app.config['INGEST_WORKERS'] = 0
+    yol = str(tmp_path / 'bozuk.xml')
+    with open(yol, 'w', encoding='utf-8') as f:
+        f.write('<defter>')
+
+    is_kaydi = enqueue_job(firma.id, 'edefter_xml', yol, orjinal_dosya_adi='bozuk.xml')
+    db.session.refresh(is_kaydi)
+    assert is_kaydi.durum == 'hata'
+    assert os.path.exists(yol)
+
+    toplam = sentetik_edefter_yaz(yol, 200)
+    is_kaydi = retry_job(is_kaydi.id)
+    assert is_kaydi.durum == 'tamamlandi', is_kaydi.hata_mesaji
+    assert is_kaydi.sonuc['satir_sayisi'] == toplam
+    assert not os.path.exists(yol)
+    with pytest.raises(ValueError):
+        retry_job(is_kaydi.id)
@@ -0,0 +1,45 @@
+# Muavin (hesap ekstresi) sayfalaması: sayfalar arasında yürüyen bakiye kesintisiz olmalıdır.
+
+from app import db
+from app.models import YevmiyeFisiSatiri
+from app.edefter_service import ingest_edefter_xml
+from tests.helpers import sentetik_edefter_yaz
+from decimal import Decimal
+from sqlalchemy import func
+
+
+def test_muavin_sayfalari_bakiyeyi_devreder(firma, istemci, yetki, tmp_path):
+    yol = str(tmp_path / 'ocak.xml')
+    sentetik_edefter_yaz(yol, 400)
+    ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml')
+
+    hesap_kodu, satir_sayisi = db.session.query(YevmiyeFisiSatiri.hesap_kodu, func.count()).filter_by(
+        firma_id=firma.id
+    ).group_by(YevmiyeFisiSatiri.hesap_kodu).order_by(func.count().desc()).first()
+    satirlar = YevmiyeFisiSatiri.query.filter_by(firma_id=firma.id, hesap_kodu=hesap_kodu).all()
+    beklenen_bakiye = sum((s.borc_tutari - s.alacak_tutari for s in satirlar), Decimal('0.00'))
+
+    sayfalar = []
+    imlec = None
+    while True:
+        url = f"/firmalar/{firma.id}/muavin/{hesap_kodu}?limit=3" + (f"&imlec={imlec}" if imlec else '')
+        yanit = istemci.get(url, headers=yetki)
+        assert yanit.status_code == 200
+        sayfa = yanit.get_json()
+        sayfalar.append(sayfa)
+        imlec = sayfa['sonraki_imlec']
+        if not imlec:
+            break
+
+    assert sum(len(sayfa['satirlar']) for sayfa in sayfalar) == satir_sayisi
+    assert sayfalar[0]['acilis_bakiyesi'] == '0.00'
+    gun_icinde = gunler_arasi = 0
+    for onceki, sayfa in zip(sayfalar, sayfalar[1:]):
+        assert sayfa['acilis_bakiyesi'] == onceki['kapanis_bakiyesi']
+        if onceki['satirlar'][-1]['muhasebe_kayit_tarihi'] == sayfa['satirlar'][0]['muhasebe_kayit_tarihi']:
+            gun_icinde += 1
+        else:
+            gunler_arasi += 1
+    # Sayfa sınırları hem bir günün ortasına hem de gün geçişlerine denk gelmeli
+    assert gun_icinde and gunler_arasi
+    assert Decimal(sayfalar[-1]['kapanis_bakiyesi']) == beklenen_bakiye
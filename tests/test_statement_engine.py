@@ -0,0 +1,87 @@
+# Derlenmiş mali tablo motoru, rekürsif v3 üreticileriyle aynı girdide aynı çıktıyı vermelidir.
+
+from app import financial_statement_service as fss
+from app.financial_statement_service import (
+    HESAP_DETAYLARI, GELIR_TABLOSU_YAPISI, _donem_sonu_kaydi, _donem_hareketi_kaydi,
+    generate_bilanco_v3, generate_gelir_tablosu_v3,
+)
+from app.statement_engine import generate_bilanco, generate_gelir_tablosu
+from decimal import Decimal
+import copy
+import random
+
+ALT_HESAPLAR = {'120.01': '120', '600.01': '600'}
+DUZENLEYICI = ('103', '257', '591', '610')
+
+
+def _hesap_plani():
+    """ Standart hesap planı ve alt hesaplar: kod -> (ana hesap detayı, kayıt adı). """
+    plan = {kod: (detay, detay['adi']) for kod, detay in HESAP_DETAYLARI.items()}
+    for kod, ana in ALT_HESAPLAR.items():
+        plan[kod] = (HESAP_DETAYLARI[ana], f"{HESAP_DETAYLARI[ana]['adi']} - ALT HESAP")
+    return plan
+
+
+def _tutarlar(rnd, detay):
+    """ Hesabın normal bakiye yönünde ağır basan (borç, alacak) tutarları. """
+    buyuk = Decimal(rnd.randint(100_000, 10_000_000)) / 100
+    kucuk = Decimal(rnd.randint(0, 99_999)) / 100
+    return (buyuk, kucuk) if detay['normal_balance'] == 'D' else (kucuk, buyuk)
+
+
+def _girdiler():
+    """
+    Tüm hesaplar için get_donem_sonu_bakiyeleri / get_donem_ici_hareketler biçiminde kayıtlar.
+    v3 işareti ve gelir tablosu grubunu kayıttan okur; bunlar standart plana göre doldurulur
+    (düzenleyici ve gider hesapları -1).
+    """
+    rnd = random.Random(11)
+    grup_anahtarlari = {i['kalem_adi']: i['hesap_gruplari'][0] for i in GELIR_TABLOSU_YAPISI if 'hesap_gruplari' in i}
+    bakiyeler, hareketler = {}, {}
+    for kod, (detay, adi) in _hesap_plani().items():
+        bakiye = _donem_sonu_kaydi(detay, *_tutarlar(rnd, detay))
+        bakiye['adi'] = adi
+        bakiye['fs_impact_bilanco'] = -1 if detay['type'].startswith('REG_') else 1
+        bakiyeler[kod] = bakiye
+
+        hareket = _donem_hareketi_kaydi(detay, *_tutarlar(rnd, detay))
+        hareket['adi'] = adi
+        if detay.get('fs_section') == 'GELIR_TABLOSU':
+            hareket['gelir_tablosu_grup'] = grup_anahtarlari[detay['fs_group']]
+            hareket['fs_impact_gelir_tablosu'] = 1 if detay['type'] == 'GELIR' else -1
+        hareketler[kod] = hareket
+    return bakiyeler, hareketler
+
+
+def test_bilanco_v3_ile_ayni(monkeypatch):
+    bakiyeler, _ = _girdiler()
+    # v3 yalnızca yapıda açıkça listelenen kodları yerleştirir; referans için alt hesap,
+    # motorun çözücüyle bağladığı ana hesabın alt grubuna eklenir.
+    yapi = copy.deepcopy(fss.BILANCO_YAPISI)
+    yapi['AKTIFLER']['I. DÖNEN VARLIKLAR']['C. TİCARİ ALACAKLAR'].append('120.01')
+    monkeypatch.setattr(fss, 'BILANCO_YAPISI', yapi)
+
+    beklenen = generate_bilanco_v3(bakiyeler)
+    sonuc = generate_bilanco(bakiyeler)
+    assert 'HATA' not in beklenen
+    assert sonuc == beklenen
+
+    ticari = sonuc['AKTIFLER']['I. DÖNEN VARLIKLAR']['C. TİCARİ ALACAKLAR']['detay']
+    assert '120.01 ALICILAR - ALT HESAP' in ticari
+    amortisman = sonuc['AKTIFLER']['II. DURAN VARLIKLAR']['B. MADDİ DURAN VARLIKLAR']['detay']
+    assert Decimal(amortisman['257 BİRİKMİŞ AMORTİSMANLAR (-)']) < 0
+
+
+def test_gelir_tablosu_v3_ile_ayni():
+    _, hareketler = _girdiler()
+    beklenen = generate_gelir_tablosu_v3(hareketler)
+    sonuc = generate_gelir_tablosu(hareketler)
+    assert 'HATA' not in beklenen
+    assert sonuc == beklenen
+
+    satislar = sonuc['A. BRÜT SATIŞLAR']['DETAY']
+    assert set(satislar) == {'600 YURTİÇİ SATIŞLAR', '600.01 YURTİÇİ SATIŞLAR - ALT HESAP'}
+    assert Decimal(sonuc['B. SATIŞ İNDİRİMLERİ (-)']['TUTAR']) < 0
+    assert Decimal(sonuc['NET SATIŞLAR']) == (
+        Decimal(sonuc['A. BRÜT SATIŞLAR']['TUTAR']) + Decimal(sonuc['B. SATIŞ İNDİRİMLERİ (-)']['TUTAR'])
+    )
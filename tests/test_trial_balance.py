@@ -0,0 +1,96 @@
+# Mizan: SQLite'taki Python rollup'ında sınıf/grup/hesap/alt hesap toplamları ve denklik.
+
+from app.trial_balance_service import _python_rollup, TUTAR_ALANLARI, TDHP_SINIFLARI
+from app.edefter_service import ingest_edefter_xml
+from tests.helpers import sentetik_edefter_yaz
+from collections import defaultdict
+from decimal import Decimal
+from types import SimpleNamespace
+import random
+
+KAPANIS_ALANLARI = TUTAR_ALANLARI + ('kapanis_borc', 'kapanis_alacak')
+HESAPLAR = {
+    '100': [None], '102': ['102.01', '102.02'], '120': ['120.01', '120.02', '120.03'], '153': ['153.01'],
+    '257': [None], '320': ['320.01', '320.02'], '391': [None], '500': [None], '600': ['600.01'], '770': [None],
+}
+
+
+def _sentetik_satirlar():
+    """ Dengeli maddelerden (hesap_kodu, alt_hesap_kodu) bazında açılış/dönem toplamları. """
+    rnd = random.Random(3)
+    toplamlar = defaultdict(lambda: [Decimal('0.00')] * len(TUTAR_ALANLARI))
+    hesaplar = [(kod, alt) for kod, altlar in HESAPLAR.items() for alt in altlar]
+    for madde in range(200):
+        acilis = madde < 80
+        tutar = Decimal(rnd.randint(1, 1_000_000)) / 100
+        borclu, alacakli = rnd.sample(hesaplar, 2)
+        toplamlar[borclu][0 if acilis else 2] += tutar
+        toplamlar[alacakli][1 if acilis else 3] += tutar
+    return [
+        SimpleNamespace(hesap_kodu=kod, alt_hesap_kodu=alt, hesap_adi=f"HESAP {kod}",
+                        alt_hesap_adi=alt and f"ALT {alt}", **dict(zip(TUTAR_ALANLARI, tutarlar)))
+        for (kod, alt), tutarlar in toplamlar.items()
+    ]
+
+
+def _topla(kayitlar):
+    return tuple(sum((k[alan] for k in kayitlar), Decimal('0.00')) for alan in KAPANIS_ALANLARI)
+
+
+def _tutarlar(kayit):
+    return tuple(kayit[alan] for alan in KAPANIS_ALANLARI)
+
+
+def _ham(satir):
+    return {**vars(satir), 'kapanis_borc': satir.acilis_borc + satir.donem_borc,
+            'kapanis_alacak': satir.acilis_alacak + satir.donem_alacak}
+
+
+def test_python_rollup_seviyeleri_tutarli_ve_denk():
+    satirlar = _sentetik_satirlar()
+    kayitlar = dict(_python_rollup(satirlar))
+    seviyeler = defaultdict(dict)
+    for anahtar, kayit in kayitlar.items():
+        seviyeler[kayit['seviye']][anahtar] = kayit
+
+    # Her hesap ve alt hesap, ham satırlarının toplamıdır.
+    for (kod,), kayit in seviyeler['hesap'].items():
+        assert _tutarlar(kayit) == _topla([_ham(s) for s in satirlar if s.hesap_kodu == kod])
+        assert kayit['adi'] == f"HESAP {kod}"
+        altlar = [k for (h, _), k in seviyeler['alt_hesap'].items() if h == kod]
+        if None not in HESAPLAR[kod]:
+            assert _tutarlar(kayit) == _topla(altlar)
+    assert set(seviyeler['alt_hesap']) == {(s.hesap_kodu, s.alt_hesap_kodu) for s in satirlar if s.alt_hesap_kodu}
+
+    # Grup = hesaplarının, sınıf = gruplarının, genel toplam = sınıfların toplamı.
+    for (grup,), kayit in seviyeler['grup'].items():
+        assert _tutarlar(kayit) == _topla([k for (kod,), k in seviyeler['hesap'].items() if kod[:2] == grup])
+    for (sinif,), kayit in seviyeler['sinif'].items():
+        assert kayit['adi'] == TDHP_SINIFLARI[sinif]
+        assert _tutarlar(kayit) == _topla([k for (grup,), k in seviyeler['grup'].items() if grup[:1] == sinif])
+    genel = seviyeler['toplam'][None]
+    assert _tutarlar(genel) == _topla(seviyeler['sinif'].values())
+
+    # Çift taraflı kayıt: hem açılış hem dönem hem kapanış borç = alacak
+    assert genel['acilis_borc'] == genel['acilis_alacak']
+    assert genel['donem_borc'] == genel['donem_alacak']
+    assert genel['kapanis_borc'] == genel['kapanis_alacak']
+    assert sum(k['borc_bakiye'] for k in seviyeler['hesap'].values()) == sum(k['alacak_bakiye'] for k in seviyeler['hesap'].values())
+
+
+def test_mizan_endpoint_denk(firma, istemci, yetki, tmp_path):
+    yol = str(tmp_path / 'ocak.xml')
+    sentetik_edefter_yaz(yol, 400)
+    ingest_edefter_xml(firma.id, yol, dosya_adi='ocak.xml')
+
+    yanit = istemci.get(f"/firmalar/{firma.id}/mizan?donem_baslangic=2024-01-15&donem_bitis=2024-01-31", headers=yetki)
+    assert yanit.status_code == 200
+    veri = yanit.get_json()
+    assert veri['denk']
+    mizan = veri['mizan']
+    genel = mizan[-1]
+    assert genel['seviye'] == 'toplam'
+    siniflar = [k for k in mizan if k['seviye'] == 'sinif']
+    for alan in KAPANIS_ALANLARI:
+        assert sum(Decimal(k[alan]) for k in siniflar) == Decimal(genel[alan])
+    assert Decimal(genel['acilis_borc']) > 0 and Decimal(genel['donem_borc']) > 0
@@ -0,0 +1,61 @@
+# Parçalı (resumable) yükleme: parça ekleme, özet doğrulama ve tamamlanınca iş oluşturma.
+
+from app import db
+from app.models import ParcaliYukleme
+from app.uploads import create_upload, append_chunk, complete_upload, YuklemeHatasi
+from tests.helpers import sentetik_edefter_yaz
+import hashlib
+import io
+import os
+import pytest
+
+
+def _parcali_yukle(firma, yol, parca_boyutu=4096):
+    with open(yol, 'rb') as f:
+        veri = f.read()
+    yukleme = create_upload(firma.id, 'ocak.xml', toplam_boyut=len(veri))
+    for offset in range(0, len(veri), parca_boyutu):
+        append_chunk(yukleme.id, offset, io.BytesIO(veri[offset:offset + parca_boyutu]))
+    return yukleme.id, hashlib.sha256(veri).hexdigest()
+
+
+def test_tamamlanan_yukleme_isi_calistirir(app, firma, tmp_path):
+    app.config['INGEST_WORKERS'] = 0
+    yol = str(tmp_path / 'ocak.xml')
+    toplam = sentetik_edefter_yaz(yol, 200)
+    yukleme_id, ozet = _parcali_yukle(firma, yol)
+
+    with pytest.raises(YuklemeHatasi):
+        complete_upload(yukleme_id, sha256='0' * 64)
+
+    yukleme, is_kaydi = complete_upload(yukleme_id, sha256=ozet)
+    db.session.refresh(is_kaydi)
+    assert yukleme.durum == 'tamamlandi'
+    assert yukleme.ice_aktarma_isi_id == is_kaydi.id
+    assert is_kaydi.durum == 'tamamlandi', is_kaydi.hata_mesaji
+    assert is_kaydi.sonuc['satir_sayisi'] == toplam
+
+
+def test_is_olusturulamazsa_yukleme_aktif_kalir(app, firma, tmp_path, monkeypatch):
+    app.config['INGEST_WORKERS'] = 0
+    yol = str(tmp_path / 'ocak.xml')
+    sentetik_edefter_yaz(yol, 200)
+    yukleme_id, ozet = _parcali_yukle(firma, yol)
+    parca_yolu = db.session.get(ParcaliYukleme, yukleme_id).dosya_yolu
+
+    def hata(*args, **kwargs):
+        raise RuntimeError("iş oluşturulamadı")
+
+    with monkeypatch.context() as m:
+        m.setattr('app.uploads.create_job', hata)
+        with pytest.raises(RuntimeError):
+            complete_upload(yukleme_id, sha256=ozet)
+
+    yukleme = db.session.get(ParcaliYukleme, yukleme_id)
+    assert yukleme.durum == 'aktif'
+    assert yukleme.dosya_yolu == parca_yolu
+    assert os.path.exists(parca_yolu)
+
+    yukleme, is_kaydi = complete_upload(yukleme_id, sha256=ozet)
+    db.session.refresh(is_kaydi)
+    assert is_kaydi.durum == 'tamamlandi', is_kaydi.hata_mesaji